@@ -158,6 +158,15 @@ class EnvironmentalQuestionAdmin(admin.ModelAdmin):
         ('Unit Configuration', {
             'fields': ('unit_category', 'default_unit', 'selected_units')
         }),
+        ('Source & Filters', {
+            'fields': (
+                'source_type',
+                ('filter_field', 'filter_value'),
+                ('filter_field_2', 'filter_value_2'),
+                'filter_conditions',
+            ),
+            'classes': ('collapse',)
+        }),
         ('Metadata', {
             'fields': ('created_by', 'created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class EnvdataConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.ENVdata'
-    
\ No newline at end of file
+
+    def ready(self):
+        # Keeps IndicatorMonthlyRollup in sync with incidents, hazards and inspections
+        import apps.ENVdata.signals
@@ -0,0 +1,84 @@
+# apps/ENVdata/filters.py
+"""
+Filter compilation for auto-calculated EnvironmentalQuestions.
+
+A question counts source records (incidents, hazards, inspections) that
+match its conditions. Conditions are (field, value) pairs using the
+field names offered in the questions manager; FILTER_FIELDS is the
+allow-list that maps them to ORM lookups on the source model.
+
+Conditions on different fields are ANDed, repeated conditions on the
+same field are ORed (``__in``). A compiled filter is a sorted list of
+[lookup, value] pairs, so two questions with the same compiled filter
+count exactly the same records and can share one query.
+"""
+
+from django.core.exceptions import ValidationError
+
+FILTER_FIELDS = {
+    'INCIDENT': {
+        'incident_type': 'incident_type_id',
+        'status': 'status',
+        'plant': 'plant_id',
+    },
+    'HAZARD': {
+        'hazard_type': 'hazard_type',
+        'severity': 'severity',
+        'status': 'status',
+        'plant': 'plant_id',
+    },
+    'INSPECTION': {
+        'template': 'template_id',
+        'inspection_type': 'template__inspection_type',
+        'status': 'status',
+        'plant': 'plants',
+        'assigned_to': 'assigned_to_id',
+    },
+}
+
+
+def compile_filter(source_type, conditions, strict=True):
+    """
+    Compile (field, value) conditions into a sorted [[lookup, value], ...] list.
+
+    Args:
+        source_type: INCIDENT / HAZARD / INSPECTION
+        conditions: Iterable of (field, value); blank pairs are skipped
+        strict: Raise ValidationError for fields not in FILTER_FIELDS
+                (False skips them, for questions saved before validation)
+    """
+    allowed = FILTER_FIELDS.get(source_type)
+    if allowed is None:
+        raise ValidationError(f"'{source_type}' questions cannot be filtered")
+
+    values_by_lookup = {}
+    for field, value in conditions:
+        field = (field or '').strip()
+        value = '' if value is None else str(value).strip()
+        if not field or not value:
+            continue
+
+        if field not in allowed:
+            if strict:
+                raise ValidationError(
+                    f"'{field}' is not a valid filter for {source_type.lower()} questions. "
+                    f"Allowed: {', '.join(sorted(allowed))}"
+                )
+            continue
+        values_by_lookup.setdefault(allowed[field], set()).add(value)
+
+    compiled = []
+    for lookup, values in sorted(values_by_lookup.items()):
+        if len(values) == 1:
+            compiled.append([lookup, values.pop()])
+        else:
+            compiled.append([f'{lookup}__in', sorted(values)])
+    return compiled
+
+
+def get_signature(source_type, compiled):
+    """Hashable key; questions with equal signatures count the same records"""
+    return (
+        source_type,
+        tuple((lookup, tuple(value) if isinstance(value, list) else value) for lookup, value in compiled),
+    )
@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.ENVdata.models import MonthlyIndicatorData, VALUE_PRECISION
+from apps.ENVdata.utils import invalidate_environmental_matrix
+
+
+class Command(BaseCommand):
+    help = 'Populate entered_value/base_value on MonthlyIndicatorData from the legacy string value'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every row, not only rows without a base_value'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = MonthlyIndicatorData.objects.select_related('unit').order_by('id')
+        if not options['all']:
+            rows = rows.filter(base_value__isnull=True)
+
+        batch = []
+        updated = 0
+        skipped = 0
+
+        for row in rows.iterator(chunk_size=options['batch_size']):
+            # Legacy rows already hold the base-unit value
+            base_value = MonthlyIndicatorData.parse_number(row.value)
+            if base_value is None:
+                skipped += 1
+                continue
+
+            entered_value = base_value
+            unit = row.unit
+            if unit and unit.base_unit != unit.name and unit.conversion_rate:
+                entered_value = base_value / Decimal(str(unit.conversion_rate))
+
+            row.base_value = base_value.quantize(VALUE_PRECISION)
+            row.entered_value = entered_value.quantize(VALUE_PRECISION)
+            batch.append(row)
+
+            if len(batch) >= options['batch_size']:
+                MonthlyIndicatorData.objects.bulk_update(batch, ['entered_value', 'base_value'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            MonthlyIndicatorData.objects.bulk_update(batch, ['entered_value', 'base_value'])
+            updated += len(batch)
+
+        if updated:
+            invalidate_environmental_matrix()
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} rows"))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {skipped} rows with non-numeric values"))
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.ENVdata.models import MonthlyIndicatorAttachment, MonthlyIndicatorData
+from apps.ENVdata.utils import invalidate_environmental_matrix
+
+
+class Command(BaseCommand):
+    help = (
+        'Set the year on environmental entries/attachments recorded before per-year '
+        'storage was deployed, using the year they were entered in'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--created-before',
+            required=True,
+            help='Deployment date (YYYY-MM-DD); only rows recorded before it are legacy'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = timezone.make_aware(datetime.strptime(options['created_before'], '%Y-%m-%d'))
+        except ValueError:
+            raise CommandError("--created-before must be a date in YYYY-MM-DD format")
+
+        data_count, data_skipped = self.backfill(
+            MonthlyIndicatorData, 'created_at', cutoff, options['batch_size']
+        )
+        attachment_count, attachment_skipped = self.backfill(
+            MonthlyIndicatorAttachment, 'uploaded_at', cutoff, options['batch_size']
+        )
+
+        if data_count or attachment_count:
+            invalidate_environmental_matrix()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {data_count} indicator rows and {attachment_count} attachments"
+        ))
+        if data_skipped or attachment_skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {data_skipped} indicator rows and {attachment_skipped} attachments "
+                f"already re-entered for that year"
+            ))
+
+    def backfill(self, model, date_field, cutoff, batch_size):
+        # Cells entered for a specific year since the deployment win over legacy rows
+        taken = set(
+            model.objects.filter(**{f'{date_field}__gte': cutoff})
+            .values_list('plant_id', 'indicator_id', 'year', 'month')
+        )
+
+        batch = []
+        updated = 0
+        skipped = 0
+
+        rows = model.objects.filter(**{f'{date_field}__lt': cutoff}).only(
+            'id', 'plant_id', 'indicator_id', 'year', 'month', date_field
+        )
+        for row in rows.order_by('id').iterator(chunk_size=batch_size):
+            year = timezone.localtime(getattr(row, date_field)).year
+            if row.year == year:
+                continue
+            if (row.plant_id, row.indicator_id, year, row.month) in taken:
+                skipped += 1
+                continue
+
+            row.year = year
+            batch.append(row)
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, ['year'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            model.objects.bulk_update(batch, ['year'])
+            updated += len(batch)
+        return updated, skipped
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.ENVdata.utils import EnvironmentalAggregationEngine, rebuild_indicator_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized monthly values for auto-calculated environmental questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            action='append',
+            dest='years',
+            help='Year to rebuild (repeatable). Defaults to every year with incident, hazard or inspection records.'
+        )
+
+    def handle(self, *args, **options):
+        years = options['years'] or EnvironmentalAggregationEngine.get_source_years()
+
+        for year in years:
+            cells = rebuild_indicator_rollup(year)
+            self.stdout.write(self.style.SUCCESS(f"{year}: {cells} non-zero cells written"))
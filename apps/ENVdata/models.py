@@ -1,9 +1,20 @@
+from decimal import Decimal, InvalidOperation
 from django.db import models
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.utils import timezone
+
+from .filters import FILTER_FIELDS, compile_filter, get_signature
 
 User = get_user_model()
 
+
+def get_current_year():
+    return timezone.localdate().year
+
 class UnitCategory(models.Model):
     """
     Category of units like Weight, Volume, Energy, Time, etc.
@@ -83,6 +94,15 @@ class EnvironmentalQuestion(models.Model):
         null=True,
         help_text="Secondary value to match (e.g., REPORTED)"
     )
+
+    # ADDITIONAL FILTERS
+    filter_conditions = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Further conditions, e.g. [{"field": "status", "value": "CLOSED"}]'
+    )
+    # Validated ORM lookups built from all filters on save (see filters.py)
+    compiled_filter = models.JSONField(null=True, blank=True, editable=False)
     
     # Units (optional for auto-calculated questions)
     unit_category = models.ForeignKey(
@@ -119,6 +139,57 @@ class EnvironmentalQuestion(models.Model):
     def __str__(self):
         return self.question_text
 
+    def get_filter_conditions(self):
+        """All (field, value) conditions: primary, secondary, then additional"""
+        conditions = [
+            (self.filter_field, self.filter_value),
+            (self.filter_field_2, self.filter_value_2),
+        ]
+        for condition in self.filter_conditions or []:
+            if isinstance(condition, dict):
+                conditions.append((condition.get('field'), condition.get('value')))
+        return conditions
+
+    def compile_filter(self, strict=True):
+        """Validate the conditions against the source's allow-list and compile them"""
+        if self.source_type not in FILTER_FIELDS:
+            return None
+        return compile_filter(self.source_type, self.get_filter_conditions(), strict=strict)
+
+    def clean(self):
+        super().clean()
+        conditions = self.filter_conditions or []
+        if not isinstance(conditions, list) or not all(isinstance(c, dict) for c in conditions):
+            raise ValidationError({'filter_conditions': 'Expected a list of {"field": ..., "value": ...} objects'})
+        # Reports fields the source model cannot be filtered on
+        self.compile_filter()
+
+    def save(self, *args, **kwargs):
+        # Invalid fields are reported by clean(); skipping them here keeps
+        # non-form callers (admin actions, shell, fixtures) working for
+        # questions saved before filters were validated
+        self.compiled_filter = self.compile_filter(strict=False)
+        self.__dict__.pop('filter_signature', None)
+        self.__dict__.pop('filter_q', None)
+        super().save(*args, **kwargs)
+
+    @cached_property
+    def filter_signature(self):
+        """Questions with equal signatures count the same records"""
+        compiled = self.compiled_filter
+        if compiled is None:
+            # Saved before filters were compiled - skip unknown fields as before
+            compiled = self.compile_filter(strict=False) or []
+        return get_signature(self.source_type, compiled)
+
+    @cached_property
+    def filter_q(self):
+        return Q(**dict(self.filter_signature[1]))
+
+
+VALUE_PRECISION = Decimal("0.0001")
+MAX_STORED_VALUE = Decimal(10) ** 16  # max_digits=20, decimal_places=4
+
 
 class MonthlyIndicatorData(models.Model):
     """
@@ -147,28 +218,65 @@ class MonthlyIndicatorData(models.Model):
         blank=True,null=True
     )    
     # indicator = models.CharField(max_length=100)
+    year = models.PositiveIntegerField(default=get_current_year, db_index=True)
     month = models.CharField(max_length=3, choices=MONTH_CHOICES)
     value = models.CharField(max_length=100)
+    entered_value = models.DecimalField(
+        max_digits=20, decimal_places=4, null=True, blank=True,
+        help_text="Number as entered, in the selected unit"
+    )
+    base_value = models.DecimalField(
+        max_digits=20, decimal_places=4, null=True, blank=True,
+        help_text="Entered value converted to the category base unit (used for totals)"
+    )
     unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        # unique_together = ('plant', 'indicator', 'month')
-        ordering = ['plant', 'indicator', 'month', 'value', 'unit']
+        unique_together = ('plant', 'indicator', 'year', 'month')
+        ordering = ['plant', 'indicator', 'year', 'month', 'value', 'unit']
     
     def __str__(self):
-        return f"{self.plant.name} - {self.indicator} - {self.month}: {self.value} {self.unit}"
+        return f"{self.plant.name} - {self.indicator} - {self.month} {self.year}: {self.value} {self.unit}"
+
+    @staticmethod
+    def parse_number(text):
+        """
+        Parse user input like "1,234.5" into a Decimal.
+        Returns None for empty, non-numeric or out-of-range input.
+        """
+        try:
+            number = Decimal(str(text).replace(",", "").strip())
+        except (InvalidOperation, TypeError, ValueError):
+            return None
+        if not number.is_finite() or abs(number) >= MAX_STORED_VALUE:
+            return None
+        return number
+
+    @staticmethod
+    def to_base_value(number, unit):
+        """Convert a number in unit to the category base unit, at storage precision"""
+        if unit and unit.base_unit != unit.name:
+            number = number * Decimal(str(unit.conversion_rate))
+        if abs(number) >= MAX_STORED_VALUE:
+            raise ValueError("Value too large")
+        return number.quantize(VALUE_PRECISION)
 
 
 
+# "JAN" -> 1 ... "DEC" -> 12
+MONTH_NUMBERS = {code: number for number, (code, _) in enumerate(MonthlyIndicatorData.MONTH_CHOICES, start=1)}
+
+
 class MonthlyIndicatorAttachment(models.Model):
     """
     One file attachment per plant + indicator + month cell
     """
     plant = models.ForeignKey('organizations.Plant', on_delete=models.CASCADE)
     indicator = models.ForeignKey(EnvironmentalQuestion, on_delete=models.CASCADE)
+    year = models.PositiveIntegerField(default=get_current_year)
     month = models.CharField(max_length=3, choices=MonthlyIndicatorData.MONTH_CHOICES)
     file = models.FileField(upload_to='environmental/attachments/%Y/%m/')
     file_name = models.CharField(max_length=255, blank=True)  # original filename
@@ -177,13 +285,35 @@ class MonthlyIndicatorAttachment(models.Model):
 
     class Meta:
         # Enforce one file per cell
-        unique_together = ('plant', 'indicator', 'month')
+        unique_together = ('plant', 'indicator', 'year', 'month')
 
     def __str__(self):
-        return f"{self.plant.name} - {self.indicator} - {self.month} - {self.file_name}"
+        return f"{self.plant.name} - {self.indicator} - {self.month} {self.year} - {self.file_name}"
 
     def save(self, *args, **kwargs):
         # Auto-capture original filename before saving
         if self.file and not self.file_name:
             self.file_name = self.file.name
-        super().save(*args, **kwargs)        
\ No newline at end of file
+        super().save(*args, **kwargs)        
+
+class IndicatorMonthlyRollup(models.Model):
+    """
+    Materialized monthly count for auto-calculated (INCIDENT/HAZARD/INSPECTION)
+    questions. Kept current by signals on the source models and reconciled
+    nightly; cells without rows are zero.
+    """
+    plant = models.ForeignKey('organizations.Plant', on_delete=models.CASCADE, related_name='indicator_rollups')
+    indicator = models.ForeignKey(EnvironmentalQuestion, on_delete=models.CASCADE, related_name='rollups')
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField(help_text="Calendar month number (1-12)")
+    value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('plant', 'indicator', 'year', 'month')
+        indexes = [
+            models.Index(fields=['year', 'plant']),
+        ]
+
+    def __str__(self):
+        return f"{self.plant} - {self.indicator} - {self.year}/{self.month:02d}: {self.value}"
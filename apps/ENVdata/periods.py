@@ -0,0 +1,145 @@
+# apps/ENVdata/periods.py
+
+from collections import namedtuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import MonthlyIndicatorData
+
+PeriodMonth = namedtuple('PeriodMonth', ['year', 'number', 'code', 'name'])
+
+
+class ReportingPeriod:
+    """
+    Twelve consecutive months of environmental data.
+
+    Calendar years run January-December. Fiscal years follow the Indian
+    April-March cycle and are identified by their starting year, so
+    FY 2025-26 is ReportingPeriod(2025, FISCAL).
+    """
+    CALENDAR = 'CY'
+    FISCAL = 'FY'
+    KIND_CHOICES = [
+        (CALENDAR, 'Calendar Year'),
+        (FISCAL, 'Financial Year (Apr-Mar)'),
+    ]
+    FISCAL_START_MONTH = 4
+    YEARS_SHOWN = 6
+
+    def __init__(self, year, kind=CALENDAR):
+        self.year = int(year)
+        self.kind = kind if kind in (self.CALENDAR, self.FISCAL) else self.CALENDAR
+
+    def __eq__(self, other):
+        return isinstance(other, ReportingPeriod) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"<ReportingPeriod {self.key}>"
+
+    def __str__(self):
+        return self.label
+
+    # ---------- construction ----------
+
+    @classmethod
+    def current(cls, kind=CALENDAR):
+        today = timezone.localdate()
+        if kind == cls.FISCAL and today.month < cls.FISCAL_START_MONTH:
+            return cls(today.year - 1, kind)
+        return cls(today.year, kind)
+
+    @classmethod
+    def from_request(cls, request):
+        """Read ?period=CY|FY&year=YYYY, falling back to the current calendar year"""
+        kind = request.GET.get('period') or cls.CALENDAR
+        default = cls.current(kind)
+        try:
+            year = int(request.GET.get('year') or default.year)
+        except (TypeError, ValueError):
+            return default
+
+        if not (2000 <= year <= timezone.localdate().year + 1):
+            return default
+        return cls(year, kind)
+
+    @classmethod
+    def from_key(cls, key):
+        """Inverse of .key ("CY2025" / "FY2025")"""
+        return cls(int(key[2:]), key[:2])
+
+    # ---------- description ----------
+
+    @property
+    def key(self):
+        return f"{self.kind}{self.year}"
+
+    @property
+    def label(self):
+        if self.kind == self.FISCAL:
+            return f"FY {self.year}-{str(self.year + 1)[-2:]}"
+        return str(self.year)
+
+    @property
+    def is_fiscal(self):
+        return self.kind == self.FISCAL
+
+    @property
+    def months(self):
+        """PeriodMonth tuples in period order"""
+        start = self.FISCAL_START_MONTH if self.is_fiscal else 1
+        months = []
+        for offset in range(12):
+            number = (start - 1 + offset) % 12 + 1
+            year = self.year if number >= start else self.year + 1
+            code, name = MonthlyIndicatorData.MONTH_CHOICES[number - 1]
+            months.append(PeriodMonth(year, number, code, name))
+        return months
+
+    @property
+    def month_choices(self):
+        """(code, name) pairs in period order, shaped like MONTH_CHOICES"""
+        return [(m.code, m.name) for m in self.months]
+
+    @property
+    def years(self):
+        return sorted({m.year for m in self.months})
+
+    def index_by_number(self):
+        """{(year, month_number): position in period}"""
+        return {(m.year, m.number): index for index, m in enumerate(self.months)}
+
+    def index_by_code(self):
+        """{(year, month_code): position in period}"""
+        return {(m.year, m.code): index for index, m in enumerate(self.months)}
+
+    # ---------- querying ----------
+
+    def month_filter(self, prefix='', by_code=True):
+        """
+        Q object selecting rows inside the period from a (year, month) pair.
+        by_code=True matches "JAN".."DEC" month columns, False matches 1..12.
+        """
+        condition = Q()
+        for year in self.years:
+            months = [m.code if by_code else m.number for m in self.months if m.year == year]
+            condition |= Q(**{f'{prefix}year': year, f'{prefix}month__in': months})
+        return condition
+
+    # ---------- UI helpers ----------
+
+    @classmethod
+    def year_choices(cls):
+        this_year = timezone.localdate().year
+        return list(range(this_year, this_year - cls.YEARS_SHOWN, -1))
+
+    def get_context(self):
+        """Template context for the period selector"""
+        return {
+            'period': self,
+            'period_kind_choices': self.KIND_CHOICES,
+            'period_year_choices': self.year_choices(),
+        }
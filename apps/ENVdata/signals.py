@@ -0,0 +1,212 @@
+# apps/ENVdata/signals.py
+
+import logging
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.accidents.models import Incident
+from apps.hazards.models import Hazard
+from apps.inspections.models import InspectionSchedule
+from .models import EnvironmentalQuestion, IndicatorMonthlyRollup, MonthlyIndicatorData
+from .utils import (
+    AUTO_SOURCE_TYPES,
+    EnvironmentalAggregationEngine,
+    invalidate_environmental_matrix,
+    rebuild_indicator_rollup,
+)
+
+logger = logging.getLogger(__name__)
+
+SOURCE_MODELS = {
+    Incident: 'INCIDENT',
+    Hazard: 'HAZARD',
+    InspectionSchedule: 'INSPECTION',
+}
+
+
+def _year_of(value):
+    """Calendar year of a date/datetime in local time (None if unset)"""
+    if value is None:
+        return None
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.year
+
+
+def _date_field(source_type):
+    return EnvironmentalAggregationEngine.SOURCES[source_type]['date_field']
+
+
+def _current_scope(source_type, instance):
+    """(plant_ids, year) an event currently contributes to"""
+    year = _year_of(getattr(instance, _date_field(source_type)))
+    if source_type == 'INSPECTION':
+        plant_ids = list(instance.plants.values_list('id', flat=True)) if instance.pk else []
+    else:
+        plant_ids = [instance.plant_id] if instance.plant_id else []
+    return plant_ids, year
+
+
+def _schedule_refresh(source_type, scopes):
+    """Rebuild the affected (plant, year) rollup cells once the transaction commits"""
+    cells = {
+        (plant_id, year)
+        for plant_ids, year in scopes
+        if year
+        for plant_id in plant_ids
+    }
+    if cells:
+        transaction.on_commit(lambda: _refresh_cells(source_type, cells))
+
+
+def schedule_rollup_refresh(sender, instances):
+    """Refresh rollups for source events created with bulk_create (no post_save)"""
+    source_type = SOURCE_MODELS[sender]
+    _schedule_refresh(source_type, [_current_scope(source_type, instance) for instance in instances])
+
+
+def _refresh_cells(source_type, cells):
+    try:
+        questions = list(EnvironmentalQuestion.objects.filter(is_active=True, source_type=source_type))
+        if not questions:
+            return
+
+        plants_by_year = {}
+        for plant_id, year in cells:
+            plants_by_year.setdefault(year, set()).add(plant_id)
+
+        for year, plant_ids in plants_by_year.items():
+            rebuild_indicator_rollup(year, plants=plant_ids, questions=questions)
+    except Exception:
+        # Never break the source save; the nightly reconciliation catches up
+        logger.exception(f"Failed to refresh {source_type.lower()} indicator rollup")
+
+
+# =========================================================
+# SOURCE EVENTS (Incident / Hazard / InspectionSchedule)
+# =========================================================
+
+@receiver(pre_save, sender=Incident)
+@receiver(pre_save, sender=Hazard)
+@receiver(pre_save, sender=InspectionSchedule)
+def capture_previous_rollup_scope(sender, instance, raw=False, **kwargs):
+    """Remember where an existing event was counted before it changes"""
+    source_type = SOURCE_MODELS[sender]
+    if raw or not instance.pk:
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).first()
+    instance._rollup_previous_scope = _current_scope(source_type, previous) if previous else None
+
+
+@receiver(post_save, sender=Incident)
+@receiver(post_save, sender=Hazard)
+@receiver(post_save, sender=InspectionSchedule)
+def refresh_rollup_on_save(sender, instance, raw=False, **kwargs):
+    source_type = SOURCE_MODELS[sender]
+    if raw:
+        return
+
+    scopes = [_current_scope(source_type, instance)]
+    previous = getattr(instance, '_rollup_previous_scope', None)
+    if previous:
+        scopes.append(previous)
+    _schedule_refresh(source_type, scopes)
+
+
+@receiver(pre_delete, sender=InspectionSchedule)
+def capture_inspection_plants_on_delete(sender, instance, **kwargs):
+    # The plants relation is already gone by the time post_delete fires
+    instance._rollup_previous_scope = _current_scope('INSPECTION', instance)
+
+
+@receiver(post_delete, sender=Incident)
+@receiver(post_delete, sender=Hazard)
+@receiver(post_delete, sender=InspectionSchedule)
+def refresh_rollup_on_delete(sender, instance, **kwargs):
+    source_type = SOURCE_MODELS[sender]
+    if source_type == 'INSPECTION':
+        scope = getattr(instance, '_rollup_previous_scope', None)
+    else:
+        scope = ([instance.plant_id], _year_of(getattr(instance, _date_field(source_type))))
+    if scope:
+        _schedule_refresh(source_type, [scope])
+
+
+@receiver(m2m_changed, sender=InspectionSchedule.plants.through)
+def refresh_rollup_on_inspection_plants_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Inspection schedules are attached to plants after the schedule is saved"""
+    if action == 'pre_clear':
+        if reverse:
+            instance._rollup_cleared_ids = list(instance.plant_many.values_list('id', flat=True))
+        else:
+            instance._rollup_cleared_ids = list(instance.plants.values_list('id', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    changed_ids = getattr(instance, '_rollup_cleared_ids', []) if action == 'post_clear' else list(pk_set or [])
+    if not changed_ids:
+        return
+
+    if reverse:
+        # instance is a Plant, changed_ids are schedules
+        dates = InspectionSchedule.objects.filter(id__in=changed_ids).values_list('scheduled_date', flat=True)
+        scopes = [([instance.pk], _year_of(d)) for d in set(dates)]
+    else:
+        scopes = [(changed_ids, _year_of(instance.scheduled_date))]
+    _schedule_refresh('INSPECTION', scopes)
+
+
+# =========================================================
+# QUESTION DEFINITION CHANGES
+# =========================================================
+
+@receiver(post_save, sender=EnvironmentalQuestion)
+def refresh_rollup_on_question_save(sender, instance, raw=False, **kwargs):
+    """Filters may have changed - rebuild every year this question has data for"""
+    if raw:
+        return
+
+    if not instance.is_active or instance.source_type not in AUTO_SOURCE_TYPES:
+        IndicatorMonthlyRollup.objects.filter(indicator=instance).delete()
+        return
+
+    def rebuild():
+        try:
+            years = set(IndicatorMonthlyRollup.objects.filter(indicator=instance).values_list('year', flat=True))
+            years.add(timezone.localdate().year)
+            for year in years:
+                rebuild_indicator_rollup(year, questions=[instance])
+        except Exception:
+            logger.exception(f"Failed to rebuild indicator rollup for question {instance.pk}")
+
+    transaction.on_commit(rebuild)
+
+
+# =========================================================
+# CACHED PERIOD MATRIX
+# =========================================================
+
+@receiver(post_save, sender=EnvironmentalQuestion)
+@receiver(post_delete, sender=EnvironmentalQuestion)
+def invalidate_matrix_on_question_change(sender, raw=False, **kwargs):
+    """Question definitions affect every plant and year"""
+    if raw:
+        return
+    transaction.on_commit(invalidate_environmental_matrix)
+
+
+@receiver(post_save, sender=MonthlyIndicatorData)
+@receiver(post_delete, sender=MonthlyIndicatorData)
+def invalidate_matrix_on_entry_change(sender, instance, raw=False, **kwargs):
+    """Single-row edits (admin, shell); bulk entry invalidates explicitly"""
+    if raw:
+        return
+    cells = [(instance.plant_id, instance.year)]
+    transaction.on_commit(lambda: invalidate_environmental_matrix(cells))
@@ -0,0 +1,43 @@
+# apps/ENVdata/tasks.py
+
+from celery import shared_task
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='apps.ENVdata.tasks.reconcile_indicator_rollups')
+def reconcile_indicator_rollups(years=None):
+    """
+    Nightly full rebuild of IndicatorMonthlyRollup.
+    Catches changes that bypass signals (queryset.update(), raw SQL, failed refreshes).
+    Defaults to the current and previous calendar year.
+    """
+    from .utils import rebuild_indicator_rollup
+
+    if not years:
+        current_year = timezone.localdate().year
+        years = [current_year - 1, current_year]
+
+    for year in years:
+        cells = rebuild_indicator_rollup(year)
+        logger.info(f"[IndicatorRollup] Rebuilt {year}: {cells} non-zero cells")
+
+    return f"Reconciled indicator rollups for {', '.join(str(y) for y in years)}"
+
+
+@shared_task(
+    bind=True,
+    name='apps.ENVdata.tasks.retry_matrix_invalidation',
+    # Every 5 minutes for 6 hours - as long as a stale block can stay cached
+    max_retries=72,
+    default_retry_delay=300,
+)
+def retry_matrix_invalidation(self, keys):
+    """Re-bump matrix version keys whose bump failed while the cache was unreachable"""
+    from .utils import bump_matrix_versions
+
+    if bump_matrix_versions(keys):
+        raise self.retry()
+    return f"Bumped {len(keys)} matrix version key(s)"
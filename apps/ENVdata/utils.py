@@ -1,17 +1,409 @@
 
-from django.db.models import Count, Q, Sum
-from datetime import datetime, date
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import ExtractMonth
 import calendar
 import json
+import time
+from decimal import Decimal
+import logging
 from apps.ENVdata.constants import MONTHS
 from apps.accounts.models import Plant
 from .models import *
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from django.http import HttpResponse
 
+logger = logging.getLogger(__name__)
 
+AUTO_SOURCE_TYPES = ['INCIDENT', 'HAZARD', 'INSPECTION']
+
+
+class EnvironmentalAggregationEngine:
+    """
+    Computes auto-calculated question values for a set of plants in one pass.
+
+    Questions that share a source type and compiled filter (see filters.py)
+    are counted together with a single ``GROUP BY plant, month`` query and the
+    result is fanned out to every question in that group.
+    """
+
+    SOURCES = {
+        'INCIDENT': {
+            'model': 'accidents.Incident',
+            'date_field': 'incident_date',
+            'plant_field': 'plant',
+        },
+        'HAZARD': {
+            'model': 'hazards.Hazard',
+            'date_field': 'incident_datetime',
+            'plant_field': 'plant',
+        },
+        'INSPECTION': {
+            'model': 'inspections.InspectionSchedule',
+            'date_field': 'scheduled_date',
+            # Schedules are linked to plants through a many-to-many relation
+            'plant_field': 'plants',
+        },
+    }
+
+    def __init__(self, year, plants=None, questions=None):
+        self.year = year
+        self.plant_ids = None if plants is None else [getattr(p, 'pk', p) for p in plants]
+        if questions is None:
+            questions = EnvironmentalQuestion.objects.filter(
+                is_active=True,
+                source_type__in=AUTO_SOURCE_TYPES
+            )
+        self.questions = [q for q in questions if q.source_type in self.SOURCES]
+        self._matrix = None
+
+    @classmethod
+    def get_source_years(cls):
+        """Every calendar year that has source records (oldest first)"""
+        years = set()
+        for source in cls.SOURCES.values():
+            bounds = apps.get_model(source['model']).objects.aggregate(
+                first=Min(source['date_field']), last=Max(source['date_field'])
+            )
+            if bounds['first'] and bounds['last']:
+                years.update(range(bounds['first'].year, bounds['last'].year + 1))
+        return sorted(years)
+
+    @classmethod
+    def get_signature(cls, question):
+        """
+        Return a hashable key describing what a question counts.
+        Questions with equal signatures are served by the same query.
+        """
+        return question.filter_signature
+
+    def get_signature_groups(self):
+        """Map each signature to the questions sharing it"""
+        groups = {}
+        for question in self.questions:
+            groups.setdefault(self.get_signature(question), []).append(question)
+        return groups
+
+    def compute(self):
+        """Run one grouped count per signature and build the value matrix"""
+        if self._matrix is not None:
+            return self
+
+        self._matrix = {}
+        for signature, questions in self.get_signature_groups().items():
+            counts = self._count_by_plant_month(signature[0], questions[0].filter_q)
+            for question in questions:
+                self._matrix[question.id] = counts
+        return self
+
+    def _count_by_plant_month(self, source_type, condition):
+        source = self.SOURCES[source_type]
+        model = apps.get_model(source['model'])
+        date_field = source['date_field']
+        plant_field = source['plant_field']
+
+        # Keep every condition in one filter() call so multi-valued relations
+        # (InspectionSchedule.plants) share a single join with the grouping.
+        conditions = {f'{date_field}__year': self.year}
+        if self.plant_ids is not None:
+            conditions[f'{plant_field}__in'] = self.plant_ids
+
+        counts = {}
+        try:
+            rows = (
+                model.objects.filter(condition, **conditions)
+                .annotate(_month=ExtractMonth(date_field))
+                .values(plant_field, '_month')
+                .annotate(_count=Count('pk', distinct=True))
+                .order_by()
+            )
+            for row in rows:
+                counts.setdefault(row[plant_field], {})[row['_month']] = row['_count']
+        except Exception:
+            logger.exception(f"Error calculating {source_type.lower()} data for {condition}")
+        return counts
+
+    def get_month_values(self, question, plant):
+        """Return {month_number: count} for one question and plant"""
+        self.compute()
+        plant_id = getattr(plant, 'pk', plant)
+        return self._matrix.get(question.id, {}).get(plant_id, {})
+
+    def get_value(self, question, plant, month):
+        """Return the count for one question, plant and month number"""
+        return self.get_month_values(question, plant).get(month, 0)
+
+    def iter_cells(self):
+        """Yield (question, plant_id, month_number, count) for every non-zero cell"""
+        self.compute()
+        for question in self.questions:
+            for plant_id, months in self._matrix.get(question.id, {}).items():
+                for month, count in months.items():
+                    if count:
+                        yield question, plant_id, month, count
+
+
+def rebuild_indicator_rollup(year, plants=None, questions=None):
+    """
+    Recompute IndicatorMonthlyRollup rows for a year.
+
+    Args:
+        year: Calendar year to rebuild
+        plants: Plants (or ids) to limit the rebuild to; None rebuilds all plants
+        questions: Auto questions to rebuild; None rebuilds all active ones
+
+    Returns:
+        Number of non-zero cells written
+    """
+    engine = EnvironmentalAggregationEngine(year, plants=plants, questions=questions).compute()
+    if not engine.questions:
+        return 0
+
+    rows = [
+        IndicatorMonthlyRollup(
+            plant_id=plant_id,
+            indicator=question,
+            year=year,
+            month=month,
+            value=count,
+        )
+        for question, plant_id, month, count in engine.iter_cells()
+    ]
+
+    with transaction.atomic():
+        stale = IndicatorMonthlyRollup.objects.filter(year=year, indicator__in=engine.questions)
+        if engine.plant_ids is not None:
+            stale = stale.filter(plant_id__in=engine.plant_ids)
+        stale.delete()
+        IndicatorMonthlyRollup.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['plant', 'indicator', 'year', 'month'],
+            update_fields=['value', 'updated_at'],
+        )
+
+    if engine.plant_ids is None:
+        invalidate_environmental_matrix()
+    else:
+        invalidate_environmental_matrix((plant_id, year) for plant_id in engine.plant_ids)
+    return len(rows)
+
+
+# =========================================================
+# CACHED INDICATOR MATRIX
+# =========================================================
+#
+# Values are cached per (plant, calendar year) block, each holding every
+# indicator's 12 months. A reporting period is assembled from the blocks
+# it spans (two for a financial year). Each block key embeds:
+#   - a global generation, bumped when question definitions change
+#   - a per-(plant, year) version, bumped when that plant's data changes
+# so an edit only forces the affected plant/year to be recomputed.
+
+MATRIX_GENERATION_KEY = "envdata:matrix:generation"
+
+
+def _matrix_version_key(plant_id, year):
+    return f"envdata:matrix:version:{plant_id}:{year}"
+
+
+def _fresh_matrix_version():
+    # Time-based so a version lost to eviction never reuses an older key
+    return int(time.time() * 1000)
+
+
+# Version keys whose bump failed in this process. Until a retry lands, the
+# blocks they guard are neither read from nor written to the cache here.
+_failed_bumps = set()
+
+
+def _bump_matrix_version(key):
+    """Bump one version key; False if the cache could not be reached"""
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_matrix_version(), timeout=None)
+    except Exception:
+        logger.warning(f"Could not bump matrix cache version {key}", exc_info=True)
+        return False
+    _failed_bumps.discard(key)
+    return True
+
+
+def bump_matrix_versions(keys):
+    """Bump version keys, returning those the cache could not be reached for"""
+    failed = [key for key in keys if not _bump_matrix_version(key)]
+    _failed_bumps.update(failed)
+    return failed
+
+
+def invalidate_environmental_matrix(cells=None):
+    """
+    Mark cached matrix blocks stale.
+
+    Args:
+        cells: Iterable of (plant_id, year) whose data changed;
+               None invalidates every plant and year
+    """
+    if cells is None:
+        keys = [MATRIX_GENERATION_KEY]
+    else:
+        keys = [_matrix_version_key(plant_id, year) for plant_id, year in set(cells)]
+
+    failed = bump_matrix_versions(keys)
+    if failed:
+        # Blocks cached before the outage would be served again once the
+        # cache is back, so a worker keeps retrying until the bump lands
+        from .tasks import retry_matrix_invalidation
+
+        try:
+            retry_matrix_invalidation.apply_async(
+                args=[failed], countdown=retry_matrix_invalidation.default_retry_delay
+            )
+        except Exception:
+            logger.exception(f"Could not queue a retry for {len(failed)} matrix version bump(s)")
+
+
+def _get_matrix_block_keys(cells):
+    """Current cache key for each (plant_id, year) block"""
+    generation = cache.get_or_set(MATRIX_GENERATION_KEY, _fresh_matrix_version, timeout=None)
+
+    version_keys = {cell: _matrix_version_key(*cell) for cell in cells}
+    versions = cache.get_many(version_keys.values())
+    missing = {key: _fresh_matrix_version() for key in version_keys.values() if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+
+    return {
+        (plant_id, year): f"envdata:matrix:{generation}:{plant_id}:{year}:{versions[version_keys[(plant_id, year)]]}"
+        for plant_id, year in cells
+    }
+
+
+def build_matrix_blocks(cells):
+    """
+    Collect indicator values for (plant_id, year) blocks in two queries.
+
+    Returns {(plant_id, year): {"values": {...}, "numbers": {...}, "updated": {...}}}
+    where each inner dict maps question_id to 12 calendar months (Jan..Dec):
+        values:  display values (None where empty)
+        numbers: numeric values (base units / counts)
+        updated: last-updated timestamps (manual cells only)
+    """
+    cells = set(cells)
+    plant_ids = {plant_id for plant_id, year in cells}
+    years = {year for plant_id, year in cells}
+    month_numbers = {code: number for number, (code, name) in enumerate(MonthlyIndicatorData.MONTH_CHOICES, start=1)}
+    blocks = {cell: {"values": {}, "numbers": {}, "updated": {}} for cell in cells}
+
+    def store(cell, field, question_id, month, value):
+        months = blocks[cell][field].setdefault(question_id, [None] * 12)
+        months[month - 1] = value
+
+    auto_rows = IndicatorMonthlyRollup.objects.filter(
+        plant_id__in=plant_ids,
+        year__in=years,
+        indicator__source_type__in=AUTO_SOURCE_TYPES,
+    ).values_list("plant_id", "indicator_id", "year", "month", "value")
+    for plant_id, indicator_id, year, month, value in auto_rows:
+        cell = (plant_id, year)
+        if cell in blocks:
+            store(cell, "values", indicator_id, month, value)
+            store(cell, "numbers", indicator_id, month, value)
+
+    manual_rows = MonthlyIndicatorData.objects.filter(
+        plant_id__in=plant_ids,
+        year__in=years,
+        indicator__source_type="MANUAL",
+    ).values_list("plant_id", "indicator_id", "year", "month", "value", "base_value", "updated_at")
+    for plant_id, indicator_id, year, month, value, base_value, updated_at in manual_rows:
+        cell = (plant_id, year)
+        if cell in blocks:
+            month = month_numbers[month]
+            # Show the same number the totals add up (value is rounded to a whole number)
+            display = value if base_value is None else format_indicator_total(base_value)
+            store(cell, "values", indicator_id, month, display)
+            store(cell, "numbers", indicator_id, month, base_value)
+            store(cell, "updated", indicator_id, month, updated_at)
+
+    return blocks
+
+
+def get_matrix_blocks(cells):
+    """Read-through cache over build_matrix_blocks(); only stale blocks are rebuilt"""
+    cells = set(cells)
+    if _failed_bumps:
+        bump_matrix_versions(list(_failed_bumps))
+    if MATRIX_GENERATION_KEY in _failed_bumps:
+        return build_matrix_blocks(cells)
+    # Cells whose invalidation has not reached the cache are built uncached
+    cacheable = {cell for cell in cells if _matrix_version_key(*cell) not in _failed_bumps}
+
+    try:
+        keys = _get_matrix_block_keys(cacheable)
+        cached = cache.get_many(keys.values())
+    except Exception:
+        # The cache is only an optimisation - build every block if it is unreachable
+        logger.warning("Matrix cache unavailable, building blocks uncached", exc_info=True)
+        return build_matrix_blocks(cells)
+
+    blocks = {cell: cached[key] for cell, key in keys.items() if key in cached}
+    missing = cells - blocks.keys()
+    if missing:
+        built = build_matrix_blocks(missing)
+        try:
+            cache.set_many(
+                {keys[cell]: block for cell, block in built.items() if cell in keys},
+                timeout=getattr(settings, "ENV_MATRIX_CACHE_TIMEOUT", 6 * 60 * 60),
+            )
+        except Exception:
+            logger.warning("Could not store matrix blocks in the cache", exc_info=True)
+        blocks.update(built)
+    return blocks
+
+
+def get_period_matrix(period, plants):
+    """
+    Indicator values for plants over a reporting period.
+
+    Returns a dict keyed by (plant_id, question_id):
+        values/numbers/updated: 12 entries in period order (see build_matrix_blocks)
+        totals:  period total of the numeric values (None if nothing entered)
+    """
+    plant_ids = [getattr(p, "pk", p) for p in plants]
+    blocks = get_matrix_blocks((plant_id, year) for plant_id in plant_ids for year in period.years)
+
+    matrix = {"values": {}, "numbers": {}, "updated": {}, "totals": {}}
+    for index, month in enumerate(period.months):
+        for plant_id in plant_ids:
+            block = blocks[(plant_id, month.year)]
+            for field in ("values", "numbers", "updated"):
+                for question_id, months in block[field].items():
+                    value = months[month.number - 1]
+                    if value is not None:
+                        cells = matrix[field].setdefault((plant_id, question_id), [None] * 12)
+                        cells[index] = value
+
+    for key, numbers in matrix["numbers"].items():
+        entered = [value for value in numbers if value is not None]
+        matrix["totals"][key] = sum(entered) if entered else None
+    return matrix
+
+
+def format_indicator_total(total):
+    """Render a total or cell value without trailing zeros (1234.5000 -> 1234.5); None -> '-'"""
+    if total is None:
+        return "-"
+    text = f"{Decimal(total).quantize(Decimal('0.01')):f}"
+    return text.rstrip("0").rstrip(".") if "." in text else text
 
 
 class EnvironmentalDataFetcher:
@@ -25,290 +417,100 @@ class EnvironmentalDataFetcher:
         Returns auto-calculated values for all questions dynamically
         Format: {'Question Text': {'January': 5, 'February': 3, ...}}
         """
-        from .models import EnvironmentalQuestion
-        
-        result = {}
-        
-        # ✅ UPDATED: Include INSPECTION source type
         auto_questions = EnvironmentalQuestion.objects.filter(
             is_active=True,
-            source_type__in=['INCIDENT', 'HAZARD', 'INSPECTION']  # ⬅️ ADDED INSPECTION
+            source_type__in=AUTO_SOURCE_TYPES
         )
-        
-        MONTHS = [
-            'January', 'February', 'March', 'April', 'May', 'June',
-            'July', 'August', 'September', 'October', 'November', 'December'
-        ]
-        
+        engine = EnvironmentalAggregationEngine(year, plants=[plant], questions=auto_questions)
+
+        result = {}
         for question in auto_questions:
-            month_data = {}
-            
-            for month_num, month_name in enumerate(MONTHS, start=1):
-                count = cls.calculate_question_value(
-                    question, plant, month_num, year
-                )
-                month_data[month_name] = count
-            
-            result[question.question_text] = month_data
-        
+            result[question.question_text] = {
+                calendar.month_name[month_num]: engine.get_value(question, plant, month_num)
+                for month_num in range(1, 13)
+            }
+
         return result
     
     @classmethod
-    def calculate_question_value(cls, question, plant, month, year):
-        """Calculate value for a specific question, plant, and month"""
-        
-        if question.source_type == 'INCIDENT':
-            from apps.accidents.models import Incident
-
-            queryset = Incident.objects.filter(
-                plant=plant,
-                incident_date__month=month,
-                incident_date__year=year
-            )
-            
-            # ✅ Apply primary filter - incident_type is ForeignKey (use _id)
-            if question.filter_field == 'incident_type' and question.filter_value:
-                queryset = queryset.filter(incident_type_id=question.filter_value)
-            elif question.filter_field == 'status' and question.filter_value:
-                queryset = queryset.filter(status=question.filter_value)
-            elif question.filter_field == 'plant' and question.filter_value:
-                queryset = queryset.filter(plant_id=question.filter_value)
-            
-            # ✅ Apply secondary filter
-            if question.filter_field_2 and question.filter_value_2:
-                if question.filter_field_2 == 'incident_type':
-                    queryset = queryset.filter(incident_type_id=question.filter_value_2)
-                elif question.filter_field_2 == 'status':
-                    queryset = queryset.filter(status=question.filter_value_2)
-                elif question.filter_field_2 == 'plant':
-                    queryset = queryset.filter(plant_id=question.filter_value_2)
-            
-            return queryset.count()
-        
-        elif question.source_type == 'HAZARD':
-            try:
-                from apps.hazards.models import Hazard
-                
-                # ✅ Use incident_datetime (DateTimeField)
-                queryset = Hazard.objects.filter(
-                    plant=plant,
-                    incident_datetime__year=year,
-                    incident_datetime__month=month
-                )
-                
-                # ✅ Apply primary filter - hazard_type is CharField (NO _id)
-                if question.filter_field == 'hazard_type' and question.filter_value:
-                    queryset = queryset.filter(hazard_type=question.filter_value)
-                elif question.filter_field == 'severity' and question.filter_value:
-                    queryset = queryset.filter(severity=question.filter_value)
-                elif question.filter_field == 'status' and question.filter_value:
-                    queryset = queryset.filter(status=question.filter_value)
-                elif question.filter_field == 'plant' and question.filter_value:
-                    queryset = queryset.filter(plant_id=question.filter_value)
-                
-                # ✅ Apply secondary filter
-                if question.filter_field_2 and question.filter_value_2:
-                    if question.filter_field_2 == 'hazard_type':
-                        queryset = queryset.filter(hazard_type=question.filter_value_2)
-                    elif question.filter_field_2 == 'severity':
-                        queryset = queryset.filter(severity=question.filter_value_2)
-                    elif question.filter_field_2 == 'status':
-                        queryset = queryset.filter(status=question.filter_value_2)
-                    elif question.filter_field_2 == 'plant':
-                        queryset = queryset.filter(plant_id=question.filter_value_2)
-                
-                return queryset.count()
-            
-            except ImportError:
-                return 0
-            except Exception as e:
-                print(f"Error calculating hazard data: {e}")
-                import traceback
-                traceback.print_exc()
-                return 0
-        
-        # ========================================
-        # ⬇️ NEW SECTION: INSPECTION CALCULATION
-        # ========================================
-        elif question.source_type == 'INSPECTION':
-            try:
-                from apps.inspections.models import InspectionSchedule, InspectionTemplate
-                
-                # Base queryset - filter by plant, month, year
-                queryset = InspectionSchedule.objects.filter(
-                    plant=plant,
-                    scheduled_date__month=month,
-                    scheduled_date__year=year
-                )
-                
-                # ✅ Apply primary filter
-                if question.filter_field and question.filter_value:
-                    if question.filter_field == 'template':
-                        # Template is ForeignKey, use _id
-                        queryset = queryset.filter(template_id=question.filter_value)
-                    
-                    elif question.filter_field == 'inspection_type':
-                        # Filter by template's inspection_type
-                        queryset = queryset.filter(template__inspection_type=question.filter_value)
-                    
-                    elif question.filter_field == 'status':
-                        # Status is CharField on InspectionSchedule
-                        queryset = queryset.filter(status=question.filter_value)
-                    
-                    elif question.filter_field == 'plant':
-                        # Plant is ForeignKey, use _id
-                        queryset = queryset.filter(plant_id=question.filter_value)
-                    
-                    elif question.filter_field == 'assigned_to':
-                        # Assigned to is ForeignKey (User), use _id
-                        queryset = queryset.filter(assigned_to_id=question.filter_value)
-                
-                # ✅ Apply secondary filter (optional)
-                if question.filter_field_2 and question.filter_value_2:
-                    if question.filter_field_2 == 'template':
-                        queryset = queryset.filter(template_id=question.filter_value_2)
-                    
-                    elif question.filter_field_2 == 'inspection_type':
-                        queryset = queryset.filter(template__inspection_type=question.filter_value_2)
-                    
-                    elif question.filter_field_2 == 'status':
-                        queryset = queryset.filter(status=question.filter_value_2)
-                    
-                    elif question.filter_field_2 == 'plant':
-                        queryset = queryset.filter(plant_id=question.filter_value_2)
-                    
-                    elif question.filter_field_2 == 'assigned_to':
-                        queryset = queryset.filter(assigned_to_id=question.filter_value_2)
-                
-                return queryset.count()
-            
-            except ImportError:
-                # Inspection module not installed
-                print("Inspection module not found")
-                return 0
-            except Exception as e:
-                print(f"Error calculating inspection data: {e}")
-                import traceback
-                traceback.print_exc()
-                return 0
-        
-        # Default return for unknown source types
-        return 0
-    
-def get_all_plants_environmental_data(plants):
-    questions = EnvironmentalQuestion.objects.filter(is_active=True).order_by("order")
+    def calculate_question_value(cls, question, plant, month, year, engine=None):
+        """
+        Calculate value for a specific question, plant, and month.
+        Pass a computed engine to look the value up without querying.
+        """
+        if question.source_type not in EnvironmentalAggregationEngine.SOURCES:
+            return 0
 
-    all_data = (
-        MonthlyIndicatorData.objects
-        .filter(plant__in=plants)
-        .select_related("plant", "indicator", "unit")
+        if engine is None:
+            engine = EnvironmentalAggregationEngine(year, plants=[plant], questions=[question])
+        return engine.get_value(question, plant, month)
+    
+def get_environmental_export_plants(user):
+    """Active plants a user may export environmental data for"""
+    if user.is_superuser or user.is_staff or getattr(user, 'is_admin_user', False):
+        return Plant.objects.filter(is_active=True)
+
+    return Plant.objects.filter(
+        id__in=[p.id for p in user.get_all_plants()],
+        is_active=True
     )
 
-    current_year = datetime.now().year
-    plants_data = []
-
-    for plant in plants:
-        questions_data = []
-
-        for q in questions:
-            month_data = {}
-            total = 0
-            has_values = False
-            unit_name = q.default_unit.name if q.default_unit else "Count"
-
-            for month_db, month_label in MonthlyIndicatorData.MONTH_CHOICES:
-                if q.source_type in ['INCIDENT', 'HAZARD', 'INSPECTION']:
-                    month_number = list(calendar.month_name).index(month_label)
-
-                    value = EnvironmentalDataFetcher.calculate_question_value(q, plant, month_number, current_year)
-                    month_data[month_label] = value
-
-                    if value:
-                        total += value
-                        has_values = True
-                else:
-                    entry = all_data.filter(plant=plant,indicator=q,month=month_db).first()
-
-                    if entry and entry.value is not None:
-                        value = entry.value
-                        month_data[month_label] = value
-
-                        try:
-                            total += float(str(value).replace(",", ""))
-                            has_values = True
-                        except (ValueError, TypeError):
-                            pass
-                    else:
-                        month_data[month_label] = ""
-
-            questions_data.append({
-                "question": q.question_text,
-                "unit": unit_name,
-                "month_data": month_data,
-                "annual": f"{total:,.2f}" if has_values else "",
-            })
-
-        plants_data.append({
-            "plant": plant,
-            "questions_data": questions_data,
-        })
-
-    return plants_data
-
-
-def generate_environmental_excel(plants_data):
-    MONTH_LABELS = [
-        "January", "February", "March", "April", "May", "June",
-        "July", "August", "September", "October", "November", "December"
-    ]
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Environmental Data"
+def iter_environmental_rows(plants, period):
+    """
+    Yield one export row per active question, across all plants.
 
-    all_questions = []
-    question_meta = {}
+    Each row is (question_text, unit_name, [month values + total per plant]),
+    with months in period order. Values come from the cached period matrix,
+    so rows can be written out as they are produced.
+    """
+    plants = list(plants)
+    questions = (
+        EnvironmentalQuestion.objects.filter(is_active=True)
+        .select_related("default_unit")
+        .order_by("order")
+    )
+    matrix = get_period_matrix(period, plants)
+    empty = [None] * 12
 
-    for plant_data in plants_data:
-        for q in plant_data["questions_data"]:
-            if q["question"] not in all_questions:
-                all_questions.append(q["question"])
-                question_meta[q["question"]] = {
-                    "unit": q.get("unit", ""),
-                }
+    for q in questions:
+        values = []
+        for plant in plants:
+            numbers = matrix["numbers"].get((plant.id, q.id), empty)
+            if q.source_type in AUTO_SOURCE_TYPES:
+                values.extend(value or 0 for value in numbers)
+                values.append(sum(value or 0 for value in numbers))
+            else:
+                values.extend("" if value is None else float(value) for value in numbers)
+                values.append(float(sum(value for value in numbers if value is not None)))
 
-    ws.cell(row=1, column=1, value="Indicators")
-    # header row plant code
-    col = 2
-    for plant_data in plants_data:
-        plant = plant_data["plant"]
-
-        ws.merge_cells(
-            start_row=1,
-            start_column=col,
-            end_row=1,
-            end_column=col + len(MONTH_LABELS)
-        )
+        unit_name = q.default_unit.name if q.default_unit else "Count"
+        yield q.question_text, unit_name, values
 
-        ws.cell(row=1, column=col, value=plant.code)
-        col += len(MONTH_LABELS) + 1  
 
-    ws.cell(row=2, column=1, value="")
-    # header row months + total
-    col = 2
-    for _ in plants_data:
-        for month in MONTH_LABELS:
-            ws.cell(row=2, column=col, value=month)
-            col += 1
+def write_environmental_excel(plants, output, period):
+    """
+    Write the environmental export with a write-only workbook.
+
+    Rows are streamed from iter_environmental_rows() to disk as they are
+    produced, so memory stays flat regardless of plants x indicators.
+    Column widths are derived from the data instead of re-scanning cells.
+
+    Args:
+        plants: Plants to include (one 13-column block each)
+        output: File path or binary file object to save the .xlsx into
+        period: ReportingPeriod to export (calendar or financial year)
+    """
+    MONTH_LABELS = [f"{m.name} {m.year}" for m in period.months]
+    block = len(MONTH_LABELS) + 1
+    plants = list(plants)
 
-        ws.cell(row=2, column=col, value="Total")
-        col += 1
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Environmental Data")
 
-    # styling for the excel
     header_font = Font(bold=True)
     center_align = Alignment(horizontal="center", vertical="center")
     right_align = Alignment(horizontal="right", vertical="center")
-
     thin_border = Border(
         left=Side(style="thin"),
         right=Side(style="thin"),
@@ -316,52 +518,48 @@ def generate_environmental_excel(plants_data):
         bottom=Side(style="thin"),
     )
 
-    for row in ws.iter_rows(min_row=1, max_row=2):
-        for cell in row:
-            cell.font = header_font
-            cell.alignment = center_align
-            cell.border = thin_border
+    def styled(value, font=None, alignment=None):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.border = thin_border
+        if font:
+            cell.font = font
+        if alignment:
+            cell.alignment = alignment
+        return cell
 
-    # data rows
+    # Widths and frozen panes must be set before the first row is written
     ws.freeze_panes = "B3"
-    current_row = 3
-
-    for question in all_questions:
-        ws.cell(row=current_row, column=1, value=question)
-        col = 2
-
-        for plant_data in plants_data:
-            plant_question_map = {q["question"]: q for q in plant_data["questions_data"]}
-            q = plant_question_map.get(question)
-            total = 0
-
-            for month in MONTH_LABELS:
-                value = 0
-                if q:
-                    value = q["month_data"].get(month, 0)
-
-                ws.cell(row=current_row, column=col, value=value)
-                ws.cell(row=current_row, column=col).alignment = right_align
-
-                if isinstance(value, (int, float)):
-                    total += value
-
-                col += 1
+    ws.column_dimensions["A"].width = max(
+        [len("Indicators")] + [
+            len(text) for text in EnvironmentalQuestion.objects.filter(is_active=True)
+            .values_list("question_text", flat=True)
+        ]
+    ) + 3
+    for index in range(len(plants) * block):
+        ws.column_dimensions[get_column_letter(index + 2)].width = 14
 
-            ws.cell(row=current_row, column=col, value=total)
-            ws.cell(row=current_row, column=col).alignment = right_align
+    # header row plant code
+    header = [styled("Indicators", header_font, center_align)]
+    for index, plant in enumerate(plants):
+        start_col = 2 + index * block
+        ws.merged_cells.add(
+            f"{get_column_letter(start_col)}1:{get_column_letter(start_col + block - 1)}1"
+        )
+        header.append(styled(plant.code, header_font, center_align))
+        header.extend(styled(None, header_font, center_align) for _ in range(block - 1))
+    ws.append(header)
 
-            col += 1
-        current_row += 1
+    # header row months + total
+    month_header = [styled("", header_font, center_align)]
+    for _ in plants:
+        month_header.extend(styled(month, header_font, center_align) for month in MONTH_LABELS)
+        month_header.append(styled(f"Total {period.label}", header_font, center_align))
+    ws.append(month_header)
 
-    for column_cells in ws.columns:
-        max_length = 0
-        col_letter = get_column_letter(column_cells[0].column)
+    # data rows
+    for question_text, unit_name, values in iter_environmental_rows(plants, period):
+        ws.append([styled(question_text)] + [styled(value, alignment=right_align) for value in values])
 
-        for cell in column_cells:
-            cell.border = thin_border
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = max_length + 3
+    wb.save(output)
+    return output
 
-    return wb
\ No newline at end of file
@@ -2,15 +2,11 @@ from django.views import View
 from django.shortcuts import render, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.db import models
+from django.db import models, transaction
 from django.http import FileResponse, Http404, JsonResponse
-from django.http import HttpResponse
 from datetime import datetime
 from django.core.paginator import Paginator 
 from apps.accounts.models import User
-from apps.accidents.models import Incident
-from apps.hazards.models import Hazard
-from apps.inspections.models import InspectionTemplate, InspectionSchedule
 from apps.organizations.models import Plant
 from .models import *
 from .utils import *
@@ -18,12 +14,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from apps.notifications.services import NotificationService
 
 from django.views.generic import TemplateView
+from django.core.exceptions import ValidationError
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
 import json
 from .models import MonthlyIndicatorData, EnvironmentalQuestion, UnitCategory
 from collections import Counter
 from .models import MonthlyIndicatorAttachment
+from .periods import ReportingPeriod
 
 # =========================================================
 # API ENDPOINTS FOR QUESTIONS MANAGER
@@ -371,7 +369,7 @@ class UnitManagerView(LoginRequiredMixin, View):
 # =========================================================
 # PLANT MONTHLY ENTRY
 # =========================================================
-from decimal import Decimal  # <-- add this
+from decimal import InvalidOperation  # <-- add this
 
 class PlantMonthlyEntryView(LoginRequiredMixin, View):
     template_name = "data_collection/data_env.html"
@@ -393,6 +391,14 @@ class PlantMonthlyEntryView(LoginRequiredMixin, View):
             return self.get_user_plants(request).filter(id=plant_id).first()
         return self.get_user_plants(request).first()
 
+    def get_selected_year(self, request):
+        """Calendar year being entered (?year= on GET, selected_year on POST)"""
+        year = request.GET.get('year') or request.POST.get('selected_year')
+        current_year = datetime.now().year
+        if year and year.isdigit() and 2000 <= int(year) <= current_year:
+            return int(year)
+        return current_year
+
     def get_questions(self):
         return EnvironmentalQuestion.objects.filter(
             is_active=True
@@ -429,7 +435,7 @@ class PlantMonthlyEntryView(LoginRequiredMixin, View):
                 "no_questions": True,
             })
 
-        current_year = datetime.now().year
+        current_year = self.get_selected_year(request)
 
         # Get auto-populated data
         auto_data = EnvironmentalDataFetcher.get_data_for_plant_year(selected_plant, current_year)
@@ -437,17 +443,24 @@ class PlantMonthlyEntryView(LoginRequiredMixin, View):
         # Fetch saved monthly data
         saved_data = MonthlyIndicatorData.objects.filter(
             plant=selected_plant,
+            year=current_year,
             indicator__isnull=False,
             indicator__source_type='MANUAL'  # only manual data
         ).select_related('indicator', 'unit')
         
+        attachments_dict = {}
+        for att in MonthlyIndicatorAttachment.objects.filter(plant=selected_plant, year=current_year):
+            attachments_dict[(att.indicator_id, att.month)] = att
+
         # Organize saved data including units
         saved_dict = {}
         for d in saved_data:
             if d.indicator not in saved_dict:
                 saved_dict[d.indicator] = {}
             saved_dict[d.indicator][d.month.lower()] = {
-                'value': d.value,
+                # The number as entered in the row's unit; value is the converted base
+                # value and would be converted again on the next save
+                'value': f"{d.entered_value.normalize():f}" if d.entered_value is not None else d.value,
                 'unit': d.unit  # Store the Unit object
             }
 
@@ -493,9 +506,6 @@ class PlantMonthlyEntryView(LoginRequiredMixin, View):
                     if unit.name == saved_unit_name:
                         saved_unit_id = unit.id
                         break
-                attachments_dict = {}
-                for att in MonthlyIndicatorAttachment.objects.filter(plant=selected_plant).select_related('indicator'):
-                    attachments_dict[(att.indicator_id, att.month)] = att
 
                 month_rows.append({
                     "code": month_code,
@@ -524,6 +534,7 @@ class PlantMonthlyEntryView(LoginRequiredMixin, View):
             "questions_with_data": questions_with_data,
             "months": MONTHS,
             "current_year": current_year,
+            "year_choices": ReportingPeriod.year_choices(),
             "total_questions": len(questions_with_data),
             "auto_populated_count": sum(1 for q in questions_with_data if q['is_auto_populated']),
             "manual_entry_count": len(questions_with_data) - sum(1 for q in questions_with_data if q['is_auto_populated']),
@@ -543,69 +554,106 @@ class PlantMonthlyEntryView(LoginRequiredMixin, View):
             messages.error(request, "Invalid plant selected")
             return redirect("environmental:plant-entry")
 
-        questions = self.get_questions()
+        questions = [q for q in self.get_questions() if q.source_type == 'MANUAL']
         MONTHS = MonthlyIndicatorData.MONTH_CHOICES
         saved_count = 0
 
+        # Collect submitted values and load everything the diff needs up front
+        submitted = []
+        unit_ids = set()
         for q in questions:
-            # Skip auto-calculated questions
-            if q.source_type != 'MANUAL':
-                continue
-
             slug = self.slugify_field(q.question_text)
-            default_unit = q.default_unit  # fallback Unit object
             for month_code, month_name in MONTHS:
-                value_field = f"{slug}_{month_code.lower()}"
-                unit_field = f"{slug}_{month_code.lower()}_unit"
-
-                value = (request.POST.get(value_field) or "").strip()
-                selected_unit_id = request.POST.get(unit_field)
-
-                # Determine selected Unit object
-                unit_obj = default_unit
-                if selected_unit_id:
-                    try:
-                        unit_obj = Unit.objects.get(id=selected_unit_id)
-                    except Unit.DoesNotExist:
-                        unit_obj = default_unit
-
-                # Delete if value empty
-                if not value:
-                    MonthlyIndicatorData.objects.filter(
-                        plant=selected_plant,
-                        indicator=q,
-                        month=month_code
-                    ).delete()
-                    continue
+                value = (request.POST.get(f"{slug}_{month_code.lower()}") or "").strip()
+                selected_unit_id = request.POST.get(f"{slug}_{month_code.lower()}_unit")
+                if selected_unit_id and selected_unit_id.isdigit():
+                    unit_ids.add(int(selected_unit_id))
+                submitted.append((q, month_code, month_name, value, selected_unit_id))
+
+        units = Unit.objects.in_bulk(unit_ids)
+
+        existing = {}
+        duplicate_ids = []
+        selected_year = self.get_selected_year(request)
+        for row in MonthlyIndicatorData.objects.filter(plant=selected_plant, year=selected_year, indicator__in=questions):
+            key = (row.indicator_id, row.month)
+            if key in existing:
+                duplicate_ids.append(row.id)
+            else:
+                existing[key] = row
 
-                try:
-                    # Convert input string to float first to handle decimals entered by user
-                    raw_numeric_value = float(value.replace(",", ""))
-
-                    # Apply conversion rate if the unit is not the base unit
-                    if unit_obj and unit_obj.base_unit != unit_obj.name:
-                        raw_numeric_value = raw_numeric_value * float(unit_obj.conversion_rate)
-
-                    # ✅ Convert to Integer by rounding to the nearest whole number
-                    # This ensures that 10.5 becomes 11 and 10.4 becomes 10
-                    final_integer_value = int(round(raw_numeric_value))
-
-                    obj, created = MonthlyIndicatorData.objects.update_or_create(
-                        plant=selected_plant,
-                        indicator=q,
-                        month=month_code,
-                        defaults={
-                            "value": str(final_integer_value),  # Save as string integer
-                            "unit": unit_obj,
-                            "created_by": request.user,
-                        }
-                    )
-                    saved_count += 1
+        to_create = []
+        to_update = []
+        delete_ids = list(duplicate_ids)
+        now = timezone.now()
+
+        for q, month_code, month_name, value, selected_unit_id in submitted:
+            row = existing.get((q.id, month_code))
+
+            # Delete if value empty
+            if not value:
+                if row:
+                    delete_ids.append(row.id)
+                continue
+
+            # Determine selected Unit object
+            unit_obj = q.default_unit
+            if selected_unit_id and selected_unit_id.isdigit():
+                unit_obj = units.get(int(selected_unit_id), q.default_unit)
+
+            entered_value = MonthlyIndicatorData.parse_number(value)
+            try:
+                if entered_value is None:
+                    raise ValueError(value)
+
+                # Apply conversion rate if the unit is not the base unit
+                base_value = MonthlyIndicatorData.to_base_value(entered_value, unit_obj)
+                entered_value = entered_value.quantize(VALUE_PRECISION)
+
+                # ✅ Display value is the base value rounded to the nearest whole number
+                final_value = str(int(round(base_value)))
+            except (ValueError, TypeError, InvalidOperation):
+                messages.warning(request, f"Invalid value for {q.question_text} in {month_name}")
+                continue
+
+            saved_count += 1
+            unit_id = unit_obj.id if unit_obj else None
+
+            if row is None:
+                to_create.append(MonthlyIndicatorData(
+                    plant=selected_plant,
+                    indicator=q,
+                    year=selected_year,
+                    month=month_code,
+                    value=final_value,
+                    entered_value=entered_value,
+                    base_value=base_value,
+                    unit_id=unit_id,
+                    created_by=request.user,
+                ))
+            elif (row.entered_value != entered_value or row.base_value != base_value
+                  or row.value != final_value or row.unit_id != unit_id):
+                row.value = final_value
+                row.entered_value = entered_value
+                row.base_value = base_value
+                row.unit_id = unit_id
+                row.created_by = request.user
+                row.updated_at = now
+                to_update.append(row)
+
+        with transaction.atomic():
+            if delete_ids:
+                MonthlyIndicatorData.objects.filter(id__in=delete_ids).delete()
+            if to_update:
+                MonthlyIndicatorData.objects.bulk_update(
+                    to_update, ["value", "entered_value", "base_value", "unit", "created_by", "updated_at"], batch_size=500
+                )
+            if to_create:
+                MonthlyIndicatorData.objects.bulk_create(to_create, batch_size=500)
+
+        if delete_ids or to_update or to_create:
+            invalidate_environmental_matrix([(selected_plant.id, selected_year)])
 
-                except (ValueError, TypeError):
-                    messages.warning(request, f"Invalid value for {q.question_text} in {month_name}")
-                    continue
-                
         if saved_count > 0:
             NotificationService.notify(
                 content_object=selected_plant,
@@ -614,7 +662,7 @@ class PlantMonthlyEntryView(LoginRequiredMixin, View):
             )
 
         messages.success(request, f"✓ Data saved successfully! {saved_count} entries updated for {selected_plant.name}")
-        return redirect(f"{request.path}?plant_id={selected_plant.id}&saved=1")
+        return redirect(f"{request.path}?plant_id={selected_plant.id}&year={selected_year}&saved=1")
 
 
 
@@ -670,185 +718,98 @@ class EnvironmentalQuestionsManagerView(LoginRequiredMixin, View):
         # Default redirect if no action matches
         return redirect("environmental:questions-manager")
 
+    def describe_filter(self, field, value):
+        """Human-readable value for one filter condition"""
+        from apps.accidents.models import IncidentType
+
+        # ✅ Handle different field types
+        if field == 'incident_type':
+            try:
+                incident_type = IncidentType.objects.get(id=value)
+                return f"{incident_type.code} - {incident_type.name}"
+            except (IncidentType.DoesNotExist, ValueError):
+                return value
+
+        elif field == 'hazard_type':
+            try:
+                from apps.hazards.models import HazardType
+                hazard_type = HazardType.objects.get(id=value)
+                return f"{hazard_type.code} - {hazard_type.name}"
+            except:
+                return value
+
+        elif field == 'template':
+            try:
+                from apps.inspections.models import InspectionTemplate
+                template = InspectionTemplate.objects.get(id=value)
+                return f"{template.template_code} - {template.template_name}"
+            except:
+                return value
+
+        elif field == 'inspection_type':
+            # Map inspection type codes to display names
+            from apps.inspections.models import InspectionTemplate
+            inspection_type_map = dict(InspectionTemplate.INSPECTION_TYPE_CHOICES)
+            return inspection_type_map.get(value, value)
+
+        elif field == 'assigned_to':
+            try:
+                from django.contrib.auth import get_user_model
+                User = get_user_model()
+                return User.objects.get(id=value).get_full_name()
+            except:
+                return value
+
+        elif field == 'status':
+            # Map status codes to display names
+            status_map = {
+                'REPORTED': 'Reported',
+                'UNDER_INVESTIGATION': 'Under Investigation',
+                'ACTION_IN_PROGRESS': 'Action In Progress',
+                'COMPLETED': 'Completed',
+                'CLOSED': 'Closed',
+                'OPEN': 'Open',
+                'IN_PROGRESS': 'In Progress',
+                'RESOLVED': 'Resolved',
+                'SCHEDULED': 'Scheduled',
+                'OVERDUE': 'Overdue',
+                'CANCELLED': 'Cancelled',
+            }
+            return status_map.get(value, value)
+
+        elif field == 'severity':
+            severity_map = {
+                'LOW': 'Low',
+                'MEDIUM': 'Medium',
+                'HIGH': 'High',
+                'CRITICAL': 'Critical',
+            }
+            return severity_map.get(value, value)
+
+        elif field == 'plant':
+            try:
+                return Plant.objects.get(id=value).name
+            except (Plant.DoesNotExist, ValueError):
+                return value
+
+        return value
+
     def load_questions(self):
         """Load questions with human-readable filter descriptions"""
-        from apps.accidents.models import IncidentType
-        
         questions_list = []
         for q in EnvironmentalQuestion.objects.filter(is_active=True).order_by("is_system", "order", "id"):
             selected_units = q.selected_units.all()
             
             filter_desc = ""
             if q.filter_field and q.filter_value:
-                # Get human-readable filter description
-                filter_field_name = q.get_filter_field_display() if hasattr(q, 'get_filter_field_display') else q.filter_field
-                
-                # ✅ Handle different field types
-                if q.filter_field == 'incident_type':
-                    try:
-                        incident_type = IncidentType.objects.get(id=q.filter_value)
-                        filter_value_display = f"{incident_type.code} - {incident_type.name}"
-                    except IncidentType.DoesNotExist:
-                        filter_value_display = q.filter_value
-                
-                elif q.filter_field == 'hazard_type':
-                    try:
-                        from apps.hazards.models import HazardType
-                        hazard_type = HazardType.objects.get(id=q.filter_value)
-                        filter_value_display = f"{hazard_type.code} - {hazard_type.name}"
-                    except:
-                        filter_value_display = q.filter_value
-                
-                # ========================================
-                # ⬇️ ADD THIS NEW SECTION FOR INSPECTION
-                # ========================================
-                elif q.filter_field == 'template':
-                    try:
-                        from apps.inspections.models import InspectionTemplate
-                        template = InspectionTemplate.objects.get(id=q.filter_value)
-                        filter_value_display = f"{template.template_code} - {template.template_name}"
-                    except:
-                        filter_value_display = q.filter_value
-                
-                elif q.filter_field == 'inspection_type':
-                    # Map inspection type codes to display names
-                    from apps.inspections.models import InspectionTemplate
-                    inspection_type_map = dict(InspectionTemplate.INSPECTION_TYPE_CHOICES)
-                    filter_value_display = inspection_type_map.get(q.filter_value, q.filter_value)
-                
-                elif q.filter_field == 'assigned_to':
-                    try:
-                        from django.contrib.auth import get_user_model
-                        User = get_user_model()
-                        user = User.objects.get(id=q.filter_value)
-                        filter_value_display = user.get_full_name()
-                    except:
-                        filter_value_display = q.filter_value
-                # ========================================
-                # ⬆️ END OF INSPECTION SECTION
-                # ========================================
-                
-                elif q.filter_field == 'status':
-                    # Map status codes to display names
-                    status_map = {
-                        'REPORTED': 'Reported',
-                        'UNDER_INVESTIGATION': 'Under Investigation',
-                        'ACTION_IN_PROGRESS': 'Action In Progress',
-                        'COMPLETED': 'Completed',
-                        'CLOSED': 'Closed',
-                        'OPEN': 'Open',
-                        'IN_PROGRESS': 'In Progress',
-                        'RESOLVED': 'Resolved',
-                        'SCHEDULED': 'Scheduled',  # ⬅️ ADD THIS
-                        'OVERDUE': 'Overdue',      # ⬅️ ADD THIS
-                        'CANCELLED': 'Cancelled',  # ⬅️ ADD THIS
-                    }
-                    filter_value_display = status_map.get(q.filter_value, q.filter_value)
-                
-                elif q.filter_field == 'severity':
-                    severity_map = {
-                        'LOW': 'Low',
-                        'MEDIUM': 'Medium',
-                        'HIGH': 'High',
-                        'CRITICAL': 'Critical',
-                    }
-                    filter_value_display = severity_map.get(q.filter_value, q.filter_value)
-                
-                elif q.filter_field == 'plant':
-                    try:
-                        plant = Plant.objects.get(id=q.filter_value)
-                        filter_value_display = plant.name
-                    except Plant.DoesNotExist:
-                        filter_value_display = q.filter_value
-                
-                else:
-                    filter_value_display = q.filter_value
-                
-                filter_desc = f"{filter_field_name} = {filter_value_display}"
-                
-                # ✅ Secondary filter (same logic)
-                if q.filter_field_2 and q.filter_value_2:
-                    filter_field_2_name = q.get_filter_field_2_display() if hasattr(q, 'get_filter_field_2_display') else q.filter_field_2
-                    
-                    if q.filter_field_2 == 'incident_type':
-                        try:
-                            incident_type_2 = IncidentType.objects.get(id=q.filter_value_2)
-                            filter_value_2_display = f"{incident_type_2.code} - {incident_type_2.name}"
-                        except IncidentType.DoesNotExist:
-                            filter_value_2_display = q.filter_value_2
-                    
-                    elif q.filter_field_2 == 'hazard_type':
-                        try:
-                            from apps.hazards.models import HazardType
-                            hazard_type_2 = HazardType.objects.get(id=q.filter_value_2)
-                            filter_value_2_display = f"{hazard_type_2.code} - {hazard_type_2.name}"
-                        except:
-                            filter_value_2_display = q.filter_value_2
-                    
-                    # ========================================
-                    # ⬇️ ADD THIS FOR SECONDARY INSPECTION FILTER
-                    # ========================================
-                    elif q.filter_field_2 == 'template':
-                        try:
-                            from apps.inspections.models import InspectionTemplate
-                            template_2 = InspectionTemplate.objects.get(id=q.filter_value_2)
-                            filter_value_2_display = f"{template_2.template_code} - {template_2.template_name}"
-                        except:
-                            filter_value_2_display = q.filter_value_2
-                    
-                    elif q.filter_field_2 == 'inspection_type':
-                        from apps.inspections.models import InspectionTemplate
-                        inspection_type_map = dict(InspectionTemplate.INSPECTION_TYPE_CHOICES)
-                        filter_value_2_display = inspection_type_map.get(q.filter_value_2, q.filter_value_2)
-                    
-                    elif q.filter_field_2 == 'assigned_to':
-                        try:
-                            from django.contrib.auth import get_user_model
-                            User = get_user_model()
-                            user_2 = User.objects.get(id=q.filter_value_2)
-                            filter_value_2_display = user_2.get_full_name()
-                        except:
-                            filter_value_2_display = q.filter_value_2
-                    # ========================================
-                    # ⬆️ END OF SECONDARY INSPECTION FILTER
-                    # ========================================
-                    
-                    elif q.filter_field_2 == 'status':
-                        status_map = {
-                            'REPORTED': 'Reported',
-                            'UNDER_INVESTIGATION': 'Under Investigation',
-                            'ACTION_IN_PROGRESS': 'Action In Progress',
-                            'COMPLETED': 'Completed',
-                            'CLOSED': 'Closed',
-                            'OPEN': 'Open',
-                            'IN_PROGRESS': 'In Progress',
-                            'RESOLVED': 'Resolved',
-                            'SCHEDULED': 'Scheduled',
-                            'OVERDUE': 'Overdue',
-                            'CANCELLED': 'Cancelled',
-                        }
-                        filter_value_2_display = status_map.get(q.filter_value_2, q.filter_value_2)
-                    
-                    elif q.filter_field_2 == 'severity':
-                        severity_map = {
-                            'LOW': 'Low',
-                            'MEDIUM': 'Medium',
-                            'HIGH': 'High',
-                            'CRITICAL': 'Critical',
-                        }
-                        filter_value_2_display = severity_map.get(q.filter_value_2, q.filter_value_2)
-                    
-                    elif q.filter_field_2 == 'plant':
-                        try:
-                            plant_2 = Plant.objects.get(id=q.filter_value_2)
-                            filter_value_2_display = plant_2.name
-                        except Plant.DoesNotExist:
-                            filter_value_2_display = q.filter_value_2
-                    
-                    else:
-                        filter_value_2_display = q.filter_value_2
-                    
-                    filter_desc += f" AND {filter_field_2_name} = {filter_value_2_display}"
+                # Different fields are ANDed, repeats of one field ORed (see filters.py)
+                described = {}
+                for field, value in q.get_filter_conditions():
+                    if field and value:
+                        described.setdefault(field, []).append(self.describe_filter(field, value))
+                filter_desc = " AND ".join(
+                    f"{field} = {' OR '.join(values)}" for field, values in described.items()
+                )
             
             questions_list.append({
                 "id": q.id,
@@ -865,6 +826,25 @@ class EnvironmentalQuestionsManagerView(LoginRequiredMixin, View):
             })
         return questions_list
 
+    def get_posted_filters(self, request):
+        """
+        Filter fields submitted by the form. Additional conditions arrive as
+        parallel filter_conditions_field[] / filter_conditions_value[] lists.
+        """
+        fields = request.POST.getlist("filter_conditions_field[]")
+        values = request.POST.getlist("filter_conditions_value[]")
+        return {
+            "filter_field": (request.POST.get("filter_field") or "").strip() or None,
+            "filter_value": (request.POST.get("filter_value") or "").strip() or None,
+            "filter_field_2": (request.POST.get("filter_field_2") or "").strip() or None,
+            "filter_value_2": (request.POST.get("filter_value_2") or "").strip() or None,
+            "filter_conditions": [
+                {"field": field.strip(), "value": value.strip()}
+                for field, value in zip(fields, values)
+                if field.strip() and value.strip()
+            ],
+        }
+
     def add_question(self, request):
         # Yeh function aapke existing code jaisa hi rahega
         question_text = (request.POST.get("question_text") or "").strip()
@@ -874,10 +854,7 @@ class EnvironmentalQuestionsManagerView(LoginRequiredMixin, View):
         source_type = request.POST.get("source_type", "MANUAL")
         
         # Dynamic filter fields
-        filter_field = (request.POST.get("filter_field") or "").strip()
-        filter_value = (request.POST.get("filter_value") or "").strip()
-        filter_field_2 = (request.POST.get("filter_field_2") or "").strip()
-        filter_value_2 = (request.POST.get("filter_value_2") or "").strip()
+        filters = self.get_posted_filters(request)
         
         # Validation
         if not question_text:
@@ -891,7 +868,7 @@ class EnvironmentalQuestionsManagerView(LoginRequiredMixin, View):
 
         # For auto-calculated questions
         if source_type != 'MANUAL':
-            if not filter_field or not filter_value:
+            if not filters["filter_field"] or not filters["filter_value"]:
                 messages.error(request, "Primary filter field and value are required")
                 return redirect("environmental:questions-manager")
 
@@ -923,20 +900,24 @@ class EnvironmentalQuestionsManagerView(LoginRequiredMixin, View):
             max=models.Max("order")
         )["max"] or 0
 
-        question = EnvironmentalQuestion.objects.create(
+        question = EnvironmentalQuestion(
             question_text=question_text,
             unit_category_id=category_id if category_id else None,
             default_unit_id=default_unit_id if default_unit_id else None,
             source_type=source_type,
-            filter_field=filter_field if filter_field else None,
-            filter_value=filter_value if filter_value else None,
-            filter_field_2=filter_field_2 if filter_field_2 else None,
-            filter_value_2=filter_value_2 if filter_value_2 else None,
             order=max_order + 1,
             created_by=request.user,
             is_active=True,
             is_system=False,
+            **filters,
         )
+        try:
+            # Rejects filter fields the source model cannot be filtered on
+            question.clean()
+            question.save()
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("environmental:questions-manager")
         
         selected_unit_ids = request.POST.getlist("selected_unit_ids[]")
         if selected_unit_ids:
@@ -979,10 +960,26 @@ class EnvironmentalQuestionsManagerView(LoginRequiredMixin, View):
         question.unit_category_id = category_id if category_id else None
         question.default_unit_id = default_unit_id if default_unit_id else None
         question.source_type = source_type
-        # ... (Update other fields like filter_field, etc. as needed)
+
+        # Filters only apply to auto-calculated questions
+        filters = self.get_posted_filters(request)
+        if source_type != 'MANUAL':
+            if not filters["filter_field"] or not filters["filter_value"]:
+                messages.error(request, "Primary filter field and value are required")
+                return redirect("environmental:questions-manager-edit", question_id=question.id)
+        else:
+            filters = dict.fromkeys(filters, None)
+            filters["filter_conditions"] = []
+        for field, value in filters.items():
+            setattr(question, field, value)
         
-        # Save the changes to the database
-        question.save()
+        # Save the changes to the database (filters are re-validated for the source type)
+        try:
+            question.clean()
+            question.save()
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
+            return redirect("environmental:questions-manager-edit", question_id=question.id)
 
         # Update the many-to-many relationship for selected units
         if selected_unit_ids:
@@ -1110,7 +1107,6 @@ class GetCategoryUnitsAPIView(LoginRequiredMixin, View):
 # =========================================================
 # VIEW SUBMITTED DATA - USER VIEW (Read-only)
 # =========================================================
-from decimal import Decimal
 
 class PlantDataDisplayView(LoginRequiredMixin, View):
     template_name = "data_collection/data_display.html"
@@ -1142,106 +1138,52 @@ class PlantDataDisplayView(LoginRequiredMixin, View):
             is_active=True
         ).select_related('unit_category', 'default_unit').order_by("is_system", "order", "id")
 
-        MONTHS = MonthlyIndicatorData.MONTH_CHOICES
+        period = ReportingPeriod.from_request(request)
+        positions = period.index_by_code()
 
-        # Manual data
-        saved_data = MonthlyIndicatorData.objects.filter(
-            plant=plant
-        ).select_related('indicator')
-
-        manual_dict = {}
-        for d in saved_data:
-            if not d.indicator_id:
-                continue
-            manual_dict.setdefault(d.indicator_id, {})
-            manual_dict[d.indicator_id][d.month] = d.value
+        # Manual + auto values for the period (cached per period)
+        matrix = get_period_matrix(period, [plant])
 
         # ✅ START: Fetch Attachments efficiently
-        attachments = MonthlyIndicatorAttachment.objects.filter(plant=plant).select_related('indicator')
+        attachments = MonthlyIndicatorAttachment.objects.filter(plant=plant).filter(period.month_filter())
         attachments_dict = {}
         for att in attachments:
-            attachments_dict.setdefault(att.indicator_id, {})
-            attachments_dict[att.indicator_id][att.month] = att
+            attachments_dict[(att.indicator_id, positions[(att.year, att.month)])] = att
         # ✅ END: Fetch Attachments efficiently
 
         # Build display structure
         questions_data = []
         for q in questions:
             default_unit_name = q.default_unit.name if q.default_unit else "Count"
-            
-            month_values = []
-            total = Decimal("0")
-            has_values = False
-            
-            for month_code, month_name in MONTHS:
-
-                value = None
-                # ✅ Get the attachment for this cell
-                attachment = attachments_dict.get(q.id, {}).get(month_code)
-
-                # MANUAL QUESTION
-                if q.source_type == "MANUAL":
-                    value = manual_dict.get(q.id, {}).get(month_code)
+            is_auto = q.source_type in AUTO_SOURCE_TYPES
 
-                # AUTOMATIC QUESTION
-                else:
-                    start_date = datetime(datetime.now().year, 
-                                          datetime.strptime(month_code, "%b").month, 1)
-                    
-                    if month_code == "DEC":
-                        end_date = datetime(datetime.now().year + 1, 1, 1)
-                    else:
-                        next_month = datetime.strptime(month_code, "%b").month + 1
-                        end_date = datetime(datetime.now().year, next_month, 1)
-
-                    model_map = {
-                        "INCIDENT": Incident,
-                        "HAZARD": Hazard,
-                        "INSPECTION": InspectionSchedule,
-                    }
-
-                    model = model_map.get(q.source_type)
-
-                    if model:
-                        filters = {
-                            "plant": plant,
-                            "created_at__gte": start_date,
-                            "created_at__lt": end_date,
-                        }
-
-                        if q.filter_field and q.filter_value:
-                            filters[q.filter_field] = q.filter_value
-
-                        if q.filter_field_2 and q.filter_value_2:
-                            filters[q.filter_field_2] = q.filter_value_2
+            month_values = []
+            for index, value in enumerate(matrix["values"].get((plant.id, q.id), [None] * 12)):
+                if is_auto and value is None:
+                    value = 0
 
-                        value = model.objects.filter(**filters).count()
-                
                 # ✅ Store value AND attachment together
                 month_values.append({
                     "value": value if value not in [None, ""] else "-",
-                    "attachment": attachment
+                    "attachment": attachments_dict.get((q.id, index))
                 })
 
-                if value not in [None, "", "-"]:
-                    try:
-                        total += Decimal(str(value))
-                        has_values = True
-                    except (ValueError, TypeError):
-                        pass
-            
+            # Period total: summed in the database for manual, from the rollup for auto
+            total = matrix["totals"].get((plant.id, q.id), 0 if is_auto else None)
+
             questions_data.append({
                 "question": q.question_text,
                 "unit": default_unit_name,
                 "month_values": month_values,
-                "annual": f"{total}" if has_values else '-',
+                "annual": format_indicator_total(total),
             })
 
         context = {
             "plant": plant,
             "user_plants": user_plants,
             "questions_data": questions_data,
-            "months": MONTHS,
+            "months": period.month_choices,
+            **period.get_context(),
         }
 
         return render(request, self.template_name, context)
@@ -1278,28 +1220,19 @@ class AdminAllPlantsDataView(LoginRequiredMixin, View):
         if not questions.exists():
             return render(request, self.template_name, {"no_questions": True})
 
-        # ALL indicator data (queried once)
-        all_data = MonthlyIndicatorData.objects.filter(
-            indicator__isnull=False
-        ).select_related("plant", "indicator")
+        period = ReportingPeriod.from_request(request)
+        positions = period.index_by_code()
+        MONTHS = period.month_choices
 
         # ✅ START: Fetch ALL attachments efficiently
-        all_attachments = MonthlyIndicatorAttachment.objects.select_related("plant", "indicator")
+        all_attachments = MonthlyIndicatorAttachment.objects.filter(period.month_filter())
         attachments_dict = {}
         for att in all_attachments:
-            attachments_dict.setdefault(att.plant_id, {})
-            attachments_dict[att.plant_id].setdefault(att.indicator_id, {})
-            attachments_dict[att.plant_id][att.indicator_id][att.month] = att
+            attachments_dict[(att.plant_id, att.indicator_id, positions[(att.year, att.month)])] = att
         # ✅ END: Fetch ALL attachments efficiently
 
-        # Organize manual data in dictionary for performance
-        manual_dict = {}
-        for d in all_data:
-            manual_dict.setdefault(d.plant_id, {})
-            manual_dict[d.plant_id].setdefault(d.indicator_id, {})
-            manual_dict[d.plant_id][d.indicator_id][d.month] = d.value
-
-        MONTHS = MonthlyIndicatorData.MONTH_CHOICES
+        # Manual + auto values for every plant over the period (cached per period)
+        matrix = get_period_matrix(period, all_plants)
 
         plants_data = []
 
@@ -1308,71 +1241,29 @@ class AdminAllPlantsDataView(LoginRequiredMixin, View):
 
             for q in questions:
                 unit_name = q.default_unit.name if q.default_unit else "Count"
+                is_auto = q.source_type in AUTO_SOURCE_TYPES
+                values = matrix["values"].get((plant.id, q.id), [None] * 12)
                 month_data = {}
-                total = 0
-                has_values = False
-
-                for month_code, month_name in MONTHS:
-                    value = None
-                    # ✅ Get attachment for this cell
-                    attachment = attachments_dict.get(plant.id, {}).get(q.id, {}).get(month_code)
-
-                    # MANUAL QUESTION
-                    if q.source_type == "MANUAL":
-                        value = manual_dict.get(plant.id, {}).get(q.id, {}).get(month_code)
-                    # AUTOMATIC QUESTION
-                    else:
-                        # ... (automatic question logic remains the same) ...
-                        start_date = datetime(datetime.now().year,
-                                              datetime.strptime(month_code, "%b").month, 1)
-
-                        if month_code == "DEC":
-                            end_date = datetime(datetime.now().year + 1, 1, 1)
-                        else:
-                            next_month = datetime.strptime(month_code, "%b").month + 1
-                            end_date = datetime(datetime.now().year, next_month, 1)
-
-                        model_map = {
-                            "INCIDENT": Incident,
-                            "HAZARD": Hazard,
-                            "INSPECTION": InspectionSchedule,
-                        }
-
-                        model = model_map.get(q.source_type)
-
-                        if model:
-                            filters = {
-                                "plant": plant,
-                                "created_at__gte": start_date,
-                                "created_at__lt": end_date,
-                            }
 
-                            if q.filter_field and q.filter_value:
-                                filters[q.filter_field] = q.filter_value
+                for index, (month_code, month_name) in enumerate(MONTHS):
+                    value = values[index]
+                    if is_auto and value is None:
+                        value = 0
 
-                            if q.filter_field_2 and q.filter_value_2:
-                                filters[q.filter_field_2] = q.filter_value_2
-
-                            value = model.objects.filter(**filters).count()
-                    
                     # ✅ Store value and attachment together
                     month_data[month_name] = {
                         "value": value if value not in [None, ""] else "-",
-                        "attachment": attachment
+                        "attachment": attachments_dict.get((plant.id, q.id, index))
                     }
 
-                    if value not in [None, "", "-"]:
-                        try:
-                            total += Decimal(str(value))
-                            has_values = True
-                        except Exception:
-                            pass
+                # Period total: summed in the database for manual, from the rollup for auto
+                total = matrix["totals"].get((plant.id, q.id), 0 if is_auto else None)
 
                 plant_questions_data.append({
                     "question": q.question_text,
                     "unit": unit_name,
                     "month_data": month_data,
-                    "annual": f"{total}" if has_values else "-",
+                    "annual": format_indicator_total(total),
                 })
 
             plants_data.append({
@@ -1385,6 +1276,7 @@ class AdminAllPlantsDataView(LoginRequiredMixin, View):
             "months": [m[1] for m in MONTHS],
             "total_plants": all_plants.count(),
             "total_questions": questions.count(),
+            **period.get_context(),
         }
 
         return render(request, self.template_name, context)
@@ -1450,133 +1342,92 @@ class EnvironmentalDashboardView(LoginRequiredMixin, TemplateView):
         selected_month_code = self.request.GET.get('month')
         if selected_plant_id:
             accessible_plants = accessible_plants.filter(id=selected_plant_id)        
-        questions = EnvironmentalQuestion.objects.filter(is_active=True)
-
-        # --- 3. BASE DATA QUERYSET (Filter by accessible plants first) ---
-        # Optimization: select_related to avoid N+1 queries on SQLite
+        questions = list(
+            EnvironmentalQuestion.objects.filter(is_active=True).select_related('unit_category')
+        )
+        plants = list(accessible_plants)
+        period = ReportingPeriod.from_request(self.request)
+        month_choices = period.month_choices
+        selected_months = [
+            (index, month_code)
+            for index, (month_code, month_name) in enumerate(month_choices)
+            if not selected_month_code or month_code == selected_month_code
+        ]
+
+        # --- 3. PERIOD MATRIX (cached; fixed query count regardless of plants) ---
+        matrix = get_period_matrix(period, plants)
+        empty = [None] * 12
+
+        # --- 4. SINGLE PASS: table rows, statistics and chart series ---
         data_qs = []
-        current_year = datetime.now().year
-        month_choices = MonthlyIndicatorData.MONTH_CHOICES
-        updated_at = None
-        for plant in accessible_plants:
-            for q in questions:
-                for month_code, month_name in month_choices:
+        total_vol = 0
+        cat_counter = Counter()
+        trend_counter = Counter()
 
-                    # Apply user-selected filters
-                    if selected_month_code and month_code != selected_month_code:
+        for plant in plants:
+            for q in questions:
+                if q.source_type != "MANUAL" and q.source_type not in AUTO_SOURCE_TYPES:
+                    continue
+                category = q.unit_category.name if q.unit_category else "Other"
+                key = (plant.id, q.id)
+                values = matrix["values"].get(key, empty)
+                numbers = matrix["numbers"].get(key, empty)
+                updated = matrix["updated"].get(key, empty)
+
+                for index, month_code in selected_months:
+                    value = values[index]
+                    if value in [None, "", 0]:
                         continue
-                    value = None
-                    if q.source_type == "MANUAL":
-                        manual_entry = MonthlyIndicatorData.objects.filter(
-                            plant=plant,
-                            indicator=q,
-                            month=month_code
-                        ).first()
-
-                        if manual_entry:
-                            value = manual_entry.value
-                            updated_at = manual_entry.updated_at
-                        else:
-                            updated_at = None
-
-                    else:
-                        month_number = datetime.strptime(month_code, "%b").month
-
-                        start_date = datetime(current_year, month_number, 1)
-
-                        if month_number == 12:
-                            end_date = datetime(current_year + 1, 1, 1)
-                        else:
-                            end_date = datetime(current_year, month_number + 1, 1)
-
-                        model_map = {"INCIDENT": Incident,"HAZARD": Hazard,"INSPECTION": InspectionSchedule,}
-
-                        model = model_map.get(q.source_type)
-
-                        if model:
-                            filters = {"plant": plant,"created_at__gte": start_date,"created_at__lt": end_date,}
-
-                            if q.filter_field and q.filter_value:
-                                filters[q.filter_field] = q.filter_value
-
-                            if q.filter_field_2 and q.filter_value_2:
-                                filters[q.filter_field_2] = q.filter_value_2
-
-                            value = model.objects.filter(**filters).count()
 
-                    if value not in [None, "", 0]:
-                        data_qs.append({"plant": plant,"indicator": q,"month": month_code,"value": value,"updated_at":updated_at,"category": q.unit_category.name if q.unit_category else "Other"})
+                    data_qs.append({"plant": plant,"indicator": q,"month": month_code,"value": value,"updated_at":updated[index],"category": category})
+                    cat_counter[category] += 1
+                    trend_counter[month_code] += 1
+                    total_vol += numbers[index] or 0
 
-
-        # --- 4. CALCULATE STATISTICS (Based on Filtered Data) ---
-        context['total_indicators_count'] = questions.count()
+        context['total_indicators_count'] = len(questions)
         context['total_data_points'] = len(data_qs)
-        context['plants_count'] = accessible_plants.count()
-        
-        # Sum of numeric values (Safe conversion for SQLite)
-        total_vol = 0
-        for entry in data_qs:
-            try:
-                total_vol += float(entry["value"])
-            except (ValueError, TypeError):
-                continue
-        context['total_volume'] = total_vol
+        context['plants_count'] = len(plants)
+        context['total_volume'] = float(total_vol)
 
         # --- 5. PREPARE CHARTS (JSON format) ---
         # Category Chart
-        cat_counter = Counter([e["category"] for e in data_qs])
         context['cat_labels_json'] = json.dumps(list(cat_counter.keys()))
         context['cat_data_json'] = json.dumps(list(cat_counter.values()))
 
         # --- 6. DATA TABLE (Show ALL filtered data) ---
         context['data_entries'] = sorted(data_qs,key=lambda x: (x["plant"].name, x["indicator"].order))
         month_order = [m[0] for m in month_choices]
-        trend_counter = Counter([e["month"] for e in data_qs])
         context['trend_labels_json'] = json.dumps([dict(month_choices).get(m) for m in month_order])
         context['trend_values_json'] = json.dumps([trend_counter.get(m, 0) for m in month_order])
 
         # --- 7. FILTER OPTIONS ---
         # context['plants'] = Plant.objects.filter(is_active=True)
-        context['plants'] = accessible_plants 
+        context['plants'] = plants
         context['month_choices'] = month_choices
         context['selected_plant'] = selected_plant_id
         context['selected_month'] = selected_month_code
         context['has_active_filters'] = bool(selected_plant_id or selected_month_code)
+        context.update(period.get_context())
 
         return context
         
 class ExportExcelView(LoginRequiredMixin, View):
+    """Queue a background environmental Excel export for the user's plants"""
     def get(self, request):
-        months = [m[1] for m in MonthlyIndicatorData.MONTH_CHOICES]
-        user = request.user
-
-        if user.is_superuser or user.is_staff or user.is_admin_user:
-            plants = Plant.objects.filter(is_active=True)
-
-        else:
-            plants = user.get_all_plants()
+        from apps.exports.services import request_export
 
-            if not plants:
-                messages.error(request, "No plant is assigned to your account")
-                return redirect("environmental:plant-entry")
-
-            plants = Plant.objects.filter(
-                id__in=[p.id for p in plants],
-                is_active=True
-            )
-
-        plants_data = get_all_plants_environmental_data(plants)
-
-        workbook = generate_environmental_excel(plants_data)
+        if not get_environmental_export_plants(request.user).exists():
+            messages.error(request, "No plant is assigned to your account")
+            return redirect("environmental:plant-entry")
 
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        filename = f"Environmental_Data_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        period = ReportingPeriod.from_request(request)
+        job, created = request_export(request.user, 'ENVIRONMENTAL', {'period': period.key})
 
-        workbook.save(response)
-        return response
+        if created:
+            messages.info(request, "Your environmental data export is being prepared. It will appear in My Exports when ready.")
+        else:
+            messages.info(request, "An identical environmental data export is already being prepared.")
+        return redirect('exports:my_exports')
     
 
 import os 
@@ -1584,16 +1435,17 @@ import os
 
 class UploadAttachmentView(LoginRequiredMixin, View):
     """
-    Handles file upload for a specific plant + indicator + month cell.
+    Handles file upload for a specific plant + indicator + year + month cell.
     If attachment already exists for that cell, it replaces it.
     """
     def post(self, request):
         plant_id     = request.POST.get('plant_id')
         indicator_id = request.POST.get('indicator_id')
         month        = request.POST.get('month')
+        year         = request.POST.get('year') or str(datetime.now().year)
         upload_file  = request.FILES.get('attachment_file')
 
-        if not all([plant_id, indicator_id, month, upload_file]):
+        if not all([plant_id, indicator_id, month, upload_file]) or not year.isdigit():
             messages.error(request, "Missing required fields for attachment upload.")
             return redirect(f"{request.META.get('HTTP_REFERER', '/')}") 
 
@@ -1608,6 +1460,7 @@ class UploadAttachmentView(LoginRequiredMixin, View):
         existing = MonthlyIndicatorAttachment.objects.filter(
             plant=plant,
             indicator=indicator,
+            year=year,
             month=month
         ).first()
 
@@ -1623,6 +1476,7 @@ class UploadAttachmentView(LoginRequiredMixin, View):
         attachment = MonthlyIndicatorAttachment.objects.create(
             plant=plant,
             indicator=indicator,
+            year=year,
             month=month,
             file=upload_file,
             file_name=original_name,
@@ -4,6 +4,7 @@ from apps.organizations.models import *
 import datetime
 from django.conf import settings
 from django.utils import timezone
+from apps.common.sequences import max_code_number, next_number
 
 User = get_user_model()
 
@@ -303,11 +304,12 @@ class Incident(models.Model):
             date_str = today.strftime('%Y%m%d')
             plant_code = self.plant.code if self.plant else 'XXX'
             
-            count = Incident.objects.filter(
-                report_number__contains=f'INC-{plant_code}-{date_str}'
-            ).count()
-            
-            self.report_number = f'INC-{plant_code}-{date_str}-{count + 1:03d}'
+            prefix = f'INC-{plant_code}-{date_str}'
+            number = next_number(
+                prefix,
+                seed=lambda: max_code_number(Incident.objects.all(), 'report_number', prefix)
+            )
+            self.report_number = f'{prefix}-{number:03d}'
         
         # Set investigation deadline (7 days)
         if self.investigation_required and not self.investigation_deadline:
@@ -401,6 +403,8 @@ class IncidentPhoto(models.Model):
     
     incident = models.ForeignKey(Incident, on_delete=models.CASCADE, related_name='photos')
     photo = models.ImageField(upload_to='incident_photos/%Y/%m/')
+    thumbnail = models.ImageField(upload_to='incident_photos/thumbnails/%Y/%m/', blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
     photo_type = models.CharField(max_length=20, choices=PHOTO_TYPES)
     description = models.CharField(max_length=255, blank=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -602,6 +606,11 @@ class ActionItemCompletion(models.Model):
 User = get_user_model()
 
 class IncidentNotification(models.Model):
+    """
+    Deprecated: superseded by notifications.Notification. Kept only until
+    existing rows are copied with `manage.py migrate_legacy_notifications`;
+    nothing writes to this table any more.
+    """
     
     NOTIFICATION_TYPES = [
         ('INCIDENT_REPORTED', 'Incident Reported'),
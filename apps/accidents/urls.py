@@ -1,4 +1,5 @@
 from django.urls import path
+from django.views.generic import RedirectView
 from . import views
 
 app_name = 'accidents'
@@ -46,9 +47,8 @@ urlpatterns = [
 
 
     # accidents/urls.py
-    path('notifications/',views.NotificationListView.as_view(), name='notifications'),
-    path('notifications/<int:pk>/mark-read/', views.MarkNotificationReadView.as_view(), name='mark_notification_read'),
-    path('notifications/mark-all-read/', views.MarkAllNotificationsReadView.as_view(), name='mark_all_notifications_read'),
+    # Old inbox URL; notifications from every module live in notifications:inbox
+    path('notifications/', RedirectView.as_view(pattern_name='notifications:inbox'), name='notifications'),
     path('my-action-items/', views.MyActionItemsView.as_view(), name='my_action_items'),
     path('action-items/<int:pk>/complete/', views.IncidentActionItemCompleteView.as_view(), name='action_item_complete'),
     
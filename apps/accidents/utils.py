@@ -6,6 +6,11 @@ import datetime
 from django.db.models import Q
 from .models import Incident
 
+import openpyxl
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.formatting.rule import CellIsRule
+
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -374,7 +379,8 @@ def generate_incident_pdf(incident):
         for photo in incident_photos:
             try:
                 # Create a ReportLab Image object
-                img = Image(photo.photo.path)
+                # (thumbnail once processed - plenty for half a page, far smaller to embed)
+                img = Image((photo.thumbnail or photo.photo).path)
                 
                 # Get original dimensions
                 img_w, img_h = img.imageWidth, img.imageHeight
@@ -476,4 +482,161 @@ def get_incidents_for_user(user):
         locations = user.get_all_locations()
         return Incident.objects.filter(location__in=locations)
 
-    return Incident.objects.filter(reported_by=user)
\ No newline at end of file
+    return Incident.objects.filter(reported_by=user)
+
+
+# =============================================================================
+# EXCEL EXPORT
+# Used by the background export job (apps.exports) for ExportIncidentsExcelView.
+# =============================================================================
+def get_incident_export_queryset(user, params):
+    """
+    Permission-scoped, filtered incident queryset for the Excel export.
+    params mirrors the incident dashboard query string (plant, zone, location,
+    sublocation, month).
+    """
+    # --- 1. Establish Base Queryset with Correct Permissions ---
+    if user.is_superuser or user.is_staff or getattr(user, 'is_admin_user', False):
+        # Admins and staff can access incidents from all plants.
+        queryset = Incident.objects.all()
+    else:
+        # For other users, check for multiple assigned plants first.
+        assigned_plants = user.assigned_plants.filter(is_active=True)
+        if assigned_plants.exists():
+            # User has multiple plants assigned (many-to-many).
+            queryset = Incident.objects.filter(plant__in=assigned_plants)
+        elif getattr(user, 'plant', None):
+            # Fallback to a single assigned plant (foreign key).
+            queryset = Incident.objects.filter(plant=user.plant)
+        else:
+            # If no plants are assigned, the user can only see incidents they reported.
+            queryset = Incident.objects.filter(reported_by=user)
+
+    # --- 2. Apply Filters from Dashboard Parameters ---
+    # This filtering is safe because it's applied to the already-secured queryset.
+    # A user cannot access data from an unassigned plant by modifying the filters.
+    selected_plant = params.get('plant')
+    selected_zone = params.get('zone')
+    selected_location = params.get('location')
+    selected_sublocation = params.get('sublocation')
+    selected_month = params.get('month')
+
+    if selected_plant:
+        queryset = queryset.filter(plant_id=selected_plant)
+    if selected_zone:
+        queryset = queryset.filter(zone_id=selected_zone)
+    if selected_location:
+        queryset = queryset.filter(location_id=selected_location)
+    if selected_sublocation:
+        queryset = queryset.filter(sublocation_id=selected_sublocation)
+    
+    if selected_month:
+        try:
+            year, month = map(int, selected_month.split('-'))
+            queryset = queryset.filter(incident_date__year=year, incident_date__month=month)
+        except (ValueError, TypeError):
+            pass
+
+    # Optimize database query for related fields to prevent extra hits.
+    queryset = queryset.select_related(
+        'incident_type', 'plant', 'zone', 'location', 
+        'sublocation', 'reported_by', 'closed_by'
+    ).order_by('-incident_date')
+
+    return queryset
+
+
+def write_incidents_excel(queryset, output):
+    """Write the incident report workbook for queryset into output (path or file object)"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Incident Report'
+
+    # --- Define Styles ---
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    header_alignment = Alignment(horizontal='center', vertical='center')
+    
+    row_fills = [
+        PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid"),
+        PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
+    ]
+
+    status_fills = {
+        'Open': PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"),
+        'In Progress': PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid"),
+        'Closed': PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
+    }
+
+    wrap_alignment = Alignment(wrap_text=True, vertical='top', horizontal='left')
+
+    # --- Headers ---
+    headers = [
+        'Report Number', 'Incident Type', 'Status', 'Incident Date', 'Incident Time',
+        'Plant', 'Zone', 'Location', 'Sub-Location', 'Description', 'Affected Person',
+        'Nature of Injury', 'Reported By', 'Reported Date', 'Investigation Deadline',
+        'Closure Date', 'Closed By'
+    ]
+    sheet.append(headers)
+
+    for cell in sheet[1]:
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+
+    # --- Data Population and Styling ---
+    desc_col_idx = headers.index('Description') + 1
+    injury_col_idx = headers.index('Nature of Injury') + 1
+    
+    for row_index, incident in enumerate(queryset, start=2):
+        row_data = [
+            incident.report_number,
+            incident.incident_type.name if incident.incident_type else 'N/A',
+            incident.get_status_display(),
+            incident.incident_date,
+            incident.incident_time,
+            incident.plant.name if incident.plant else 'N/A',
+            incident.zone.name if incident.zone else 'N/A',
+            incident.location.name if incident.location else 'N/A',
+            incident.sublocation.name if incident.sublocation else 'N/A',
+            incident.description,
+            incident.affected_person_name,
+            incident.nature_of_injury,
+            incident.reported_by.get_full_name() if incident.reported_by else 'N/A',
+            incident.reported_date.strftime("%Y-%m-%d %H:%M") if incident.reported_date else None,
+            incident.investigation_deadline,
+            incident.closure_date.strftime("%Y-%m-%d %H:%M") if incident.closure_date else None,
+            incident.closed_by.get_full_name() if incident.closed_by else 'N/A'
+        ]
+        sheet.append(row_data)
+
+        current_fill = row_fills[(row_index - 2) % 2]
+        for cell in sheet[row_index]:
+            cell.fill = current_fill
+        
+        sheet.cell(row=row_index, column=desc_col_idx).alignment = wrap_alignment
+        sheet.cell(row=row_index, column=injury_col_idx).alignment = wrap_alignment
+
+    # --- Conditional Formatting for Status Column ---
+    if sheet.max_row >= 2:
+        status_column_letter = get_column_letter(headers.index('Status') + 1)
+        for status, fill in status_fills.items():
+            rule = CellIsRule(operator='equal', formula=[f'"{status}"'], fill=fill)
+            sheet.conditional_formatting.add(f'{status_column_letter}2:{status_column_letter}{sheet.max_row}', rule)
+
+    # --- Adjust Column Widths ---
+    column_widths = {}
+    for row in sheet.iter_rows(min_row=1, max_row=1): # Check header length first
+         for cell in row:
+            if cell.value:
+                column_widths[cell.column_letter] = len(str(cell.value))
+
+    for col_letter, width in column_widths.items():
+        header_name = sheet[f'{col_letter}1'].value
+        if header_name in ['Description', 'Nature of Injury']:
+            sheet.column_dimensions[col_letter].width = 50
+        else:
+            sheet.column_dimensions[col_letter].width = width + 5 # Auto-size with padding
+
+    workbook.save(output)
+    return output
@@ -10,7 +10,6 @@ from apps.organizations.models import *
 from .models import *
 from .forms import *
 from .utils import generate_incident_pdf
-from django.http import HttpResponse
 from django.db.models.functions import TruncMonth
 from django.views.generic import UpdateView, TemplateView
 from django.contrib import messages
@@ -20,14 +19,10 @@ from apps.notifications import *
 import datetime
 from django.db.models import Q
 import json
-import openpyxl
 from django.shortcuts import render
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
-from openpyxl.formatting.rule import CellIsRule
 from django.conf import settings  
 from django.conf.urls.static import static  
-from apps.common.image_utils import compress_image
+from apps.common.image_utils import is_image, queue_photo_processing
 
 from .forms import IncidentAttachmentForm # <-- Import the new form
 from django.views.generic import UpdateView
@@ -353,6 +348,12 @@ class IncidentCreateView(LoginRequiredMixin, CreateView):
         """
         Process the valid form, set the reporter, and handle location data.
         """
+        photos = self.request.FILES.getlist('photos')
+        invalid = [photo.name for photo in photos if not is_image(photo)]
+        if invalid:
+            form.add_error(None, f"Not a valid image: {', '.join(invalid)}")
+            return self.form_invalid(form)
+
         incident = form.save(commit=False)
         incident.reported_by = self.request.user
         
@@ -383,16 +384,16 @@ class IncidentCreateView(LoginRequiredMixin, CreateView):
         self.object = incident
         form.save_m2m()
 
-        # Handle photo uploads
-        photos = self.request.FILES.getlist('photos')
-        for photo in photos:
-            compressed_photo = compress_image(photo)
+        # Handle photo uploads (resized in the background)
+        queue_photo_processing([
             IncidentPhoto.objects.create(
                 incident=incident,
-                photo=compressed_photo,
+                photo=photo,
                 photo_type='INCIDENT_SCENE',
                 uploaded_by=self.request.user
             )
+            for photo in photos
+        ])
         
         # ===== ADD NOTIFICATION HERE - AFTER INCIDENT IS SAVED =====
         # print("\n\n" + "#" * 70)
@@ -589,6 +590,12 @@ class IncidentUpdateView(LoginRequiredMixin, UpdateView):
 
     
     def form_valid(self, form):
+        photos = self.request.FILES.getlist('photos')
+        invalid = [photo.name for photo in photos if not is_image(photo)]
+        if invalid:
+            form.add_error(None, f"Not a valid image: {', '.join(invalid)}")
+            return self.form_invalid(form)
+
         # Handle affected person selection
         incident_type = form.cleaned_data.get('incident_type')
         if incident_type:
@@ -639,16 +646,16 @@ class IncidentUpdateView(LoginRequiredMixin, UpdateView):
         # Handle unsafe conditions other explanation
         form.instance.unsafe_conditions_other = self.request.POST.get('unsafe_conditions_other', '').strip()
         
-        # Handle photo uploads
-        photos = self.request.FILES.getlist('photos')
-        for photo in photos:
-            compressed_photo = compress_image(photo)
+        # Handle photo uploads (resized in the background)
+        queue_photo_processing([
             IncidentPhoto.objects.create(
                 incident=self.object,
-                photo=compressed_photo,
+                photo=photo,
                 photo_type='INCIDENT_SCENE',
                 uploaded_by=self.request.user
             )
+            for photo in photos
+        ])
         
         messages.success(self.request, f'Incident {self.object.report_number} updated successfully!')
         return super().form_valid(form)
@@ -1384,51 +1391,6 @@ class InvestigationDetailView(LoginRequiredMixin, DetailView):
     
 
 
-##################notification 
-class NotificationListView(LoginRequiredMixin, ListView):
-    """List user's notifications"""
-    model = IncidentNotification
-    template_name = 'accidents/notifications.html'
-    context_object_name = 'notifications'
-    paginate_by = 20
-    
-    def get_queryset(self):
-        return IncidentNotification.objects.filter(
-            recipient=self.request.user
-        ).select_related('incident', 'incident__plant', 'incident__location')
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['unread_count'] = self.get_queryset().filter(is_read=False).count()
-        return context
-
-
-class MarkNotificationReadView(LoginRequiredMixin, View):
-    """Mark notification as read"""
-    
-    def post(self, request, pk):
-        notification = get_object_or_404(
-            IncidentNotification, 
-            pk=pk, 
-            recipient=request.user
-        )
-        notification.mark_as_read()
-        return JsonResponse({'status': 'success'})
-#########################################33
-
-class MarkAllNotificationsReadView(LoginRequiredMixin, View):
-    """Mark all notifications as read"""
-    
-    def post(self, request):
-        IncidentNotification.objects.filter(
-            recipient=request.user,
-            is_read=False
-        ).update(is_read=True, read_at=timezone.now())
-        return JsonResponse({'status': 'success'})   
-
-
-
-
 class IncidentFilterMixin:
     """
     A mixin to provide a filtered queryset of incidents based on URL parameters.
@@ -1489,161 +1451,24 @@ class IncidentFilterMixin:
 
 class ExportIncidentsExcelView(LoginRequiredMixin, View):
     """
-    Handles the export of incident data to an Excel file with proper
-    access control and filtering.
+    Queues a background Excel export of incident data for the current
+    dashboard filters. Access control is applied when the job runs.
     """
     def get(self, request, *args, **kwargs):
-        user = self.request.user
-        
-        # --- 1. Establish Base Queryset with Correct Permissions ---
-        if user.is_superuser or user.is_staff or getattr(user, 'is_admin_user', False):
-            # Admins and staff can access incidents from all plants.
-            queryset = Incident.objects.all()
-        else:
-            # For other users, check for multiple assigned plants first.
-            assigned_plants = user.assigned_plants.filter(is_active=True)
-            if assigned_plants.exists():
-                # User has multiple plants assigned (many-to-many).
-                queryset = Incident.objects.filter(plant__in=assigned_plants)
-            elif getattr(user, 'plant', None):
-                # Fallback to a single assigned plant (foreign key).
-                queryset = Incident.objects.filter(plant=user.plant)
-            else:
-                # If no plants are assigned, the user can only see incidents they reported.
-                queryset = Incident.objects.filter(reported_by=user)
-
-        # --- 2. Apply Filters from Dashboard URL Parameters ---
-        # This filtering is safe because it's applied to the already-secured queryset.
-        # A user cannot access data from an unassigned plant by modifying the URL.
-        selected_plant = request.GET.get('plant')
-        selected_zone = request.GET.get('zone')
-        selected_location = request.GET.get('location')
-        selected_sublocation = request.GET.get('sublocation')
-        selected_month = request.GET.get('month')
-
-        if selected_plant:
-            queryset = queryset.filter(plant_id=selected_plant)
-        if selected_zone:
-            queryset = queryset.filter(zone_id=selected_zone)
-        if selected_location:
-            queryset = queryset.filter(location_id=selected_location)
-        if selected_sublocation:
-            queryset = queryset.filter(sublocation_id=selected_sublocation)
-        
-        if selected_month:
-            try:
-                year, month = map(int, selected_month.split('-'))
-                queryset = queryset.filter(incident_date__year=year, incident_date__month=month)
-            except (ValueError, TypeError):
-                pass
+        from apps.exports.services import request_export
 
-        # Optimize database query for related fields to prevent extra hits.
-        queryset = queryset.select_related(
-            'incident_type', 'plant', 'zone', 'location', 
-            'sublocation', 'reported_by', 'closed_by'
-        ).order_by('-incident_date')
-
-        # --- 3. Generate Excel Workbook ---
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = 'Incident Report'
-
-        # --- Define Styles ---
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-        header_alignment = Alignment(horizontal='center', vertical='center')
-        
-        row_fills = [
-            PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid"),
-            PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-        ]
-
-        status_fills = {
-            'Open': PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"),
-            'In Progress': PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid"),
-            'Closed': PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
+        params = {
+            key: request.GET.get(key)
+            for key in ('plant', 'zone', 'location', 'sublocation', 'month')
+            if request.GET.get(key)
         }
+        job, created = request_export(request.user, 'INCIDENTS', params)
 
-        wrap_alignment = Alignment(wrap_text=True, vertical='top', horizontal='left')
-
-        # --- Headers ---
-        headers = [
-            'Report Number', 'Incident Type', 'Status', 'Incident Date', 'Incident Time',
-            'Plant', 'Zone', 'Location', 'Sub-Location', 'Description', 'Affected Person',
-            'Nature of Injury', 'Reported By', 'Reported Date', 'Investigation Deadline',
-            'Closure Date', 'Closed By'
-        ]
-        sheet.append(headers)
-
-        for cell in sheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-
-        # --- Data Population and Styling ---
-        desc_col_idx = headers.index('Description') + 1
-        injury_col_idx = headers.index('Nature of Injury') + 1
-        
-        for row_index, incident in enumerate(queryset, start=2):
-            row_data = [
-                incident.report_number,
-                incident.incident_type.name if incident.incident_type else 'N/A',
-                incident.get_status_display(),
-                incident.incident_date,
-                incident.incident_time,
-                incident.plant.name if incident.plant else 'N/A',
-                incident.zone.name if incident.zone else 'N/A',
-                incident.location.name if incident.location else 'N/A',
-                incident.sublocation.name if incident.sublocation else 'N/A',
-                incident.description,
-                incident.affected_person_name,
-                incident.nature_of_injury,
-                incident.reported_by.get_full_name() if incident.reported_by else 'N/A',
-                incident.reported_date.strftime("%Y-%m-%d %H:%M") if incident.reported_date else None,
-                incident.investigation_deadline,
-                incident.closure_date.strftime("%Y-%m-%d %H:%M") if incident.closure_date else None,
-                incident.closed_by.get_full_name() if incident.closed_by else 'N/A'
-            ]
-            sheet.append(row_data)
-
-            current_fill = row_fills[(row_index - 2) % 2]
-            for cell in sheet[row_index]:
-                cell.fill = current_fill
-            
-            sheet.cell(row=row_index, column=desc_col_idx).alignment = wrap_alignment
-            sheet.cell(row=row_index, column=injury_col_idx).alignment = wrap_alignment
-
-        # --- Conditional Formatting for Status Column ---
-        if sheet.max_row >= 2:
-            status_column_letter = get_column_letter(headers.index('Status') + 1)
-            for status, fill in status_fills.items():
-                rule = CellIsRule(operator='equal', formula=[f'"{status}"'], fill=fill)
-                sheet.conditional_formatting.add(f'{status_column_letter}2:{status_column_letter}{sheet.max_row}', rule)
-
-        # --- Adjust Column Widths ---
-        column_widths = {}
-        for row in sheet.iter_rows(min_row=1, max_row=1): # Check header length first
-             for cell in row:
-                if cell.value:
-                    column_widths[cell.column_letter] = len(str(cell.value))
-
-        for col_letter, width in column_widths.items():
-            header_name = sheet[f'{col_letter}1'].value
-            if header_name in ['Description', 'Nature of Injury']:
-                sheet.column_dimensions[col_letter].width = 50
-            else:
-                sheet.column_dimensions[col_letter].width = width + 5 # Auto-size with padding
-
-        # --- Prepare HTTP Response for Download ---
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        )
-        filename = f"Incident_Report_{timezone.now().strftime('%Y-%m-%d')}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        workbook.save(response)
-
-        return response    
+        if created:
+            messages.info(request, "Your incident report is being prepared. It will appear in My Exports when ready.")
+        else:
+            messages.info(request, "An identical incident report is already being prepared.")
+        return redirect('exports:my_exports')
 
 # class IncidentCloseView(LoginRequiredMixin, UpdateView):
 #     """Close an incident"""
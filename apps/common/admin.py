@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import SequenceCounter
+
+
+@admin.register(SequenceCounter)
+class SequenceCounterAdmin(admin.ModelAdmin):
+    list_display = ['key', 'value', 'updated_at']
+    search_fields = ['key']
+    readonly_fields = ['key', 'value', 'updated_at']
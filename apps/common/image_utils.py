@@ -1,35 +1,111 @@
+import logging
+import os
 from io import BytesIO
-from PIL import Image
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
 
-def compress_image(uploaded_file, max_width=1024, max_height=1024, quality=75):
+from PIL import Image, ImageOps
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Longest-edge bounds of the stored renditions
+WEB_SIZE = (1024, 1024)
+THUMBNAIL_SIZE = (320, 320)
+
+
+# Pillow errors meaning the stored file is not a decodable image
+UNDECODABLE_ERRORS = (Image.UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, ValueError)
+
+
+def is_image(upload):
     """
-    Compress uploaded image file.
+    Cheap header check that an uploaded file is an image Pillow can read.
+    The file is rewound afterwards so it can still be saved.
     """
-    # Open image with PIL
-    image = Image.open(uploaded_file)
-    image_format = image.format
+    try:
+        upload.seek(0)
+        Image.open(upload).verify()
+        return True
+    except Exception:
+        return False
+    finally:
+        upload.seek(0)
+
+
+def open_image(source, size):
+    """
+    Open an image for resizing to fit size.
+
+    JPEGs are decoded at the smallest scale that still covers size
+    (Image.draft), which is several times faster than a full decode for
+    camera photos. EXIF orientation is applied so portrait shots stay upright.
+    """
+    image = Image.open(source)
+    if image.format == 'JPEG':
+        # Orientation may swap width and height, so ask for the longer edge both ways
+        edge = max(size)
+        image.draft('RGB', (edge, edge))
+    image = ImageOps.exif_transpose(image)
 
     # Convert RGBA to RGB to avoid errors with JPEG
-    if image.mode in ("RGBA", "P"):
+    if image.mode not in ("RGB", "L"):
         image = image.convert("RGB")
+    return image
+
 
-    # Resize maintaining aspect ratio
-    image.thumbnail((max_width, max_height), Image.LANCZOS)
+def render_jpeg(image, size, quality=75):
+    """Resize a copy of image to fit size and return it as JPEG bytes"""
+    image = image.copy()
+    image.thumbnail(size, Image.LANCZOS)
 
-    # Save to BytesIO
     output = BytesIO()
-    image.save(output, format=image_format, quality=quality, optimize=True)
-    output.seek(0)
-
-    # Create new Django InMemoryUploadedFile
-    compressed_file = InMemoryUploadedFile(
-        output, 
-        uploaded_file.field_name,
-        uploaded_file.name,
-        uploaded_file.content_type,
-        sys.getsizeof(output),
-        None
-    )
-    return compressed_file
+    image.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def process_photo(photo, field='photo', thumbnail_field='thumbnail'):
+    """
+    Replace a stored original upload with its web-size rendition and
+    attach a thumbnail. Does nothing if the photo was already processed.
+    """
+    if photo.processed_at:
+        return
+
+    original = getattr(photo, field)
+    with original.open('rb'):
+        image = open_image(original, WEB_SIZE)
+        web = render_jpeg(image, WEB_SIZE)
+        thumbnail = render_jpeg(image, THUMBNAIL_SIZE, quality=70)
+
+    original_name = original.name
+    base = os.path.splitext(os.path.basename(original_name))[0]
+    original.save(f'{base}.jpg', ContentFile(web), save=False)
+    getattr(photo, thumbnail_field).save(f'{base}_thumb.jpg', ContentFile(thumbnail), save=False)
+    photo.processed_at = timezone.now()
+    photo.save(update_fields=[field, thumbnail_field, 'processed_at'])
+
+    # The rendition has a new name, so the original can go
+    if original_name != original.name:
+        original.storage.delete(original_name)
+
+
+def queue_photo_processing(photos):
+    """Process freshly uploaded photos in the background once the transaction commits"""
+    photos = [photo for photo in photos if photo.pk]
+    if not photos:
+        return
+    label = photos[0]._meta.label
+    photo_ids = [photo.pk for photo in photos]
+    transaction.on_commit(lambda: _enqueue(label, photo_ids))
+
+
+def _enqueue(label, photo_ids):
+    from .tasks import process_photos
+
+    try:
+        process_photos.delay(label, photo_ids)
+    except Exception:
+        # Broker unavailable - process in-process so photos are not left full size
+        logger.exception(f"Could not queue processing for {len(photo_ids)} {label} photo(s), running inline")
+        process_photos.apply(args=[label, photo_ids])
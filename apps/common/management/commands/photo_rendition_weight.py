@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from apps.common.renditions import PHOTO_SOURCES, RENDITION_SIZES, get_photo_model, get_rendition_path
+
+
+class Command(BaseCommand):
+    help = 'Build renditions for recent photos and compare their weight with the original files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=200, help='Most recent photos per source')
+
+    def handle(self, *args, **options):
+        sizes = list(RENDITION_SIZES)
+        self.stdout.write(f"{'Source':<12} {'Photos':>7} {'Original KB':>12} " + ' '.join(f"{s + ' KB':>10}" for s in sizes))
+
+        for kind in PHOTO_SOURCES:
+            photos = get_photo_model(kind).objects.exclude(photo='').exclude(photo__isnull=True).order_by('-pk')
+            count = 0
+            original = 0
+            renditions = dict.fromkeys(sizes, 0)
+
+            for photo in photos[:options['limit']]:
+                try:
+                    original_size = os.path.getsize(photo.photo.path)
+                    rendition_sizes = {
+                        size: get_rendition_path(photo.photo, size).stat().st_size for size in sizes
+                    }
+                except (OSError, NotImplementedError) as e:
+                    self.stderr.write(f"{kind} {photo.pk}: {e}")
+                    continue
+                count += 1
+                original += original_size
+                for size in sizes:
+                    renditions[size] += rendition_sizes[size]
+
+            self.stdout.write(
+                f"{kind:<12} {count:>7} {original / 1024:>12.0f} "
+                + ' '.join(f"{renditions[size] / 1024:>10.0f}" for size in sizes)
+            )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from apps.accidents.models import IncidentPhoto
+from apps.common.tasks import process_photos
+from apps.hazards.models import HazardPhoto
+
+PHOTO_MODELS = [HazardPhoto, IncidentPhoto]
+
+
+class Command(BaseCommand):
+    help = 'Build web renditions and thumbnails for photos uploaded before background processing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Send batches to the Celery workers instead of processing them here'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model in PHOTO_MODELS:
+            label = model._meta.label
+            photo_ids = list(
+                model.objects.filter(processed_at__isnull=True).order_by('pk').values_list('pk', flat=True)
+            )
+            for start in range(0, len(photo_ids), batch_size):
+                batch = photo_ids[start:start + batch_size]
+                if options['queue']:
+                    process_photos.delay(label, batch)
+                else:
+                    self.stdout.write(process_photos(label, batch))
+            self.stdout.write(self.style.SUCCESS(f"{label}: {len(photo_ids)} photo(s) {'queued' if options['queue'] else 'processed'}"))
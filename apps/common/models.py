@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class SequenceCounter(models.Model):
+    """
+    Last number handed out for a code prefix (e.g. 'INC-PLT1-20250101').
+    Allocated through apps.common.sequences, never edited directly.
+    """
+
+    key = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Sequence Counter"
+        verbose_name_plural = "Sequence Counters"
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
@@ -0,0 +1,98 @@
+# apps/common/renditions.py
+"""
+Size-specific photo renditions served through common:photo_rendition.
+
+A rendition is generated the first time it is requested and cached under
+RENDITION_ROOT (MEDIA_ROOT/renditions by default); the directory can be
+wiped at any time. A rendition is rebuilt when the source photo is newer
+than the cached file.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+
+from .image_utils import THUMBNAIL_SIZE, WEB_SIZE, open_image, render_jpeg
+
+RENDITION_SIZES = {
+    'thumb': THUMBNAIL_SIZE,
+    'medium': (640, 640),
+    'large': WEB_SIZE,
+}
+
+# URL kind -> photo model (all keep the image in a field called "photo")
+PHOTO_SOURCES = {
+    'hazard': 'hazards.HazardPhoto',
+    'incident': 'accidents.IncidentPhoto',
+    'inspection': 'inspections.InspectionResponse',
+}
+
+
+def get_rendition_root():
+    return Path(getattr(settings, 'RENDITION_ROOT', Path(settings.MEDIA_ROOT) / 'renditions'))
+
+
+def get_photo_model(kind):
+    return apps.get_model(PHOTO_SOURCES[kind])
+
+
+def get_photo_kind(photo):
+    """URL kind for a photo instance (None if it has no rendition endpoint)"""
+    label = photo._meta.label
+    for kind, model_label in PHOTO_SOURCES.items():
+        if model_label == label:
+            return kind
+    return None
+
+
+def get_source_version(field_file):
+    """Short token that changes whenever the stored photo is replaced"""
+    return hashlib.md5(field_file.name.encode()).hexdigest()[:10]
+
+
+def get_stored_rendition(photo, size):
+    """
+    Rendition the photo already stores (the thumbnail built by
+    process_photos), served as is instead of generating a duplicate.
+    """
+    if size == 'thumb':
+        thumbnail = getattr(photo, 'thumbnail', None)
+        if thumbnail:
+            return thumbnail
+    return None
+
+
+def get_etag(field_file, size, source_mtime):
+    return hashlib.md5(f"{size}:{field_file.name}:{source_mtime}".encode()).hexdigest()
+
+
+def get_rendition_path(field_file, size):
+    """
+    Local path of the size rendition of field_file, generating it if missing
+    or older than the source. Requires a filesystem storage (field_file.path).
+    """
+    source_path = field_file.path
+    # Keep the source extension so site.png and site.jpg never share a rendition
+    target = get_rendition_root() / size / f"{field_file.name}.jpg"
+
+    if target.exists() and target.stat().st_mtime >= os.path.getmtime(source_path):
+        return target
+
+    with open(source_path, 'rb') as source:
+        data = render_jpeg(open_image(source, RENDITION_SIZES[size]), RENDITION_SIZES[size])
+
+    # Write next to the target and rename, so concurrent requests never see half a file
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, target)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return target
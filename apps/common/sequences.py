@@ -0,0 +1,72 @@
+# apps/common/sequences.py
+"""
+Gap-tolerant, collision-free number allocation for document codes.
+
+Each code prefix has one SequenceCounter row, advanced with a single
+``UPDATE ... RETURNING`` so concurrent requests are serialised by the
+row lock instead of scanning and racing on the documents table. Several
+numbers can be reserved at once for bulk creation.
+
+The first time a prefix is used, the counter is seeded from the codes
+already in the database (``seed``), so switching an existing table over
+does not re-issue numbers.
+"""
+
+from django.db import IntegrityError, connection, transaction
+
+from .models import SequenceCounter
+
+
+def _advance(key, count):
+    """Add count to the counter and return the new value (None if missing)"""
+    table = connection.ops.quote_name(SequenceCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET value = value + %s, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE key = %s RETURNING value",
+            [count, key]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def allocate(key, count=1, seed=None):
+    """
+    Reserve count consecutive numbers for key.
+
+    Args:
+        key: Code prefix the numbers belong to
+        count: Size of the block to reserve
+        seed: Callable returning the highest number already in use,
+              only called the first time key is allocated
+
+    Returns:
+        range of the reserved numbers
+    """
+    last = _advance(key, count)
+    if last is None:
+        last = (seed() if seed else 0) + count
+        try:
+            with transaction.atomic():
+                SequenceCounter.objects.create(key=key, value=last)
+        except IntegrityError:
+            # Another request created the counter first
+            last = _advance(key, count)
+
+    return range(last - count + 1, last + 1)
+
+
+def next_number(key, seed=None):
+    """Reserve a single number for key"""
+    return allocate(key, 1, seed)[0]
+
+
+def max_code_number(queryset, field, prefix):
+    """Highest numeric suffix among codes of queryset starting with prefix (for seeds)"""
+    highest = 0
+    for code in queryset.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True).iterator():
+        try:
+            highest = max(highest, int(code.rsplit('-', 1)[-1]))
+        except ValueError:
+            continue
+    return highest
@@ -0,0 +1,30 @@
+# apps/common/tasks.py
+
+import logging
+
+from celery import shared_task
+from django.apps import apps
+
+from .image_utils import UNDECODABLE_ERRORS, process_photo
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='apps.common.tasks.process_photos')
+def process_photos(model_label, photo_ids):
+    """Build web-size renditions and thumbnails for uploaded photos"""
+    model = apps.get_model(model_label)
+    processed = 0
+    for photo in model.objects.filter(pk__in=photo_ids, processed_at__isnull=True):
+        try:
+            process_photo(photo)
+            processed += 1
+        except UNDECODABLE_ERRORS:
+            # Not an image - never leave it served from media
+            logger.warning(f"Deleting {model_label} photo {photo.pk}: not a decodable image", exc_info=True)
+            photo.photo.delete(save=False)
+            photo.delete()
+        except Exception:
+            # Storage or transient error - leave the original for the next run
+            logger.exception(f"Failed to process {model_label} photo {photo.pk}")
+    return f"Processed {processed} of {len(photo_ids)} {model_label} photo(s)"
@@ -0,0 +1,26 @@
+from django import template
+from django.urls import reverse
+
+from apps.common.renditions import get_photo_kind, get_source_version, get_stored_rendition
+
+register = template.Library()
+
+
+@register.simple_tag
+def photo_rendition_url(photo, size='medium'):
+    """
+    Cacheable URL of a resized photo, e.g. {% photo_rendition_url photo 'thumb' %}.
+    Falls back to the original file for models without a rendition endpoint.
+    """
+    field_file = photo.photo
+    if not field_file:
+        return ''
+
+    kind = get_photo_kind(photo)
+    if kind is None:
+        return field_file.url
+
+    # Versioned by the file actually served, so processing a photo changes the URL
+    served_file = get_stored_rendition(photo, size) or field_file
+    url = reverse('common:photo_rendition', args=[kind, photo.pk, size])
+    return f"{url}?v={get_source_version(served_file)}"
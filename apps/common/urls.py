@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'common'
+
+urlpatterns = [
+    path('photos/<str:kind>/<int:pk>/<str:size>/', views.PhotoRenditionView.as_view(), name='photo_rendition'),
+]
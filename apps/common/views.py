@@ -0,0 +1,75 @@
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from PIL import Image
+
+from .renditions import (
+    PHOTO_SOURCES,
+    RENDITION_SIZES,
+    get_etag,
+    get_photo_model,
+    get_rendition_path,
+    get_stored_rendition,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoRenditionView(LoginRequiredMixin, View):
+    """
+    Serve a resized hazard/incident/inspection photo.
+
+    URLs carry a version of the source file (see photo_rendition_url), so
+    responses can be cached for a long time; ETag/Last-Modified let an
+    expired copy be revalidated with a 304.
+    """
+    def get(self, request, kind, pk, size):
+        if kind not in PHOTO_SOURCES or size not in RENDITION_SIZES:
+            raise Http404("Unknown photo rendition")
+
+        photo = get_object_or_404(get_photo_model(kind), pk=pk)
+        field_file = photo.photo
+        if not field_file:
+            raise Http404("No photo")
+
+        # A stored thumbnail is the rendition itself; otherwise build from the photo
+        stored = get_stored_rendition(photo, size)
+        if stored:
+            field_file = stored
+
+        try:
+            source_path = field_file.path
+        except NotImplementedError:
+            # Remote storage - no local cache to build renditions in
+            return redirect(field_file.url)
+        if not os.path.exists(source_path):
+            raise Http404("Photo file missing")
+
+        last_modified = int(os.path.getmtime(source_path))
+        etag = quote_etag(get_etag(field_file, size, last_modified))
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            try:
+                rendition_path = source_path if stored else get_rendition_path(field_file, size)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                # Unreadable or not an image (UnidentifiedImageError is an OSError)
+                logger.warning(f"Cannot build {size} rendition of {field_file.name}", exc_info=True)
+                raise Http404("Photo cannot be displayed")
+            response = FileResponse(open(rendition_path, 'rb'), content_type='image/jpeg')
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=getattr(settings, 'RENDITION_CACHE_SECONDS', 60 * 60 * 24 * 365)
+        )
+        return response
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'export_type', 'requested_by', 'status', 'created_at', 'completed_at', 'expires_at']
+    list_filter = ['export_type', 'status']
+    search_fields = ['requested_by__username', 'file_name']
+    readonly_fields = ['fingerprint', 'params', 'created_at', 'started_at', 'completed_at']
@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class ExportJob(models.Model):
+    """
+    A report export generated in the background.
+    The finished file is stored under MEDIA_ROOT/exports/ until it expires.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_COMPLETED = 'COMPLETED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_EXPIRED = 'EXPIRED'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Queued'),
+        (STATUS_RUNNING, 'In Progress'),
+        (STATUS_COMPLETED, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    EXPORT_TYPE_CHOICES = [
+        ('HAZARDS', 'Hazards Report'),
+        ('INCIDENTS', 'Incident Report'),
+        ('ENVIRONMENTAL', 'Environmental Data'),
+    ]
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='export_jobs'
+    )
+    export_type = models.CharField(max_length=30, choices=EXPORT_TYPE_CHOICES)
+    params = models.JSONField(default=dict, blank=True, help_text="Filters the export was requested with")
+    fingerprint = models.CharField(max_length=64, db_index=True, help_text="Hash of user + type + params, used to dedupe")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.FileField(upload_to='exports/%Y/%m/', blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    error_message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+        indexes = [
+            models.Index(fields=['requested_by', '-created_at']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
+        constraints = [
+            # Only one queued/running job per identical request
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=Q(status__in=['PENDING', 'RUNNING']),
+                name='unique_active_export_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_export_type_display()} - {self.requested_by} ({self.get_status_display()})"
+
+    @staticmethod
+    def build_fingerprint(user, export_type, params):
+        payload = json.dumps(
+            {'user': user.pk, 'type': export_type, 'params': params},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @property
+    def is_downloadable(self):
+        return (
+            self.status == self.STATUS_COMPLETED
+            and bool(self.file)
+            and (self.expires_at is None or self.expires_at > timezone.now())
+        )
@@ -0,0 +1,47 @@
+"""
+Export types that can be generated in the background.
+
+Each builder receives (user, params, output) and writes an .xlsx file into
+output. Builders re-apply the user's access scope, so params only need to
+carry the dashboard filters.
+"""
+
+
+def build_hazards_export(user, params, output):
+    from apps.hazards.utils import get_hazard_export_queryset, write_hazards_excel
+
+    write_hazards_excel(get_hazard_export_queryset(user, params), output)
+
+
+def build_incidents_export(user, params, output):
+    from apps.accidents.utils import get_incident_export_queryset, write_incidents_excel
+
+    write_incidents_excel(get_incident_export_queryset(user, params), output)
+
+
+def build_environmental_export(user, params, output):
+    from apps.ENVdata.periods import ReportingPeriod
+    from apps.ENVdata.utils import get_environmental_export_plants, write_environmental_excel
+
+    if params.get('period'):
+        period = ReportingPeriod.from_key(params['period'])
+    else:
+        # Jobs queued before period selection carried a calendar year
+        period = ReportingPeriod(params.get('year') or ReportingPeriod.current().year)
+    write_environmental_excel(get_environmental_export_plants(user), output, period)
+
+
+EXPORT_TYPES = {
+    'HAZARDS': {
+        'builder': build_hazards_export,
+        'filename': 'Hazards_Report',
+    },
+    'INCIDENTS': {
+        'builder': build_incidents_export,
+        'filename': 'Incident_Report',
+    },
+    'ENVIRONMENTAL': {
+        'builder': build_environmental_export,
+        'filename': 'Environmental_Data',
+    },
+}
@@ -0,0 +1,56 @@
+import logging
+
+from django.db import IntegrityError, transaction
+
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+
+def request_export(user, export_type, params):
+    """
+    Queue an export job, or join an identical one that is already queued/running.
+
+    Returns:
+        (job, created) tuple
+    """
+    fingerprint = ExportJob.build_fingerprint(user, export_type, params)
+
+    existing = ExportJob.objects.filter(
+        fingerprint=fingerprint,
+        status__in=ExportJob.ACTIVE_STATUSES
+    ).first()
+    if existing:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                requested_by=user,
+                export_type=export_type,
+                params=params,
+                fingerprint=fingerprint,
+            )
+    except IntegrityError:
+        # A concurrent identical request won the race
+        existing = ExportJob.objects.filter(
+            fingerprint=fingerprint,
+            status__in=ExportJob.ACTIVE_STATUSES
+        ).first()
+        if existing:
+            return existing, False
+        raise
+
+    transaction.on_commit(lambda: _enqueue(job.pk))
+    return job, True
+
+
+def _enqueue(job_id):
+    from .tasks import run_export_job
+
+    try:
+        run_export_job.delay(job_id)
+    except Exception:
+        # Broker unavailable - generate in-process so the user still gets the file
+        logger.exception(f"Could not queue export job {job_id}, running inline")
+        run_export_job.apply(args=[job_id])
@@ -0,0 +1,92 @@
+# apps/exports/tasks.py
+
+import logging
+import tempfile
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import ExportJob
+from .registry import EXPORT_TYPES
+
+logger = logging.getLogger(__name__)
+
+
+def get_export_ttl():
+    return timedelta(hours=getattr(settings, 'EXPORT_JOB_TTL_HOURS', 24))
+
+
+@shared_task(name='apps.exports.tasks.run_export_job')
+def run_export_job(job_id):
+    """Generate the file for one ExportJob and store it under MEDIA_ROOT"""
+    # Claim the job atomically so a duplicate delivery does not build it twice
+    claimed = ExportJob.objects.filter(
+        pk=job_id,
+        status=ExportJob.STATUS_PENDING
+    ).update(status=ExportJob.STATUS_RUNNING, started_at=timezone.now())
+    if not claimed:
+        logger.info(f"[Export] Job {job_id} already claimed or missing, skipping")
+        return
+
+    job = ExportJob.objects.select_related('requested_by').get(pk=job_id)
+    export_type = EXPORT_TYPES[job.export_type]
+
+    try:
+        with tempfile.TemporaryFile(suffix='.xlsx') as output:
+            export_type['builder'](job.requested_by, job.params, output)
+            output.seek(0)
+
+            now = timezone.now()
+            file_name = f"{export_type['filename']}_{timezone.localtime(now).strftime('%Y-%m-%d_%H%M')}.xlsx"
+            job.file.save(f"{job.pk}_{file_name}", File(output), save=False)
+
+        job.file_name = file_name
+        job.status = ExportJob.STATUS_COMPLETED
+        job.completed_at = now
+        job.expires_at = now + get_export_ttl()
+        job.save(update_fields=['file', 'file_name', 'status', 'completed_at', 'expires_at'])
+        logger.info(f"[Export] Job {job_id} ({job.export_type}) completed")
+
+    except Exception as exc:
+        logger.exception(f"[Export] Job {job_id} failed")
+        job.status = ExportJob.STATUS_FAILED
+        job.error_message = str(exc)
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'completed_at'])
+
+
+@shared_task(name='apps.exports.tasks.cleanup_expired_exports')
+def cleanup_expired_exports():
+    """
+    Delete files of expired exports and mark the jobs EXPIRED.
+    Jobs stuck queued/running (e.g. lost worker) are failed so new identical
+    requests are no longer deduped onto them.
+    """
+    stale_before = timezone.now() - timedelta(hours=getattr(settings, 'EXPORT_JOB_STALE_HOURS', 2))
+    ExportJob.objects.filter(
+        status__in=ExportJob.ACTIVE_STATUSES,
+        created_at__lt=stale_before
+    ).update(
+        status=ExportJob.STATUS_FAILED,
+        error_message='Export did not finish in time',
+        completed_at=timezone.now()
+    )
+
+    expired = ExportJob.objects.filter(
+        status=ExportJob.STATUS_COMPLETED,
+        expires_at__lte=timezone.now()
+    )
+
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.status = ExportJob.STATUS_EXPIRED
+        job.save(update_fields=['file', 'status'])
+        count += 1
+
+    logger.info(f"[Export] Expired {count} export file(s)")
+    return f"Expired {count} export file(s)"
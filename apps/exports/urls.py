@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'exports'
+
+urlpatterns = [
+    path('', views.MyExportsView.as_view(), name='my_exports'),
+    path('<int:pk>/download/', views.ExportJobDownloadView.as_view(), name='download'),
+]
@@ -0,0 +1,44 @@
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.views import View
+from django.views.generic import ListView
+
+from .models import ExportJob
+
+
+class MyExportsView(LoginRequiredMixin, ListView):
+    """Download center listing the current user's export jobs"""
+    model = ExportJob
+    template_name = 'exports/my_exports.html'
+    context_object_name = 'jobs'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(requested_by=self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Auto-refresh the page while something is still being generated
+        context['has_active_jobs'] = self.get_queryset().filter(
+            status__in=ExportJob.ACTIVE_STATUSES
+        ).exists()
+        return context
+
+
+class ExportJobDownloadView(LoginRequiredMixin, View):
+    """Serve a finished export file to the user who requested it"""
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user)
+
+        if not job.is_downloadable:
+            messages.error(request, "This export is not available for download.")
+            return redirect('exports:my_exports')
+
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=job.file_name,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
@@ -1,9 +1,10 @@
 from django.db import models
+from django.db.models import Count, Q
 from django.contrib.auth import get_user_model
 from apps.organizations.models import *
 import datetime
 from django.utils import timezone
-from django.db import transaction
+from apps.common.sequences import allocate, max_code_number, next_number
 
 User = get_user_model()
 
@@ -300,49 +301,70 @@ class Hazard(models.Model):
     def __str__(self):
         return f"{self.report_number} - {self.hazard_title}"
     
+    def get_report_number_prefix(self):
+        date_str = datetime.date.today().strftime('%Y%m%d')
+        plant_code = self.plant.code if self.plant else 'XXX'
+        return f'HAZ-{plant_code}-{date_str}'
+
     def save(self, *args, **kwargs):
         # Generate report number if not exists
         if not self.report_number:
-            today = datetime.date.today()
-            date_str = today.strftime('%Y%m%d')
-            plant_code = self.plant.code if self.plant else 'XXX'
-
-            with transaction.atomic():
-                last_hazard = Hazard.objects.select_for_update().filter(
-                    report_number__startswith=f'HAZ-{plant_code}-{date_str}'
-                ).order_by('-report_number').first()
+            prefix = self.get_report_number_prefix()
+            number = next_number(
+                prefix,
+                seed=lambda: max_code_number(Hazard.objects.all(), 'report_number', prefix)
+            )
+            self.report_number = f'{prefix}-{number:03d}'
 
-                if last_hazard:
-                    last_number = int(last_hazard.report_number.split('-')[-1])
-                    new_number = last_number + 1
-                else:
-                    new_number = 1
+        super().save(*args, **kwargs)
 
-                self.report_number = f'HAZ-{plant_code}-{date_str}-{new_number:03d}'
+    @classmethod
+    def assign_report_numbers(cls, hazards):
+        """
+        Number unsaved hazards before bulk_create (which skips save()),
+        taking one block of numbers per plant/day prefix.
+        """
+        groups = {}
+        for hazard in hazards:
+            if not hazard.report_number:
+                groups.setdefault(hazard.get_report_number_prefix(), []).append(hazard)
 
-        super().save(*args, **kwargs)
+        for prefix, group in groups.items():
+            numbers = allocate(
+                prefix,
+                len(group),
+                seed=lambda prefix=prefix: max_code_number(cls.objects.all(), 'report_number', prefix)
+            )
+            for hazard, number in zip(group, numbers):
+                hazard.report_number = f'{prefix}-{number:03d}'
         
     def update_status_from_action_items(self):
         """
         Update hazard status based on action items progress
+        (one aggregate query; saves only when the status changes)
         """
-        action_items = self.action_items.all()
-        
-        if not action_items.exists():
+        counts = self.action_items.aggregate(
+            total=Count('pk'),
+            completed=Count('pk', filter=Q(status='COMPLETED')),
+            in_progress=Count('pk', filter=Q(status='IN_PROGRESS')),
+            pending=Count('pk', filter=Q(status='PENDING')),
+        )
+
+        if not counts['total']:
             return
-        
-        # Check if all action items are completed
-        all_completed = all(item.status == 'COMPLETED' for item in action_items)
-        
-        if all_completed:
-            self.status = 'RESOLVED'
-            self.save(update_fields=['status'])
-        elif action_items.filter(status='IN_PROGRESS').exists():
-            self.status = 'IN_PROGRESS'
+
+        if counts['completed'] == counts['total']:
+            status = 'RESOLVED'
+        elif counts['in_progress']:
+            status = 'IN_PROGRESS'
+        elif counts['pending'] and self.status == 'REPORTED':
+            status = 'ACTION_ASSIGNED'
+        else:
+            return
+
+        if status != self.status:
+            self.status = status
             self.save(update_fields=['status'])
-        elif action_items.filter(status='PENDING').exists() and self.status == 'REPORTED':
-            self.status = 'ACTION_ASSIGNED'
-            self.save(update_fields=['status'])      
         
     @property
     def is_action_overdue(self):
@@ -447,6 +469,16 @@ class HazardPhoto(models.Model):
         upload_to='hazard_photos/%Y/%m/',
         help_text="Hazard photo (max 5MB)"
     )
+    thumbnail = models.ImageField(
+        upload_to='hazard_photos/thumbnails/%Y/%m/',
+        blank=True,
+        help_text="Small rendition for lists and PDFs"
+    )
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the web rendition and thumbnail were built"
+    )
     photo_type = models.CharField(
         max_length=20,
         choices=PHOTO_TYPE_CHOICES,
@@ -646,6 +678,16 @@ class HazardActionItem(models.Model):
         }
         return status_classes.get(self.status, 'badge-secondary')
     
+    def get_completed_count(self):
+        """
+        Number of users who completed this item. Uses the completed_count
+        annotation when the queryset provides one, so lists of items do not
+        count completers one by one.
+        """
+        if hasattr(self, 'completed_count'):
+            return self.completed_count
+        return self.completed_by_users.count()
+
     @property
     def is_fully_completed(self):
         """
@@ -653,13 +695,12 @@ class HazardActionItem(models.Model):
         Returns True only when the number of completed users matches the number of assigned users.
         """
         responsible_users_count = self.get_emails_count()
-        completed_users_count = self.completed_by_users.count()
-        
+
         # If no one is assigned, it cannot be considered complete.
         if responsible_users_count == 0:
             return False
-            
-        return responsible_users_count > 0 and responsible_users_count == completed_users_count
+
+        return responsible_users_count == self.get_completed_count()
 
     def get_pending_users(self):
         """
@@ -679,13 +720,18 @@ class HazardActionItem(models.Model):
             # If the object is already saved in the database (has a primary key),
             # then we can safely check its many-to-many relationships.
             if self.pk:
-                if self.is_fully_completed:
+                # One count of completers against the assigned emails
+                # (fresh, not an annotation - completers may have just been added)
+                completed_count = self.completed_by_users.count()
+                responsible_users_count = self.get_emails_count()
+
+                if responsible_users_count and completed_count == responsible_users_count:
                     self.status = 'COMPLETED'
                     # Set completion date only when it becomes fully completed for the first time.
                     if not self.completion_date:
                         self.completion_date = timezone.now().date()
                 # If some (but not all) have completed, it's in progress.
-                elif self.completed_by_users.exists() and not self.is_fully_completed:
+                elif completed_count:
                     self.status = 'IN_PROGRESS'
                     self.completion_date = None # In-progress means it's not fully complete yet
                 # If NO ONE has completed it, it must be pending.
@@ -697,6 +743,11 @@ class HazardActionItem(models.Model):
             super().save(*args, **kwargs)
 
 class HazardNotification(models.Model):
+    """
+    Deprecated: superseded by notifications.Notification. Kept only until
+    existing rows are copied with `manage.py migrate_legacy_notifications`;
+    nothing writes to this table any more.
+    """
 
     NOTIFICATION_TYPES = [
         ('HAZARD_REPORTED','Hazard Reported'),
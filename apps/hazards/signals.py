@@ -1,19 +1,63 @@
 # apps/hazards/signals.py
 
+import threading
+
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import HazardActionItem
+from .models import Hazard, HazardActionItem
+
+# Hazards whose status must be recomputed when the current transaction commits
+_pending = threading.local()
+
+
+class _HazardStatusRefresh:
+    """on_commit callback recomputing each collected hazard once"""
+
+    def __init__(self):
+        self.hazard_ids = set()
+
+    def __call__(self):
+        if getattr(_pending, 'refresh', None) is self:
+            _pending.refresh = None
+        refresh_hazard_statuses(self.hazard_ids)
+
+
+def refresh_hazard_statuses(hazard_ids):
+    for hazard in Hazard.objects.filter(pk__in=hazard_ids):
+        hazard.update_status_from_action_items()
+
+
+def schedule_hazard_status_refresh(hazard_id):
+    """
+    Recompute a hazard's status after the current transaction commits.
+
+    Any number of action-item saves/deletes in one transaction cost one
+    recomputation per hazard. Outside a transaction it runs immediately.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        refresh_hazard_statuses([hazard_id])
+        return
+
+    refresh = getattr(_pending, 'refresh', None)
+    # A rolled-back (savepoint) block discards its callbacks - start a new batch then
+    if refresh is None or not any(callback[1] is refresh for callback in connection.run_on_commit):
+        refresh = _pending.refresh = _HazardStatusRefresh()
+        transaction.on_commit(refresh)
+    refresh.hazard_ids.add(hazard_id)
+
 
 @receiver(post_save, sender=HazardActionItem)
-def update_hazard_status_on_action_save(sender, instance, **kwargs):
+def update_hazard_status_on_action_save(sender, instance, raw=False, **kwargs):
     """
     Signal receiver triggered after a HazardActionItem is saved.
-    
-    This function calls the parent hazard's method to re-evaluate and update its status
-    based on the collective status of all its action items.
+
+    Schedules the parent hazard to re-evaluate its status based on the
+    collective status of all its action items.
     """
-    if instance.hazard:
-        instance.hazard.update_status_from_action_items()
+    if instance.hazard_id and not raw:
+        schedule_hazard_status_refresh(instance.hazard_id)
 
 
 @receiver(post_delete, sender=HazardActionItem)
@@ -24,5 +68,5 @@ def update_hazard_status_on_action_delete(sender, instance, **kwargs):
     This is crucial for scenarios where deleting the last action item should
     revert the hazard's status back to a previous state (e.g., 'APPROVED').
     """
-    if instance.hazard:
-        instance.hazard.update_status_from_action_items()
\ No newline at end of file
+    if instance.hazard_id:
+        schedule_hazard_status_refresh(instance.hazard_id)
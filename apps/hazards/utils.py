@@ -3,6 +3,11 @@ from io import BytesIO
 from django.http import HttpResponse
 from django.conf import settings
 import datetime
+from .models import Hazard
+
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -256,11 +261,13 @@ def generate_hazard_pdf(hazard):
             photo_table_data = []
             photo_row = []
             for photo in photos:
+                # Thumbnail is plenty for a 3 inch cell; fall back to the photo until it is processed
+                image_file = photo.thumbnail or photo.photo
                 # Pehle check karein ki photo object aur uska path maujood hai ya nahi
-                if photo.photo and hasattr(photo.photo, 'path') and os.path.exists(photo.photo.path):
+                if image_file and hasattr(image_file, 'path') and os.path.exists(image_file.path):
                     # Agar file exist karti hai, to use process karne ki koshish karein
                     try:
-                        img = Image(photo.photo.path, width=3*inch, height=3*inch, kind='proportional')
+                        img = Image(image_file.path, width=3*inch, height=3*inch, kind='proportional')
                         img.hAlign = 'CENTER'
                         photo_row.append(img)
                     except Exception as e:
@@ -304,4 +311,140 @@ def generate_hazard_pdf(hazard):
     response['Content-Disposition'] = f'attachment; filename="Hazard_Report_{hazard.report_number}.pdf"'
     response.write(pdf)
     
-    return response
\ No newline at end of file
+    return response
+
+
+# =============================================================================
+# EXCEL EXPORT
+# Used by the background export job (apps.exports) for ExportHazardsView.
+# =============================================================================
+def get_hazard_export_queryset(user, params):
+    """
+    Permission-scoped, filtered hazard queryset for the Excel export.
+    params mirrors the hazard dashboard query string (plant, zone, location,
+    sublocation, severity, status, month).
+    """
+    # 1. Base queryset scoped to the user's plants.
+    if user.is_superuser or user.is_staff or getattr(user, 'is_admin_user', False):
+        queryset = Hazard.objects.all()
+    else:
+        assigned_plants = user.assigned_plants.filter(is_active=True)
+        if assigned_plants.exists():
+            queryset = Hazard.objects.filter(plant__in=assigned_plants)
+        elif getattr(user, 'plant', None):
+            queryset = Hazard.objects.filter(plant=user.plant)
+        else:
+            queryset = Hazard.objects.filter(reported_by=user)
+
+    # 2. Now, apply the dashboard filters.
+    selected_plant = params.get('plant')
+    selected_zone = params.get('zone')
+    selected_location = params.get('location')
+    selected_sublocation = params.get('sublocation')
+    selected_severity = params.get('severity')
+    selected_status = params.get('status')
+    selected_month = params.get('month')
+
+    # The plant filter is ONLY applied if the user is an Admin/Superuser.
+    if selected_plant and (user.is_superuser or (hasattr(user, 'role') and user.role.name == 'ADMIN')):
+        queryset = queryset.filter(plant_id=selected_plant)
+    
+    # Apply other filters to the permission-scoped queryset.
+    if selected_zone:
+        queryset = queryset.filter(zone_id=selected_zone)
+    if selected_location:
+        queryset = queryset.filter(location_id=selected_location)
+    if selected_sublocation:
+        queryset = queryset.filter(sublocation_id=selected_sublocation)
+    if selected_severity:
+        queryset = queryset.filter(severity__iexact=selected_severity)
+    if selected_status == 'open':
+        queryset = queryset.exclude(status__in=['RESOLVED', 'CLOSED'])
+    
+    if selected_month:
+        try:
+            year, month = map(int, selected_month.split('-'))
+            queryset = queryset.filter(incident_datetime__year=year, incident_datetime__month=month)
+        except (ValueError, TypeError):
+            pass
+    
+    # Optimize database queries.
+    queryset = queryset.select_related(
+        'plant', 'zone', 'location', 'sublocation', 'reported_by'
+    )
+
+    return queryset
+
+
+def write_hazards_excel(queryset, output):
+    """Write the hazards report workbook for queryset into output (path or file object)"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Hazards Report'
+
+    # --- Define Styles ---
+    header_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
+    header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
+    header_align = Alignment(horizontal='center', vertical='center')
+    wrap_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
+
+    # --- Headers ---
+    headers = [
+        'Report Number', 'Title', 'Type', 'Category', 'Severity', 'Status',
+        'Incident Datetime', 'Reported By', 'Reported Date', 'Plant', 'Zone',
+        'Location', 'Sub-Location', 'Description', 'Action Deadline'
+    ]
+    sheet.append(headers)
+    
+    # Style header row
+    for cell in sheet[1]:
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_align
+
+    # --- Data Population ---
+    for hazard in queryset:
+        row_data = [
+            hazard.report_number,
+            hazard.hazard_title,
+            hazard.get_hazard_type_display(),
+            hazard.get_hazard_category_display(),
+            hazard.get_severity_display(),
+            hazard.get_status_display(),
+            hazard.incident_datetime.strftime('%Y-%m-%d %H:%M') if hazard.incident_datetime else '',
+            hazard.reported_by.get_full_name() if hazard.reported_by else 'N/A',
+            hazard.created_at.strftime('%Y-%m-%d') if hazard.created_at else '',
+            hazard.plant.name if hazard.plant else 'N/A',
+            hazard.zone.name if hazard.zone else 'N/A',
+            hazard.location.name if hazard.location else 'N/A',
+            hazard.sublocation.name if hazard.sublocation else 'N/A',
+            hazard.hazard_description,
+            hazard.action_deadline.strftime('%Y-%m-%d') if hazard.action_deadline else ''
+        ]
+        sheet.append(row_data)
+
+    # --- Auto-adjust Column Widths and Apply Wrapping ---
+    desc_col_letter = get_column_letter(headers.index('Description') + 1)
+    title_col_letter = get_column_letter(headers.index('Title') + 1)
+
+    for col_idx, column_cells in enumerate(sheet.columns, 1):
+        column_letter = get_column_letter(col_idx)
+        # Set a fixed width for columns that need text wrapping
+        if column_letter in [desc_col_letter, title_col_letter]:
+            sheet.column_dimensions[column_letter].width = 50
+            # Apply wrap text to all cells in the description/title column
+            for cell in column_cells:
+                cell.alignment = wrap_alignment
+        else:
+            # Auto-size other columns
+            max_length = 0
+            for cell in column_cells:
+                try:
+                    if len(str(cell.value)) > max_length:
+                        max_length = len(str(cell.value))
+                except:
+                    pass
+            sheet.column_dimensions[column_letter].width = max_length + 2
+
+    workbook.save(output)
+    return output
@@ -1,11 +1,13 @@
 from urllib import request
+import logging
 
+from django.db import transaction
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DetailView, TemplateView
 from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.http import JsonResponse
 from django.utils import timezone
 from apps.organizations.models import *
@@ -14,19 +16,16 @@ from django.utils.safestring import mark_safe  # ADD THIS IMPORT
 
 from django.contrib.auth import get_user_model
 import datetime
-import openpyxl
-from openpyxl.utils import get_column_letter
-from django.http import HttpResponse
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from .utils import generate_hazard_pdf
 from django.views import View
-from apps.common.image_utils import compress_image
+from apps.common.image_utils import is_image, queue_photo_processing
 
 import json
 from django.db.models import Count
 from django.db.models.functions import TruncMonth
 from .forms import HazardForm
 from apps.notifications.services import NotificationService
+from apps.ENVdata.signals import schedule_rollup_refresh
 
 # Make sure all models are imported
 from apps.organizations.models import Plant, Zone, Location, SubLocation
@@ -34,6 +33,7 @@ from apps.organizations.models import Plant, Zone, Location, SubLocation
 
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class HazardDashboardView(LoginRequiredMixin, TemplateView):
@@ -183,20 +183,20 @@ class HazardCreateView(LoginRequiredMixin, CreateView):
         return self.handle_multiple_hazards(request)
     
     def handle_multiple_hazards(self, request):
-        """Handle single or multiple hazard submissions"""
+        """
+        Handle single or multiple hazard submissions.
+
+        Every hazard is validated before anything is written; the hazards and
+        their photos are then created together in one transaction and one
+        notification covers the whole submission.
+        """
         user = request.user
         hazard_count = int(request.POST.get('hazard_count', 1))
-        
-        created_hazards = []
-        photos_uploaded_total = 0
-        
-        print(f"\n{'='*80}")
-        print(f"🔄 Processing {hazard_count} hazard(s)")
-        print(f"{'='*80}\n")
-        
+
+        hazards = []
+        uploads = []  # (hazard, uploaded file)
+
         for hazard_index in range(hazard_count):
-            print(f"\n--- Processing Hazard #{hazard_index + 1} ---")
-            
             # Create new hazard instance
             hazard = Hazard()
             prefix = f'hazard_{hazard_index}_'
@@ -206,7 +206,6 @@ class HazardCreateView(LoginRequiredMixin, CreateView):
             hazard.reporter_name = user.get_full_name()
             hazard.reporter_email = user.email
             hazard.reporter_phone = getattr(user, 'phone', '')
-            # hazard.report_timestamp = timezone.now()
             hazard.report_source = 'web_portal'
             
             # Get hazard-specific fields
@@ -216,8 +215,6 @@ class HazardCreateView(LoginRequiredMixin, CreateView):
             hazard_description = request.POST.get(f'{prefix}hazard_description')
             immediate_action = request.POST.get(f'{prefix}immediate_action', '')
             
-            print(f"  Type: {hazard_type}, Category: {hazard_category}, Severity: {severity}")
-            
             # Validate required fields
             if not hazard_type or not hazard_category or not severity or not hazard_description:
                 messages.error(request, f'Missing required fields for Hazard #{hazard_index + 1}')
@@ -266,12 +263,16 @@ class HazardCreateView(LoginRequiredMixin, CreateView):
             if not location_id and hasattr(user, 'location') and user.location:
                 location_id = user.location.id
             
-            print(f"  Plant: {plant_id}, Zone: {zone_id}, Location: {location_id}")
-            
             # Validate required location fields
             if not plant_id:
                 messages.error(request, f'Plant is required for Hazard #{hazard_index + 1}')
                 return redirect('hazards:hazard_create')
+
+            try:
+                plant_id = int(plant_id)
+            except (TypeError, ValueError):
+                messages.error(request, f'Invalid plant selected for Hazard #{hazard_index + 1}')
+                return redirect('hazards:hazard_create')
             
             if not location_id:
                 messages.error(request, f'Location is required for Hazard #{hazard_index + 1}')
@@ -318,68 +319,66 @@ class HazardCreateView(LoginRequiredMixin, CreateView):
                 days=severity_days.get(severity, 15)
             )
             
-            # Save hazard
-            try:
-                hazard.save()
-                print(f"  ✅ Saved with ID: {hazard.id}")
-            except Exception as e:
-                print(f"  ❌ Save error: {e}")
-                import traceback
-                traceback.print_exc()
-                messages.error(request, f'Error saving Hazard #{hazard_index + 1}: {str(e)}')
-                continue
-            
-            # Generate report number
-            # today = timezone.now().date()
-            # plant_code = hazard.plant.code if hazard.plant else 'UNKN'
-            # count = Hazard.objects.filter(created_at__date=today).count()
-            # hazard.report_number = f"HAZ-{plant_code}-{today:%Y%m%d}-{count:03d}"
-            # hazard.save(update_fields=['report_number'])
-            # print(f"  📋 Report: {hazard.report_number}")
-            
-            # Handle photos
-            photos_uploaded = 0
+            hazards.append(hazard)
+
+            # Photos
             photo_count = int(request.POST.get(f'{prefix}photo_count', 1))
-            
             for i in range(photo_count + 5):
                 photo_key = f'{prefix}photo_{i}'
                 if photo_key in request.FILES:
-                    try:
-                        photo = request.FILES[photo_key]
-                        compressed_photo = compress_image(photo)
-                        HazardPhoto.objects.create(
-                            hazard=hazard,
-                            photo=compressed_photo,
-                            photo_type='evidence',
-                            uploaded_by=user
-                        )
-                        photos_uploaded += 1
-                    except Exception as e:
-                        print(f"  Photo error: {e}")
-            
-            photos_uploaded_total += photos_uploaded
-            created_hazards.append(hazard)
-            
-            # Send notifications
+                    upload = request.FILES[photo_key]
+                    if not is_image(upload):
+                        messages.error(request, f'{upload.name} is not a valid image (Hazard #{hazard_index + 1})')
+                        return redirect('hazards:hazard_create')
+                    uploads.append((hazard, upload))
+
+        # Report number prefixes need the plant code
+        plants = Plant.objects.in_bulk({hazard.plant_id for hazard in hazards})
+        for index, hazard in enumerate(hazards, start=1):
+            plant = plants.get(hazard.plant_id)
+            if plant is None:
+                messages.error(request, f'Plant is required for Hazard #{index}')
+                return redirect('hazards:hazard_create')
+            hazard.plant = plant
+
+        try:
+            with transaction.atomic():
+                Hazard.assign_report_numbers(hazards)
+                Hazard.objects.bulk_create(hazards)
+                photos = HazardPhoto.objects.bulk_create([
+                    HazardPhoto(hazard=hazard, photo=upload, photo_type='evidence', uploaded_by=user)
+                    for hazard, upload in uploads
+                ])
+                # Originals are stored as uploaded; renditions are built in the background
+                queue_photo_processing(photos)
+                # bulk_create skips post_save, so refresh indicator rollups explicitly
+                schedule_rollup_refresh(Hazard, hazards)
+        except Exception as e:
+            logger.exception("Failed to create hazard submission")
+            messages.error(request, f'Error saving hazards: {str(e)}')
+            return redirect('hazards:hazard_create')
+
+        # One notification per plant/zone/location in the submission, so the
+        # stakeholders of every hazard's own scope are notified
+        scopes = {}
+        for hazard in hazards:
+            scopes.setdefault((hazard.plant_id, hazard.zone_id, hazard.location_id), []).append(hazard)
+        for scope_hazards in scopes.values():
             try:
-                from apps.notifications.services import NotificationService
                 NotificationService.notify(
-                    content_object=hazard,
+                    content_object=scope_hazards[0],
                     notification_type='HAZARD_REPORTED',
-                    module='HAZARD'
+                    module='HAZARD',
+                    related_objects=scope_hazards[1:]
                 )
-            except Exception as e:
-                print(f"  Notification error: {e}")
-        
-        print(f"\n✅ Total created: {len(created_hazards)}")
-        
+            except Exception:
+                logger.exception("Failed to queue hazard notification")
+
+        photos_uploaded_total = len(photos)
+
         # Success messages
-        if not created_hazards:
-            messages.error(request, 'No hazards were created. Please try again.')
-            return redirect('hazards:hazard_create')
-        
-        if len(created_hazards) == 1:
-            hazard = created_hazards[0]
+        if len(hazards) == 1:
+            hazard = hazards[0]
             messages.success(
                 request,
                 mark_safe(
@@ -390,11 +389,11 @@ class HazardCreateView(LoginRequiredMixin, CreateView):
                 )
             )
         else:
-            report_numbers = ', '.join([h.report_number for h in created_hazards])
+            report_numbers = ', '.join([h.report_number for h in hazards])
             messages.success(
                 request,
                 mark_safe(
-                    f'<strong>✅ {len(created_hazards)} Hazards Submitted!</strong><br>'
+                    f'<strong>✅ {len(hazards)} Hazards Submitted!</strong><br>'
                     f'Reports: {report_numbers}<br>'
                     f'Photos: {photos_uploaded_total}'
                 )
@@ -402,8 +401,7 @@ class HazardCreateView(LoginRequiredMixin, CreateView):
         
         return redirect(self.success_url)
 
-    
-    
+
 class HazardDetailView(LoginRequiredMixin, DetailView):
     """
     Display details of a specific hazard, optimized for performance.
@@ -425,7 +423,13 @@ class HazardDetailView(LoginRequiredMixin, DetailView):
             'behalf_person_dept'
         ).prefetch_related(
             'photos', 
-            'action_items'  # ✅ FIXED: Just prefetch action_items (no responsible_person)
+            # completed_count lets the template show progress without a count per item
+            Prefetch(
+                'action_items',
+                queryset=HazardActionItem.objects.annotate(
+                    completed_count=Count('completed_by_users', distinct=True)
+                ).prefetch_related('completed_by_users')
+            )
         )
 
     def get_context_data(self, **kwargs):
@@ -436,7 +440,7 @@ class HazardDetailView(LoginRequiredMixin, DetailView):
         
         context = super().get_context_data(**kwargs)
         
-        hazard = self.get_object()
+        hazard = self.object
         context['action_items'] = hazard.action_items.all()
         context['photos'] = hazard.photos.all()
         context['cancel_url'] = (self.request.GET.get('next') or self.request.META.get('HTTP_REFERER') or '/')
@@ -528,26 +532,31 @@ class HazardUpdateView(LoginRequiredMixin, UpdateView):
                 HazardPhoto.objects.filter(id=photo_id, hazard=hazard).delete()
                 print(f"🗑️ Deleted photo: {photo_id}")
 
-        # Handle new photo uploads
+        # Handle new photo uploads (resized in the background)
+        new_photos = []
         photo_index = 0
         while True:
             photo_key = f'photo_{photo_index}'
             if photo_key in self.request.FILES:
                 try:
                     photo = self.request.FILES[photo_key]
-                    compressed_photo = compress_image(photo)
-                    HazardPhoto.objects.create(
+                    if not is_image(photo):
+                        messages.warning(self.request, f'{photo.name} is not a valid image and was not uploaded')
+                        photo_index += 1
+                        continue
+                    new_photos.append(HazardPhoto.objects.create(
                         hazard=hazard,
-                        photo=compressed_photo,
+                        photo=photo,
                         photo_type='evidence',
                         uploaded_by=user
-                    )
+                    ))
                     print(f"📸 Added new photo: {photo_key}")
                 except Exception as e:
                     print(f"❌ Error uploading photo {photo_key}: {e}")
                 photo_index += 1
             else:
                 break
+        queue_photo_processing(new_photos)
         
         # Success message
         messages.success(
@@ -948,12 +957,9 @@ class HazardActionItemUpdateView(LoginRequiredMixin, UpdateView):
                 self.object.completed_by_users.clear()
 
             # Final save will trigger the model's logic to set the correct status
+            # (the post_save signal then updates the parent hazard status)
             self.object.save()
 
-            # Update parent hazard status
-            if hasattr(self.object.hazard, "update_status_from_action_items"):
-                self.object.hazard.update_status_from_action_items()
-
             messages.success(
                 request,
                 mark_safe(
@@ -1234,138 +1240,22 @@ class GetSubLocationsForLocationAjaxView(LoginRequiredMixin, TemplateView):
         # Return the queryset as a JSON response.
         return JsonResponse(list(sublocations), safe=False)
 class ExportHazardsView(LoginRequiredMixin, View):
+    """Queue a background hazards Excel export for the current dashboard filters"""
     def get(self, request, *args, **kwargs):
-        user = self.request.user
+        from apps.exports.services import request_export
 
-        # 1. First, establish the base queryset based on user permissions.
-        # This logic now mirrors the Incident export view.
-        user = request.user
-        if user.is_superuser or user.is_staff or getattr(user, 'is_admin_user', False):
-            queryset = Hazard.objects.all()
-        else:
-            assigned_plants = user.assigned_plants.filter(is_active=True)
-            if assigned_plants.exists():
-                queryset = Hazard.objects.filter(plant__in=assigned_plants)
-            elif getattr(user, 'plant', None):
-                queryset = Hazard.objects.filter(plant=user.plant)
-            else:
-                queryset = Hazard.objects.filter(reported_by=user)
-
-        # 2. Now, apply filters from the URL.
-        selected_plant = request.GET.get('plant')
-        selected_zone = request.GET.get('zone')
-        selected_location = request.GET.get('location')
-        selected_sublocation = request.GET.get('sublocation')
-        selected_severity = request.GET.get('severity')
-        selected_status = request.GET.get('status')
-        selected_month = request.GET.get('month')
-
-        # The plant filter from the URL is ONLY applied if the user is an Admin/Superuser.
-        if selected_plant and (user.is_superuser or (hasattr(user, 'role') and user.role.name == 'ADMIN')):
-            queryset = queryset.filter(plant_id=selected_plant)
-        
-        # Apply other filters to the permission-scoped queryset.
-        if selected_zone:
-            queryset = queryset.filter(zone_id=selected_zone)
-        if selected_location:
-            queryset = queryset.filter(location_id=selected_location)
-        if selected_sublocation:
-            queryset = queryset.filter(sublocation_id=selected_sublocation)
-        if selected_severity:
-            queryset = queryset.filter(severity__iexact=selected_severity)
-        if selected_status == 'open':
-            queryset = queryset.exclude(status__in=['RESOLVED', 'CLOSED'])
-        
-        if selected_month:
-            try:
-                year, month = map(int, selected_month.split('-'))
-                queryset = queryset.filter(incident_datetime__year=year, incident_datetime__month=month)
-            except (ValueError, TypeError):
-                pass
-        
-        # Optimize database queries.
-        queryset = queryset.select_related(
-            'plant', 'zone', 'location', 'sublocation', 'reported_by'
-        )
-
-        # --- Excel generation code starts here ---
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = 'Hazards Report'
-
-        # --- Define Styles ---
-        header_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
-        header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
-        header_align = Alignment(horizontal='center', vertical='center')
-        wrap_alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-
-        # --- Headers ---
-        headers = [
-            'Report Number', 'Title', 'Type', 'Category', 'Severity', 'Status',
-            'Incident Datetime', 'Reported By', 'Reported Date', 'Plant', 'Zone',
-            'Location', 'Sub-Location', 'Description', 'Action Deadline'
-        ]
-        sheet.append(headers)
-        
-        # Style header row
-        for cell in sheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_align
-
-        # --- Data Population ---
-        for hazard in queryset:
-            row_data = [
-                hazard.report_number,
-                hazard.hazard_title,
-                hazard.get_hazard_type_display(),
-                hazard.get_hazard_category_display(),
-                hazard.get_severity_display(),
-                hazard.get_status_display(),
-                hazard.incident_datetime.strftime('%Y-%m-%d %H:%M') if hazard.incident_datetime else '',
-                hazard.reported_by.get_full_name() if hazard.reported_by else 'N/A',
-                hazard.created_at.strftime('%Y-%m-%d') if hazard.created_at else '',
-                hazard.plant.name if hazard.plant else 'N/A',
-                hazard.zone.name if hazard.zone else 'N/A',
-                hazard.location.name if hazard.location else 'N/A',
-                hazard.sublocation.name if hazard.sublocation else 'N/A',
-                hazard.hazard_description,
-                hazard.action_deadline.strftime('%Y-%m-%d') if hazard.action_deadline else ''
-            ]
-            sheet.append(row_data)
-
-        # --- Auto-adjust Column Widths and Apply Wrapping ---
-        desc_col_letter = get_column_letter(headers.index('Description') + 1)
-        title_col_letter = get_column_letter(headers.index('Title') + 1)
-
-        for col_idx, column_cells in enumerate(sheet.columns, 1):
-            column_letter = get_column_letter(col_idx)
-            # Set a fixed width for columns that need text wrapping
-            if column_letter in [desc_col_letter, title_col_letter]:
-                sheet.column_dimensions[column_letter].width = 50
-                # Apply wrap text to all cells in the description/title column
-                for cell in column_cells:
-                    cell.alignment = wrap_alignment
-            else:
-                # Auto-size other columns
-                max_length = 0
-                for cell in column_cells:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                sheet.column_dimensions[column_letter].width = max_length + 2
-
-        # --- HTTP Response ---
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        )
-        filename = f"Hazards_Report_{timezone.now().strftime('%Y-%m-%d')}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        params = {
+            key: request.GET.get(key)
+            for key in ('plant', 'zone', 'location', 'sublocation', 'severity', 'status', 'month')
+            if request.GET.get(key)
+        }
+        job, created = request_export(request.user, 'HAZARDS', params)
 
-        workbook.save(response)
-        return response
+        if created:
+            messages.info(request, "Your hazards report is being prepared. It will appear in My Exports when ready.")
+        else:
+            messages.info(request, "An identical hazards report is already being prepared.")
+        return redirect('exports:my_exports')
     
     
     
@@ -1659,12 +1549,10 @@ class ActionItemCompleteView(LoginRequiredMixin, UpdateView):
                 action_item.attachment = request.FILES['completion_attachment']
             
             # 3. Save the action item. The model's save() method will now automatically handle
-            # updating the status to 'IN_PROGRESS' or 'COMPLETED'.
+            # updating the status to 'IN_PROGRESS' or 'COMPLETED', and the post_save
+            # signal updates the parent hazard's status.
             action_item.save()
             
-            # 4. Trigger the parent hazard's status update.
-            action_item.hazard.update_status_from_action_items()
-            
             # --- END OF MODIFIED LOGIC ---
 
             try:
@@ -4,6 +4,7 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.accounts.models import User
 from apps.organizations.models import Plant, Zone, Location, SubLocation, Department
+from apps.common.sequences import max_code_number, next_number
 from django.utils import timezone
 
 class InspectionCategory(models.Model):
@@ -197,22 +198,13 @@ class InspectionQuestion(models.Model):
         """Auto-generate question code based on category"""
         category_code = self.category.category_code
         
-        # Get last question number for this category
-        last_question = InspectionQuestion.objects.filter(
-            category=self.category,
-            question_code__startswith=category_code
-        ).order_by('-question_code').first()
-        
-        if last_question:
-            try:
-                # Extract number from code like "FS-001"
-                last_num = int(last_question.question_code.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-        
+        # Namespaced so a category code can never share a counter with another document prefix
+        new_num = next_number(
+            f"question:{category_code}",
+            seed=lambda: max_code_number(
+                InspectionQuestion.objects.filter(category=self.category), 'question_code', f"{category_code}-"
+            )
+        )
         return f"{category_code}-{new_num:03d}"
 
 
@@ -320,23 +312,16 @@ class InspectionTemplate(models.Model):
     def save(self, *args, **kwargs):
         if not self.template_code:
             self.template_code = self.generate_template_code()
-            super().save(*args,**kwargs)
+        super().save(*args,**kwargs)
     
     def generate_template_code(self):
         """Generate Unique template code for every template"""
         prefix = f"TEMP-{self.inspection_type}"
 
-        last_template = InspectionTemplate.objects.filter(template_code__startswith=prefix).order_by('-template_code').first()
-
-        if last_template:
-            try:
-                last_num = int(last_template.template_code.split('-')[-1])
-                new_num = last_num + 1
-            except(ValueError,IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-        
+        new_num = next_number(
+            prefix,
+            seed=lambda: max_code_number(InspectionTemplate.objects.all(), 'template_code', prefix)
+        )
         return f"{prefix}-{new_num:03d}"
 
 
@@ -537,22 +522,13 @@ class InspectionSchedule(models.Model):
     def generate_schedule_code(self):
         """Generate unique schedule code"""
         from datetime import datetime
-        date_str = datetime.now().strftime('%Y%m')
-        
-        last_schedule = InspectionSchedule.objects.filter(
-            schedule_code__startswith=f"INSP-{date_str}"
-        ).order_by('-schedule_code').first()
-        
-        if last_schedule:
-            try:
-                last_num = int(last_schedule.schedule_code.split('-')[-1])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                new_num = 1
-        else:
-            new_num = 1
-        
-        return f"INSP-{date_str}-{new_num:04d}"
+        prefix = f"INSP-{datetime.now().strftime('%Y%m')}"
+
+        new_num = next_number(
+            prefix,
+            seed=lambda: max_code_number(InspectionSchedule.objects.all(), 'schedule_code', prefix)
+        )
+        return f"{prefix}-{new_num:04d}"
     
     @property
     def is_overdue(self):
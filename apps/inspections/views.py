@@ -21,6 +21,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from .models import *
 from .forms import *
 from apps.notifications.services import NotificationService
+from apps.common.sequences import allocate, max_code_number
 
 
 
@@ -1182,25 +1183,17 @@ def inspection_start(request, schedule_id):
 
 
 
-def generate_finding_code(submission):
-    """Generate unique finding code"""
+def generate_finding_codes(count=1):
+    """Reserve count consecutive unique finding codes"""
     from datetime import datetime
-    date_str = datetime.now().strftime('%Y%m')
-    
-    last_finding = InspectionFinding.objects.filter(
-        finding_code__startswith=f"FIND-{date_str}"
-    ).order_by('-finding_code').first()
-    
-    if last_finding:
-        try:
-            last_num = int(last_finding.finding_code.split('-')[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    
-    return f"FIND-{date_str}-{new_num:04d}"
+    prefix = f"FIND-{datetime.now().strftime('%Y%m')}"
+
+    numbers = allocate(
+        prefix,
+        count,
+        seed=lambda: max_code_number(InspectionFinding.objects.all(), 'finding_code', prefix)
+    )
+    return [f"{prefix}-{new_num:04d}" for new_num in numbers]
 @login_required
 def inspection_submit(request, schedule_id):
     """HOD submits the completed inspection"""
@@ -1228,6 +1221,7 @@ def inspection_submit(request, schedule_id):
             ).select_related('question')
             no_answers = []
             missing_answers = []
+            auto_findings = []
             for tq in template_questions:
                 question = tq.question
                 field_name = f"question_{question.id}"
@@ -1252,21 +1246,24 @@ def inspection_submit(request, schedule_id):
                 # Track
                 if answer == 'No':
                     no_answers.append({'question': question,'response': response})
-                    # Auto finding 
+                    # Auto finding (codes reserved in one block below)
                     if question.auto_generate_finding:
-                        InspectionFinding.objects.create(
+                        auto_findings.append(InspectionFinding(
                             submission=submission,
                             question=question,
-                            finding_code=generate_finding_code(submission),
                             description=f"Non-compliance found: {question.question_text}",
                             priority='HIGH' if question.is_critical else 'MEDIUM',
                             status='OPEN'
-                        )
+                        ))
             if missing_answers:
                 submission.delete()
                 messages.error(request,
                     f"Please answer all mandatory questions: {', '.join(missing_answers[:3])}")
                 return redirect('inspections:inspection_start', schedule_id=schedule_id)
+            if auto_findings:
+                for finding, code in zip(auto_findings, generate_finding_codes(len(auto_findings))):
+                    finding.finding_code = code
+                InspectionFinding.objects.bulk_create(auto_findings)
             # Calculate compliance 
             submission.compliance_score = submission.calculate_compliance_score()
             submission.save()
@@ -3,4 +3,7 @@ from .models import *
 
 admin.site.register(NotificationMaster)
 admin.site.register(Notification)
+admin.site.register(NotificationDigestItem)
+admin.site.register(ArchivedNotification)
+admin.site.register(PendingNotificationEvent)
 # Register your models here.
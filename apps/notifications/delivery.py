@@ -0,0 +1,116 @@
+# apps/notifications/delivery.py
+"""
+Batched email delivery over a single SMTP connection.
+
+Opening a TLS session to the mail provider is the slow part of sending an
+email, so a notification event sends all of its messages through one
+connection, paced to the provider's per-minute cap. The cap is shared by
+every worker through a per-minute counter in the shared cache, so
+concurrent deliveries cannot exceed it together. Transient failures
+(dropped connections, 4xx replies) reconnect and retry with backoff;
+permanent ones (rejected recipients, 5xx) are reported and skipped.
+"""
+
+import logging
+import smtplib
+import socket
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+# send_batch outcome per message
+SENT = 'sent'
+TRANSIENT = 'transient'  # may succeed if the event is retried later
+PERMANENT = 'permanent'  # rejected; retrying will not help
+
+
+def is_transient_error(exc):
+    """Whether retrying the same message later can succeed"""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, socket.timeout, OSError))
+
+
+def _rate_key(window):
+    return f"notifications:email:sent:{window}"
+
+
+def acquire_send_slot(max_per_minute):
+    """
+    Wait until the shared per-minute budget has room for one more email.
+
+    Returns:
+        False if the shared cache is unreachable (the caller paces locally)
+    """
+    while True:
+        window = int(time.time() // 60)
+        key = _rate_key(window)
+        try:
+            cache.add(key, 0, timeout=120)
+            sent = cache.incr(key)
+        except Exception:
+            logger.warning("[Email] Shared rate limit unavailable, pacing locally", exc_info=True)
+            return False
+        if sent <= max_per_minute:
+            return True
+        time.sleep(max((window + 1) * 60 - time.time(), 0.1))
+
+
+def send_batch(messages):
+    """
+    Send EmailMessages through one pooled connection.
+
+    Paced to EMAIL_MAX_PER_MINUTE across all workers; each message gets
+    EMAIL_SEND_ATTEMPTS tries with exponential backoff starting at
+    EMAIL_RETRY_BACKOFF_SECONDS.
+
+    Returns:
+        List with SENT, TRANSIENT or PERMANENT for the message at each index
+    """
+    results = [TRANSIENT] * len(messages)
+    if not messages:
+        return results
+
+    max_per_minute = getattr(settings, 'EMAIL_MAX_PER_MINUTE', 0)
+    interval = 60.0 / max_per_minute if max_per_minute else 0
+    attempts = max(1, getattr(settings, 'EMAIL_SEND_ATTEMPTS', 3))
+    backoff = getattr(settings, 'EMAIL_RETRY_BACKOFF_SECONDS', 2)
+
+    connection = get_connection(fail_silently=False)
+    last_sent_at = None
+
+    try:
+        for index, message in enumerate(messages):
+            for attempt in range(1, attempts + 1):
+                if interval and not acquire_send_slot(max_per_minute) and last_sent_at is not None:
+                    wait = last_sent_at + interval - time.monotonic()
+                    if wait > 0:
+                        time.sleep(wait)
+
+                try:
+                    # No-op while the connection is already open
+                    connection.open()
+                    results[index] = SENT if connection.send_messages([message]) else PERMANENT
+                    last_sent_at = time.monotonic()
+                    break
+                except Exception as exc:
+                    transient = is_transient_error(exc)
+                    if not transient or attempt == attempts:
+                        results[index] = TRANSIENT if transient else PERMANENT
+                        logger.warning(f"[Email] Giving up on {message.to} after {attempt} attempt(s): {exc}")
+                        break
+
+                    delay = backoff * 2 ** (attempt - 1)
+                    logger.info(f"[Email] Transient error for {message.to} ({exc}), retrying in {delay}s")
+                    connection.close()
+                    time.sleep(delay)
+    finally:
+        connection.close()
+
+    return results
@@ -0,0 +1,104 @@
+from datetime import datetime, time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accidents.models import Incident, IncidentNotification
+from apps.hazards.models import Hazard, HazardNotification
+from apps.notifications.models import Notification
+
+# Legacy type codes that differ from NotificationMaster events
+INCIDENT_TYPE_MAP = {
+    'INVESTIGATION_DUE': 'INCIDENT_INVESTIGATION_DUE',
+    'INVESTIGATION_OVERDUE': 'INCIDENT_INVESTIGATION_OVERDUE',
+    'ACTION_ASSIGNED': 'INCIDENT_ACTION_ASSIGNED',
+    'ACTION_DUE': 'INCIDENT_ACTION_DUE',
+}
+HAZARD_TYPE_MAP = {
+    'ACTION_ASSIGNED': 'HAZARD_ACTION_ASSIGNED',
+    'ACTION_DUE': 'HAZARD_ACTION_DUE',
+}
+
+
+class Command(BaseCommand):
+    help = 'Copy IncidentNotification/HazardNotification rows into the unified Notification table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete legacy rows once they have been copied'
+        )
+
+    def handle(self, *args, **options):
+        sources = [
+            ('incident', IncidentNotification, Incident, 'incident_id', 'notification_type', INCIDENT_TYPE_MAP),
+            ('hazard', HazardNotification, Hazard, 'hazard_id', 'notifications_type', HAZARD_TYPE_MAP),
+        ]
+
+        for label, legacy_model, target_model, object_field, type_field, type_map in sources:
+            copied = self.copy_rows(label, legacy_model, target_model, object_field, type_field, type_map, options)
+            self.stdout.write(self.style.SUCCESS(f"{legacy_model.__name__}: copied {copied} rows"))
+
+            if options['delete']:
+                deleted, _ = legacy_model.objects.all().delete()
+                self.stdout.write(f"{legacy_model.__name__}: deleted {deleted} legacy rows")
+
+    def copy_rows(self, label, legacy_model, target_model, object_field, type_field, type_map, options):
+        content_type = ContentType.objects.get_for_model(target_model)
+        batch_size = options['batch_size']
+        copied = 0
+
+        rows = legacy_model.objects.order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            # event_key marks a row as copied, so re-running skips it
+            keys = {row.pk: f"legacy-{label}:{row.pk}" for row in batch}
+            done = set(Notification.objects.filter(event_key__in=keys.values()).values_list('event_key', flat=True))
+
+            notifications = []
+            for row in batch:
+                if keys[row.pk] in done:
+                    continue
+                legacy_type = getattr(row, type_field)
+                notification = Notification(
+                    content_type=content_type,
+                    object_id=getattr(row, object_field),
+                    recipient_id=row.recipient_id,
+                    notification_type=type_map.get(legacy_type, legacy_type),
+                    title=row.title,
+                    message=row.message,
+                    is_read=bool(row.is_read),
+                    read_at=row.read_at,
+                    event_key=keys[row.pk],
+                )
+                notification.legacy_created_at = self.as_datetime(row.created_at)
+                notifications.append(notification)
+
+            if not notifications:
+                continue
+
+            with transaction.atomic():
+                Notification.objects.bulk_create(notifications)
+                # created_at is auto_now_add, so restore the original timestamps afterwards
+                for notification in notifications:
+                    notification.created_at = notification.legacy_created_at
+                Notification.objects.bulk_update(notifications, ['created_at'])
+            copied += len(notifications)
+
+        return copied
+
+    @staticmethod
+    def as_datetime(value):
+        # HazardNotification.created_at is a DateField
+        if isinstance(value, datetime):
+            return value
+        return timezone.make_aware(datetime.combine(value, time.min))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.notifications.rendering import get_render_stats
+
+
+class Command(BaseCommand):
+    help = 'Show accumulated email render time per notification event type'
+
+    def handle(self, *args, **options):
+        stats = get_render_stats()
+        if not stats:
+            self.stdout.write("No notification emails rendered yet")
+            return
+
+        self.stdout.write(f"{'Event':<40} {'Events':>8} {'Total ms':>10} {'Avg ms':>8}")
+        for event_type, row in stats.items():
+            self.stdout.write(
+                f"{event_type:<40} {row['count']:>8} {row['total_ms']:>10.1f} {row['avg_ms']:>8.2f}"
+            )
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.urls import reverse
 
 User = get_user_model()
 
@@ -102,6 +103,10 @@ class NotificationMaster(models.Model):
     
     # Email Configuration
     email_enabled = models.BooleanField(default=True)
+    digest_enabled = models.BooleanField(
+        default=False,
+        help_text="Queue emails and send each recipient one daily digest instead of one email per event"
+    )
     email_template = models.CharField(
         max_length=200,
         blank=True,
@@ -148,6 +153,13 @@ class Notification(models.Model):
     """
     
     NOTIFICATION_TYPES = NotificationMaster.NOTIFICATION_EVENT_CHOICES
+
+    # Detail page per notified object type, (app_label, model) -> URL name
+    TARGET_URL_NAMES = {
+        ('accidents', 'incident'): 'accidents:incident_detail',
+        ('hazards', 'hazard'): 'hazards:hazard_detail',
+        ('inspections', 'inspectionschedule'): 'inspections:schedule_detail',
+    }
     
     # Generic relation to any module's object (Incident, Hazard, Inspection, etc.)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
@@ -170,6 +182,10 @@ class Notification(models.Model):
     email_sent_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
+
+    # Idempotency key of the event (NotificationService.notify) - retried
+    # deliveries never create a second notification for the same recipient
+    event_key = models.CharField(max_length=100, blank=True, default='')
     
     class Meta:
         ordering = ['-created_at']
@@ -177,6 +193,24 @@ class Notification(models.Model):
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['-created_at']),
+            # Inbox: a user's notifications, newest first
+            models.Index(fields=['recipient', '-created_at']),
+            # Tracking page: per-event counts grouped by recipient role
+            models.Index(fields=['notification_type', 'recipient', 'created_at']),
+            # Unread badge/inbox: only unread rows are indexed, so the
+            # lookup does not grow with read history
+            models.Index(
+                fields=['recipient', '-created_at'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event_key', 'recipient'],
+                condition=~models.Q(event_key=''),
+                name='unique_notification_per_event_recipient',
+            ),
         ]
     
     def __str__(self):
@@ -187,4 +221,100 @@ class Notification(models.Model):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
\ No newline at end of file
+            self.save(update_fields=['is_read', 'read_at'])
+
+    def get_target_url(self):
+        """Detail page of the notified object (None for types without one)"""
+        content_type = ContentType.objects.get_for_id(self.content_type_id)
+        url_name = self.TARGET_URL_NAMES.get((content_type.app_label, content_type.model))
+        return reverse(url_name, args=[self.object_id]) if url_name else None
+
+
+class ArchivedNotification(models.Model):
+    """
+    Read notifications moved out of Notification after
+    NOTIFICATION_RETENTION_DAYS (tasks.archive_read_notifications).
+    Keyed by archive_month so old months can be exported or purged in bulk.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_notifications'
+    )
+    notification_type = models.CharField(max_length=50)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+
+    is_read = models.BooleanField(default=True)
+    is_email_sent = models.BooleanField(default=False)
+    email_sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    event_key = models.CharField(max_length=100, blank=True, default='')
+
+    # First day of the month the notification was created in
+    archive_month = models.DateField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.title}"
+
+
+class NotificationDigestItem(models.Model):
+    """
+    Email queued for a recipient's next digest (NotificationMaster.digest_enabled).
+    Rows are deleted once the digest containing them has been sent.
+    """
+
+    notification = models.OneToOneField(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='digest_item'
+    )
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_digest_items'
+    )
+    notification_type = models.CharField(max_length=50)
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    link = models.URLField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['recipient', 'created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.subject}"
+
+
+
+class PendingNotificationEvent(models.Model):
+    """
+    Notification event that could not be queued because the broker was
+    unreachable. Swept back onto the queue by dispatch_pending_notifications.
+    """
+
+    payload = models.JSONField(help_text="deliver_notification keyword arguments")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.payload.get('notification_type')} ({self.created_at:%Y-%m-%d %H:%M})"
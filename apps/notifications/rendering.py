@@ -0,0 +1,147 @@
+# apps/notifications/rendering.py
+"""
+Email rendering for notification events.
+
+Every recipient of an event gets the same HTML email apart from the
+greeting, so the template is rendered once per recipient class (users
+with and without a full name, which the templates' ``default`` filters
+treat differently) using placeholder tokens for the recipient fields.
+Each recipient's copy is then produced by substituting their escaped
+values for the tokens.
+
+Compiled templates are reused across calls by Django's cached template
+loader (enabled by default since Django 4.1). Render times are
+accumulated per event type in the shared cache; see
+``manage.py notification_render_stats``.
+"""
+
+import logging
+import secrets
+import time
+
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+# Recipient attributes the email templates may use in the greeting
+RECIPIENT_FIELDS = ('get_full_name', 'username', 'email', 'first_name', 'last_name')
+
+_TOKEN_SALT = secrets.token_hex(6)
+RECIPIENT_TOKENS = {field: f"__recipient_{field}_{_TOKEN_SALT}__" for field in RECIPIENT_FIELDS}
+
+RENDER_STATS_EVENTS_KEY = "notifications:render_stats:events"
+
+
+class _RecipientPlaceholder:
+    """Stands in for the recipient while rendering the shared copy"""
+
+    def __init__(self, has_full_name):
+        self.has_full_name = has_full_name
+        for field in RECIPIENT_FIELDS[1:]:
+            setattr(self, field, RECIPIENT_TOKENS[field])
+
+    def get_full_name(self):
+        return RECIPIENT_TOKENS['get_full_name'] if self.has_full_name else ''
+
+    def __str__(self):
+        return RECIPIENT_TOKENS['username']
+
+
+def _recipient_value(recipient, field):
+    value = getattr(recipient, field, '')
+    return value() if callable(value) else value
+
+
+class EventEmailRenderer:
+    """
+    Renders one event's HTML email for many recipients
+
+    Args:
+        template_name: Email template path
+        context: Event context shared by all recipients
+        event_type: Notification type, used for render statistics
+    """
+
+    def __init__(self, template_name, context, event_type):
+        self.template_name = template_name
+        self.context = context
+        self.event_type = event_type
+        self.render_seconds = 0.0
+        self.renders = 0
+        self._rendered = {}
+
+    def render(self, recipient):
+        has_full_name = bool(recipient.get_full_name())
+
+        rendered = self._rendered.get(has_full_name)
+        if rendered is None:
+            started = time.perf_counter()
+            try:
+                rendered = get_template(self.template_name).render({
+                    **self.context,
+                    'recipient': _RecipientPlaceholder(has_full_name),
+                })
+            except Exception as exc:
+                # Remember the failure so the other recipients don't re-render
+                rendered = exc
+            self.render_seconds += time.perf_counter() - started
+            self.renders += 1
+            self._rendered[has_full_name] = rendered
+
+        if isinstance(rendered, Exception):
+            raise rendered
+
+        for field, token in RECIPIENT_TOKENS.items():
+            if token in rendered:
+                rendered = rendered.replace(token, escape(_recipient_value(recipient, field)))
+        return rendered
+
+    def record(self):
+        """Add this event's render time to the shared statistics"""
+        if self.renders:
+            record_render_time(self.event_type, self.render_seconds)
+
+
+def _stats_key(event_type, field):
+    return f"notifications:render_stats:{event_type}:{field}"
+
+
+def record_render_time(event_type, seconds):
+    """Accumulate render count and total time (microseconds) for an event type"""
+    try:
+        events = cache.get(RENDER_STATS_EVENTS_KEY) or set()
+        if event_type not in events:
+            cache.set(RENDER_STATS_EVENTS_KEY, events | {event_type}, timeout=None)
+
+        for field, amount in (('count', 1), ('total_us', int(seconds * 1_000_000))):
+            key = _stats_key(event_type, field)
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                cache.set(key, amount, timeout=None)
+    except Exception:
+        # Statistics only - never fail a delivery because the cache is down
+        logger.warning(f"Could not record render time for {event_type}", exc_info=True)
+
+    logger.debug(f"[Email] Rendered {event_type} in {seconds * 1000:.1f} ms")
+
+
+def get_render_stats():
+    """{event_type: {'count', 'total_ms', 'avg_ms'}} for every recorded event type"""
+    events = sorted(cache.get(RENDER_STATS_EVENTS_KEY) or ())
+    values = cache.get_many([
+        _stats_key(event_type, field) for event_type in events for field in ('count', 'total_us')
+    ])
+
+    stats = {}
+    for event_type in events:
+        count = values.get(_stats_key(event_type, 'count'), 0)
+        total_ms = values.get(_stats_key(event_type, 'total_us'), 0) / 1000
+        stats[event_type] = {
+            'count': count,
+            'total_ms': total_ms,
+            'avg_ms': total_ms / count if count else 0,
+        }
+    return stats
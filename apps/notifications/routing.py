@@ -0,0 +1,130 @@
+# apps/notifications/routing.py
+"""
+In-process routing table for NotificationMaster.
+
+Configurations change a few times a month but are read on every
+notification, so each worker keeps all active configs in memory as
+event -> {role_id: [RoutingRule, ...]}. A role can have several configs
+for one event (e.g. different modules or plant filters); recipients are
+the union of all of them. A version stamp in the shared cache
+tells workers when to reload: signals bump it on every NotificationMaster
+(or Role) change, and the table is rebuilt with a single query the next
+time a worker sees a stamp it has not loaded.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ROUTING_VERSION_KEY = "notifications:routing:version"
+
+RoutingRule = namedtuple('RoutingRule', [
+    'config_id',
+    'role_id',
+    'role_name',
+    'module',
+    'filter_by_plant',
+    'filter_by_location',
+    'filter_by_zone',
+    'email_enabled',
+    'digest_enabled',
+])
+
+_lock = threading.Lock()
+_table = {'version': None, 'events': {}}
+
+
+def _fresh_version():
+    # Time-based so a stamp lost to eviction never matches a stale table
+    return int(time.time() * 1000)
+
+
+def _load_rules():
+    """event -> {role_id: [RoutingRule, ...]} (every active config, in pk order)"""
+    from .models import NotificationMaster
+
+    events = {}
+    configs = NotificationMaster.objects.filter(is_active=True).select_related('role').order_by('pk')
+    for config in configs:
+        events.setdefault(config.notification_event, {}).setdefault(config.role_id, []).append(
+            RoutingRule(
+                config_id=config.pk,
+                role_id=config.role_id,
+                role_name=config.role.name,
+                module=config.module,
+                # Plant heads only ever hear about their own plant
+                filter_by_plant=config.filter_by_plant or config.role.name == 'PLANT HEAD',
+                filter_by_location=config.filter_by_location,
+                filter_by_zone=config.filter_by_zone,
+                email_enabled=config.email_enabled,
+                digest_enabled=config.digest_enabled,
+            )
+        )
+    return events
+
+
+def merge_rules(rules):
+    """
+    One effective rule for a recipient matched by several configs: email
+    if any of them enables it, digest only if every emailing config does.
+    """
+    if not rules:
+        return None
+    emailing = [rule for rule in rules if rule.email_enabled]
+    return rules[0]._replace(
+        email_enabled=bool(emailing),
+        digest_enabled=bool(emailing) and all(rule.digest_enabled for rule in emailing),
+    )
+
+
+def rule_matches(rule, user, plant=None, location=None, zone=None):
+    """Whether user is a recipient under rule (same predicates as the stakeholder query)"""
+    if user.role_id != rule.role_id:
+        return False
+    if rule.filter_by_plant and plant and user.plant_id != plant.pk:
+        return False
+    if rule.filter_by_location and location and user.location_id != location.pk:
+        return False
+    if rule.filter_by_zone and zone and user.zone_id != zone.pk:
+        return False
+    return True
+
+
+def get_event_rules(event_type):
+    """Routing rules for an event, keyed by role id (reloads the table if stale)"""
+    try:
+        version = cache.get_or_set(ROUTING_VERSION_KEY, _fresh_version, timeout=None)
+    except Exception:
+        # Without the stamp the table may be stale - read the configs afresh
+        logger.warning("Routing version unavailable, reloading the routing table", exc_info=True)
+        events = _load_rules()
+        with _lock:
+            _table['events'] = events
+            _table['version'] = None
+        return events.get(event_type, {})
+
+    if _table['version'] != version:
+        with _lock:
+            if _table['version'] != version:
+                _table['events'] = _load_rules()
+                _table['version'] = version
+
+    return _table['events'].get(event_type, {})
+
+
+def invalidate_routing_table():
+    """Make every worker reload the routing table on its next lookup"""
+    try:
+        try:
+            cache.incr(ROUTING_VERSION_KEY)
+        except ValueError:
+            cache.set(ROUTING_VERSION_KEY, _fresh_version(), timeout=None)
+    except Exception:
+        # Workers reload on every lookup while the cache is unreachable
+        logger.warning("Could not bump the routing version", exc_info=True)
+    _table['version'] = None
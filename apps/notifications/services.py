@@ -3,10 +3,18 @@ from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import NotificationMaster, Notification
+from .delivery import PERMANENT, SENT, TRANSIENT, send_batch
+from .models import Notification, NotificationDigestItem, PendingNotificationEvent
+from .rendering import EventEmailRenderer
+from .routing import get_event_rules, merge_rules, rule_matches
 from apps.accidents.models import IncidentType
 import logging
+import uuid
+from itertools import chain, groupby
+from operator import attrgetter
 from django.urls import reverse
 from django.conf import settings
 
@@ -20,151 +28,138 @@ class NotificationService:
     """
     
     @staticmethod
-    def get_stakeholders_for_event(event_type, plant=None, location=None, zone=None):
+    def get_stakeholders_for_event(event_type, plant=None, location=None, zone=None, rules=None):
         """
         Get stakeholders based on NotificationMaster configuration
-        
+
+        All configs are resolved in one User query: each routing rule
+        contributes its role plus plant/location/zone predicates, ORed.
+
         Args:
             event_type: Notification event type (e.g., 'INCIDENT_REPORTED')
             plant: Plant object
             location: Location object
             zone: Zone object
-        
+            rules: Result of get_event_rules(event_type), if already loaded
+
         Returns:
-            List of User objects who should receive this notification
+            List of unique User objects who should receive this notification,
+            each with ``notification_rule`` set to the merge of the rules it matched
         """
-        # print(f"\n{'='*70}")
-        # print(f"FINDING STAKEHOLDERS FOR: {event_type}")
-        # print(f"{'='*70}")
-        # print(f"Plant: {plant}")
-        # print(f"Location: {location}")
-        # print(f"Zone: {zone}")
-        
-        # Get all active notification configurations for this event type
-        configs = NotificationMaster.objects.filter(
-            notification_event=event_type,
-            is_active=True
-        ).select_related('role')
-        
-        if not configs.exists():
-            # print(f"⚠️ No notification configurations found for {event_type}")
+        if rules is None:
+            rules = get_event_rules(event_type)
+
+        if not rules:
             return []
-        
-        # print(f"\nFound {configs.count()} active configuration(s)")
-        
-        stakeholders = []
-        
-        for config in configs:
-            # print(f"\n--- Processing Config: {config.name} ---")
-            # print(f"Role: {config.role.name}")
-            # print(f"Filters: Plant={config.filter_by_plant}, Location={config.filter_by_location}, Zone={config.filter_by_zone}")
-
-            # Build query to find users with this role
-            query = User.objects.filter(
-                    role=config.role,
-                    is_active=True
-                )
-            
-            if config.role.name == 'PLANT HEAD':
-                config.filter_by_plant = True
-                
-            # Apply filters based on configuration
-            if config.filter_by_plant and plant:
-                query = query.filter(plant=plant)
-                # print(f"  - Filtered by plant: {plant.name}")
-            
-            if config.filter_by_location and location:
-                query = query.filter(location=location)
-                # print(f"  - Filtered by location: {location.name}")
-            
-            if config.filter_by_zone and zone:
-                query = query.filter(zone=zone)
-                # print(f"  - Filtered by zone: {zone.name}")
-            
-            users = query.all()
-            # print(f"  - Found {users.count()} user(s) with role {config.role.name}")
-            
-            for user in users:
-                # print(f"    • {user.username} | {user.get_full_name()} | {user.email}")
-                if user not in stakeholders:
-                    stakeholders.append(user)
-        
-        # print(f"\n{'='*70}")
-        # print(f"TOTAL UNIQUE STAKEHOLDERS: {len(stakeholders)}")
-        # print(f"{'='*70}\n")
-        
+
+        condition = Q()
+        for rule in chain.from_iterable(rules.values()):
+            predicate = Q(role_id=rule.role_id)
+
+            if rule.filter_by_plant and plant:
+                predicate &= Q(plant=plant)
+
+            if rule.filter_by_location and location:
+                predicate &= Q(location=location)
+
+            if rule.filter_by_zone and zone:
+                predicate &= Q(zone=zone)
+
+            condition |= predicate
+
+        stakeholders = list(
+            User.objects.filter(condition, is_active=True).order_by('pk')
+        )
+        for user in stakeholders:
+            user.notification_rule = merge_rules([
+                rule for rule in rules[user.role_id]
+                if rule_matches(rule, user, plant, location, zone)
+            ])
+
         return stakeholders
     
     
     @staticmethod
-    def create_notification(recipient, content_object, notification_type, title, message):
+    def build_notification(recipient, content_object, notification_type, title, message, event_key=''):
         """
-        Create a notification in the database
-        
+        Build (without saving) an in-app notification
+
         Args:
             recipient: User object
             content_object: The object (Incident/Hazard) being notified about
             notification_type: Type of notification
             title: Notification title
             message: Notification message
+            event_key: Idempotency key of the event (one notification per recipient)
         """
-        # print(f"\n--- CREATING NOTIFICATION ---")
-        # print(f"Recipient: {recipient.username}")
-        # print(f"Type: {notification_type}")
-        # print(f"Title: {title[:50]}...")
-        
+        return Notification(
+            recipient=recipient,
+            content_type=ContentType.objects.get_for_model(content_object),
+            object_id=content_object.id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            event_key=event_key,
+            is_read=False
+        )
+
+
+    @staticmethod
+    def save_notifications(notifications, event_key=''):
+        """
+        Insert an event's notifications with one bulk_create
+
+        Returns:
+            Set of recipient ids skipped because a concurrent delivery of
+            the same event already created their notification
+        """
+        if not notifications:
+            return set()
+
         try:
-            content_type = ContentType.objects.get_for_model(content_object)
-            
-            notification = Notification(
-                recipient=recipient,
-                content_type=content_type,
-                object_id=content_object.id,
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                is_read=False
-            )
-            
-            notification.save()
-            # print(f"  ✅ SAVED! Notification ID: {notification.id}")
-            return notification
-            
-        except Exception as e:
-            # print(f"  ❌ ERROR: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-    
-    
+            with transaction.atomic():
+                Notification.objects.bulk_create(notifications)
+            return set()
+        except IntegrityError:
+            if not event_key:
+                raise
+
+        taken = set(Notification.objects.filter(
+            event_key=event_key,
+            recipient_id__in=[n.recipient_id for n in notifications]
+        ).values_list('recipient_id', flat=True))
+
+        with transaction.atomic():
+            Notification.objects.bulk_create([n for n in notifications if n.recipient_id not in taken])
+        return taken
+
+
     @staticmethod
-    def send_email(recipient, subject, message, html_template=None, context=None):
+    def build_email(recipient, subject, message, html_template=None, context=None, renderer=None):
         """
-        Send email notification
-        
+        Build (without sending) an email for one recipient
+
         Args:
             recipient: User object
             subject: Email subject
             message: Plain text message
             html_template: Path to HTML template (optional)
             context: Template context dictionary (optional)
+            renderer: EventEmailRenderer shared by the event's recipients;
+                      used instead of html_template/context (optional)
+
+        Returns:
+            EmailMultiAlternatives, or None if it could not be rendered
         """
-        # print(f"\n--- SENDING EMAIL ---")
-        # print(f"To: {recipient.email}")
-        # print(f"Subject: {subject}")
-        
-        # Check if email is configured
-        if not hasattr(settings, 'EMAIL_HOST') or not settings.EMAIL_HOST:
-            # print("  ⚠️ EMAIL NOT CONFIGURED - Skipping email send")
-            return False
-        
         try:
             # Render HTML template if provided
-            if html_template and context:
+            if renderer:
+                html_content = renderer.render(recipient)
+            elif html_template and context:
                 html_content = render_to_string(html_template, context)
             else:
                 html_content = None
-            
+
             # Create email
             email = EmailMultiAlternatives(
                 subject=subject,
@@ -172,37 +167,103 @@ class NotificationService:
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 to=[recipient.email]
             )
-            
+
             if html_content:
                 email.attach_alternative(html_content, "text/html")
-            
-            email.send(fail_silently=False)
-            # print("  ✅ Email sent successfully")
-            return True
-            
-        except Exception as e:
-            # print(f"  ❌ Email error: {e}")
-            import traceback
-            traceback.print_exc()
+            return email
+
+        except Exception:
+            logger.exception(f"Could not render email '{subject}' for {recipient.email}")
+            return None
+
+
+    @staticmethod
+    def send_email(recipient, subject, message, html_template=None, context=None):
+        """
+        Send a single email notification (see build_email for arguments).
+        Events with several recipients go through send_batch in deliver().
+        """
+        # Check if email is configured
+        if not hasattr(settings, 'EMAIL_HOST') or not settings.EMAIL_HOST:
+            return False
+
+        email = NotificationService.build_email(recipient, subject, message, html_template, context)
+        if email is None:
             return False
+        return send_batch([email])[0] == SENT
     
     
     @staticmethod
-    def notify(content_object, notification_type, module='INCIDENT', extra_recipients=None):
+    def notify(content_object, notification_type, module='INCIDENT', extra_recipients=None, idempotency_key=None,
+               related_objects=None):
         """
-        Main notification function - finds stakeholders and sends notifications
+        Main notification function - queues the event for background delivery
+
+        Only (content type, object id, event) is queued. Stakeholder lookup,
+        Notification rows and emails are handled by the deliver_notification
+        task once the current transaction commits, so the request returns
+        without waiting on recipients or SMTP.
 
         Args:
             content_object: The object (Incident/Hazard/InvestigationReport) being notified about
             notification_type: Type of notification (e.g., 'INCIDENT_REPORTED')
             module: Module name for template selection
+            extra_recipients: Users to notify in addition to the configured roles
+            idempotency_key: Identifies this event; deliveries sharing a key never
+                notify the same recipient twice (default: unique per call)
+            related_objects: Further objects of the same type submitted together
+                with content_object; one notification covers them all
+
+        Returns:
+            The event's idempotency key
+        """
+        if content_object is None or content_object.pk is None:
+            return None
+
+        payload = {
+            'content_type_id': ContentType.objects.get_for_model(content_object).pk,
+            'object_id': content_object.pk,
+            'notification_type': notification_type,
+            'module': module,
+            'extra_recipient_ids': [user.pk for user in extra_recipients or []],
+            'event_key': idempotency_key or uuid.uuid4().hex,
+            'related_object_ids': [obj.pk for obj in related_objects or []],
+        }
+        transaction.on_commit(lambda: NotificationService._enqueue(payload))
+        return payload['event_key']
+
+    @staticmethod
+    def _enqueue(payload):
+        from .tasks import deliver_notification
+
+        try:
+            deliver_notification.delay(**payload)
+        except Exception:
+            # Broker unavailable - keep the event for dispatch_pending_notifications
+            # rather than resolving recipients and sending mail on the request thread
+            logger.exception(f"Could not queue {payload['notification_type']} notification, storing it for later")
+            PendingNotificationEvent.objects.create(payload=payload)
+
+    @staticmethod
+    def deliver(content_object, notification_type, module='INCIDENT', extra_recipients=None, event_key='',
+                related_objects=None):
+        """
+        Find stakeholders, create notifications and send emails for one event.
+        Runs in the deliver_notification task.
+
+        Recipients that already have a notification for event_key are not
+        notified again, and their email is only retried if it was not sent.
+
+        Returns:
+            (transient, permanent) counts of emails that failed to send;
+            only transient failures are worth retrying
         """
         # print("\n" + "*"*70)
         # print(f"NOTIFICATION SYSTEM - {notification_type}")
         # print("*"*70)
         if content_object is None:
             # print(f"\n❌ ERROR: content_object is None. Cannot send notification for {notification_type}")
-            return
+            return 0, 0
 
         # Determine object type and extract plant/location/zone
         # Auto-detect object type
@@ -230,49 +291,70 @@ class NotificationService:
 
 
         # Find stakeholders based on NotificationMaster configuration
+        rules = get_event_rules(notification_type)
         stakeholders = NotificationService.get_stakeholders_for_event(
             event_type=notification_type,
             plant=plant,
             location=location,
-            zone=zone
+            zone=zone,
+            rules=rules
         )
+        seen = {user.pk for user in stakeholders}
+
+        def add_stakeholder(user):
+            if user.pk not in seen:
+                seen.add(user.pk)
+                stakeholders.append(user)
 
         # For responsible person
         if extra_recipients:
             for user in extra_recipients:
-                if user not in stakeholders:
-                    stakeholders.append(user)
+                add_stakeholder(user)
 
         # Add assigned_to if present
         if hasattr(content_object, 'assigned_to') and content_object.assigned_to:
-            if content_object.assigned_to not in stakeholders:
-                stakeholders.append(content_object.assigned_to)
+            add_stakeholder(content_object.assigned_to)
 
         # Add responsible persons for action items
+        responsible_ids = set()
         if hasattr(content_object, 'responsible_person'):
             for user in content_object.responsible_person.all():
-                if user not in stakeholders:
-                    stakeholders.append(user)
+                responsible_ids.add(user.pk)
+                add_stakeholder(user)
 
         # Add responsible emails if present
+        responsible_emails = set()
         if hasattr(content_object, 'responsible_emails') and content_object.responsible_emails:
-            emails = [e.strip() for e in content_object.responsible_emails.split(',') if e.strip()]
-            responsible_users = User.objects.filter(email__in=emails, is_active=True)
-            for user in responsible_users:
-                if user not in stakeholders:
-                    stakeholders.append(user)
-       
+            responsible_emails = {e.strip() for e in content_object.responsible_emails.split(',') if e.strip()}
+            for user in User.objects.filter(email__in=responsible_emails, is_active=True):
+                add_stakeholder(user)
 
 
         if not stakeholders and not extra_recipients:
             # print("\n❌ ERROR: No stakeholders found!")
-            return
+            return 0, 0
 
         notifications_created = 0
         emails_sent = 0
+        email_failures = {TRANSIENT: 0, PERMANENT: 0}
+        new_notifications = []
+        digest_notifications = []
+        renderer = None
+        outgoing = []  # (notification, email) pairs sent together after the loop
+
+        # Recipients already handled by an earlier attempt of this event
+        delivered = {}
+        if event_key:
+            delivered = {
+                n.recipient_id: n
+                for n in Notification.objects.filter(event_key=event_key)
+            }
 
         # Build notification context
-        if notification_type == 'INCIDENT_REPORTED':
+        if notification_type == 'HAZARD_REPORTED' and related_objects:
+            context = NotificationService._build_hazard_batch_context([content_object, *related_objects])
+            module = 'HAZARD_BATCH'  # one email listing every hazard in the submission
+        elif notification_type == 'INCIDENT_REPORTED':
             context = NotificationService._build_incident_context(content_object)
         elif notification_type == 'INCIDENT_CLOSED':
             context = NotificationService._build_incident_close_context(content_object)
@@ -296,46 +378,97 @@ class NotificationService:
             context = NotificationService._build_inspection_context(content_object)
         else:
             logger.error(f"Unknown notification type: {notification_type}")
-            return
+            return 0, 0
 
 
         for stakeholder in stakeholders:
             # print("📨 Processing stakeholder:", stakeholder.email)
 
-            notification = NotificationService.create_notification(
-                recipient=stakeholder,
-                content_object=content_object,
-                notification_type=notification_type,
-                title=context.get('title', ''),
-                message=context.get('message', '')
-            )
+            notification = delivered.get(stakeholder.pk)
+            if notification is not None:
+                if notification.is_email_sent:
+                    continue
+            else:
+                notification = NotificationService.build_notification(
+                    recipient=stakeholder,
+                    content_object=content_object,
+                    notification_type=notification_type,
+                    title=context.get('title', ''),
+                    message=context.get('message', ''),
+                    event_key=event_key
+                )
+                new_notifications.append(notification)
 
-            is_responsible_user = (
-                (hasattr(content_object, 'responsible_person') and stakeholder in content_object.responsible_person.all())
-                or (hasattr(content_object, 'responsible_emails') and stakeholder.email in [e.strip() for e in content_object.responsible_emails.split(',')])
+            is_responsible_user = stakeholder.pk in responsible_ids or stakeholder.email in responsible_emails
+            # Extra/responsible recipients fall back to their role's configs
+            role_config = getattr(stakeholder, 'notification_rule', None) or merge_rules(
+                rules.get(stakeholder.role_id)
             )
 
-            role_config = NotificationMaster.objects.filter(
-                notification_event=notification_type,
-                role=stakeholder.role,
-                is_active=True
-            ).first()
+            if role_config and role_config.email_enabled and role_config.digest_enabled and not is_responsible_user:
+                # Goes out with the recipient's next digest (send_digests)
+                digest_notifications.append(notification)
+                continue
 
             if is_responsible_user or (role_config and role_config.email_enabled):
-                context['recipient'] = stakeholder
-                email_sent = NotificationService.send_email(
+                if renderer is None:
+                    renderer = EventEmailRenderer(
+                        f'emails/{module.lower()}/notification.html', context, notification_type
+                    )
+                outgoing.append((notification, NotificationService.build_email(
                     recipient=stakeholder,
                     subject=context.get('subject', ''),
                     message=context.get('message', ''),
-                    html_template=f'emails/{module.lower()}/notification.html',
-                    context=context
+                    renderer=renderer
+                )))
+
+        if renderer:
+            renderer.record()
+
+        # Persist the event's new notifications in one INSERT
+        taken = NotificationService.save_notifications(new_notifications, event_key)
+        notifications_created = len(new_notifications) - len(taken)
+        if taken:
+            # A concurrent delivery of the same event got these recipients first
+            outgoing = [
+                (notification, email) for notification, email in outgoing
+                if notification.recipient_id not in taken
+            ]
+
+        digest_notifications = [n for n in digest_notifications if n.recipient_id not in taken]
+        if digest_notifications and getattr(settings, 'EMAIL_HOST', None):
+            link = next((value for key, value in context.items() if key.endswith('_url') and value), '')
+            NotificationDigestItem.objects.bulk_create([
+                NotificationDigestItem(
+                    notification=notification,
+                    recipient_id=notification.recipient_id,
+                    notification_type=notification_type,
+                    subject=context.get('subject', '')[:255],
+                    message=context.get('message', ''),
+                    link=link,
                 )
-
-                if email_sent and notification:
+                for notification in digest_notifications
+            ], ignore_conflicts=True)
+
+        # Send the whole event over one SMTP connection
+        if outgoing and getattr(settings, 'EMAIL_HOST', None):
+            messages = [email for notification, email in outgoing if email is not None]
+            results = iter(send_batch(messages))
+            sent_at = timezone.now()
+            sent_notifications = []
+
+            for notification, email in outgoing:
+                # An email that failed to render will not render on retry either
+                status = next(results) if email is not None else PERMANENT
+                if status == SENT:
                     emails_sent += 1
                     notification.is_email_sent = True
-                    notification.email_sent_at = timezone.now()
-                    notification.save()
+                    notification.email_sent_at = sent_at
+                    sent_notifications.append(notification)
+                else:
+                    email_failures[status] += 1
+
+            Notification.objects.bulk_update(sent_notifications, ['is_email_sent', 'email_sent_at'])
 
         # print(f"\n{'='*70}")
         # print("NOTIFICATION SUMMARY")
@@ -344,9 +477,93 @@ class NotificationService:
         # print(f"Notifications created: {notifications_created}")
         # print(f"Emails sent: {emails_sent}")
         # print(f"{'='*70}\n")
+        return email_failures[TRANSIENT], email_failures[PERMANENT]
+
+
+    @staticmethod
+    def send_digests():
+        """
+        Send every recipient with queued digest items one consolidated email
+
+        All digests go out over one SMTP connection. Items of digests that
+        could not be sent stay queued for the next run.
+
+        Returns:
+            Number of digest emails sent
+        """
+        if not getattr(settings, 'EMAIL_HOST', None):
+            return 0
+
+        items = NotificationDigestItem.objects.select_related('recipient').order_by('recipient_id', 'created_at')
+
+        digests = []
+        for recipient_id, group in groupby(items, key=attrgetter('recipient_id')):
+            group = list(group)
+            recipient = group[0].recipient
+            subject = f"EHS-360 Daily Digest - {len(group)} notification(s)"
+            message = "\n\n".join(
+                f"{item.subject}\n{item.link}" if item.link else item.subject
+                for item in group
+            )
+            email = NotificationService.build_email(
+                recipient=recipient,
+                subject=subject,
+                message=message,
+                html_template='emails/digest/notification.html',
+                context={'recipient': recipient, 'subject': subject, 'items': group}
+            )
+            if email is not None:
+                digests.append((group, email))
+
+        if not digests:
+            return 0
+
+        results = [status == SENT for status in send_batch([email for group, email in digests])]
+        sent_items = [
+            item
+            for (group, email), sent in zip(digests, results) if sent
+            for item in group
+        ]
+
+        if sent_items:
+            with transaction.atomic():
+                Notification.objects.filter(
+                    pk__in=[item.notification_id for item in sent_items]
+                ).update(is_email_sent=True, email_sent_at=timezone.now())
+                NotificationDigestItem.objects.filter(pk__in=[item.pk for item in sent_items]).delete()
+
+        failed = len(results) - sum(results)
+        if failed:
+            logger.warning(f"[Digest] {failed} digest email(s) failed, items stay queued")
+        return sum(results)
 
     
     
+    @staticmethod
+    def get_inbox(user):
+        """A user's in-app notifications, newest first (all modules)"""
+        return Notification.objects.filter(recipient=user).order_by('-created_at')
+
+
+    @staticmethod
+    def get_unread_count(user):
+        return Notification.objects.filter(recipient=user, is_read=False).count()
+
+
+    @staticmethod
+    def mark_read(user, pk=None):
+        """
+        Mark one of the user's notifications (or all of them) as read
+
+        Returns:
+            Number of notifications updated
+        """
+        notifications = Notification.objects.filter(recipient=user, is_read=False)
+        if pk is not None:
+            notifications = notifications.filter(pk=pk)
+        return notifications.update(is_read=True, read_at=timezone.now())
+
+
     @staticmethod
     def _build_incident_context(incident):
         """Build context for incident notifications"""
@@ -421,6 +638,51 @@ EHS Management System
             'hazard_url': hazard_url,
         }
     
+    @staticmethod
+    def _build_hazard_batch_context(hazards):
+        """Build context for several hazards reported in one submission"""
+        first = hazards[0]
+        plant_names = ', '.join(dict.fromkeys(hazard.plant.name for hazard in hazards))
+        hazard_items = [
+            {
+                'hazard': hazard,
+                'url': f"{settings.SITE_URL}{reverse('hazards:hazard_detail', args=[hazard.id])}",
+            }
+            for hazard in hazards
+        ]
+        lines = "\n".join(
+            f"{hazard.report_number:<28} {hazard.get_severity_display():<10} {hazard.get_hazard_type_display():<20} "
+            f"{hazard.plant.name}"
+            for hazard in hazards
+        )
+
+        return {
+            'title': f"{len(hazards)} Hazards Reported | {first.report_number} ...",
+            'subject': f"⚠️ {len(hazards)} New Hazards Reported - {plant_names}",
+            'message': f"""
+Hello,
+
+{len(hazards)} hazards have been reported together.
+
+Plant           : {plant_names}
+Reported By     : {first.reported_by.get_full_name()}
+
+HAZARDS
+--------------------------------------------------
+{lines}
+
+Please review and take necessary action.
+
+Regards,
+EHS Management System
+""",
+            'hazard': first,
+            'hazards': hazards,
+            'hazard_items': hazard_items,
+            'hazard_url': hazard_items[0]['url'],
+            'plant_names': plant_names,
+        }
+
     @staticmethod
     def _build_incident_report_context(incidentinvestigationreport):
         """
@@ -0,0 +1,19 @@
+# apps/notifications/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.accounts.models import Role
+from .models import NotificationMaster
+from .routing import invalidate_routing_table
+
+
+@receiver(post_save, sender=NotificationMaster)
+@receiver(post_delete, sender=NotificationMaster)
+@receiver(post_save, sender=Role)
+def invalidate_routing_on_config_change(sender, instance, **kwargs):
+    """Configs (and role names, e.g. PLANT HEAD) feed the routing table"""
+    # Invalidate now for this process and again once other workers can see the change
+    invalidate_routing_table()
+    transaction.on_commit(invalidate_routing_table)
@@ -1,5 +1,148 @@
+import logging
+
 from celery import shared_task
 
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    bind=True,
+    name='apps.notifications.tasks.deliver_notification',
+    max_retries=3,
+    default_retry_delay=60,
+)
+def deliver_notification(self, content_type_id, object_id, notification_type, module,
+                         extra_recipient_ids=None, event_key='', related_object_ids=None):
+    """
+    Resolve stakeholders, store notifications and send emails for one event
+    queued by NotificationService.notify(). Safe to retry: recipients already
+    notified for event_key are skipped, and only unsent emails are re-sent.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.contenttypes.models import ContentType
+    from django.core.exceptions import ObjectDoesNotExist
+    from apps.notifications.services import NotificationService
+
+    content_type = ContentType.objects.get_for_id(content_type_id)
+    try:
+        content_object = content_type.get_object_for_this_type(pk=object_id)
+    except ObjectDoesNotExist:
+        logger.info(f"[Notify] {notification_type}: object {content_type_id}/{object_id} no longer exists, skipping")
+        return 0
+
+    extra_recipients = None
+    if extra_recipient_ids:
+        extra_recipients = list(get_user_model().objects.filter(pk__in=extra_recipient_ids))
+
+    related_objects = None
+    if related_object_ids:
+        related_objects = list(content_type.get_all_objects_for_this_type(pk__in=related_object_ids).order_by('pk'))
+
+    try:
+        transient_failures, permanent_failures = NotificationService.deliver(
+            content_object,
+            notification_type,
+            module=module,
+            extra_recipients=extra_recipients,
+            event_key=event_key,
+            related_objects=related_objects,
+        )
+    except Exception as exc:
+        logger.exception(f"[Notify] {notification_type} delivery failed for {content_object!r}")
+        raise self.retry(exc=exc)
+
+    if permanent_failures:
+        # Rejected or unrenderable - a retry would fail the same way
+        logger.warning(f"[Notify] {notification_type}: {permanent_failures} email(s) permanently failed")
+    if transient_failures:
+        logger.warning(f"[Notify] {notification_type}: {transient_failures} email(s) failed, retrying")
+        raise self.retry()
+    return 0
+
+
+@shared_task(name='apps.notifications.tasks.dispatch_pending_notifications')
+def dispatch_pending_notifications():
+    """Queue notification events stored while the broker was unreachable"""
+    from apps.notifications.models import PendingNotificationEvent
+
+    dispatched = 0
+    for event in PendingNotificationEvent.objects.order_by('pk')[:500]:
+        try:
+            deliver_notification.delay(**event.payload)
+        except Exception:
+            logger.exception("[Notify] Broker still unavailable, pending events stay stored")
+            break
+        event.delete()
+        dispatched += 1
+
+    if dispatched:
+        logger.info(f"[Notify] Dispatched {dispatched} pending notification event(s)")
+    return dispatched
+
+
+@shared_task(name='apps.notifications.tasks.send_notification_digests')
+def send_notification_digests():
+    """Send queued digest items (NotificationMaster.digest_enabled), one email per recipient"""
+    from apps.notifications.services import NotificationService
+
+    sent = NotificationService.send_digests()
+    logger.info(f"[Digest] Sent {sent} digest email(s)")
+    return sent
+
+
+ARCHIVE_FIELDS = [
+    'content_type_id', 'object_id', 'recipient_id', 'notification_type', 'title', 'message',
+    'is_read', 'is_email_sent', 'email_sent_at', 'created_at', 'read_at', 'event_key',
+]
+
+
+@shared_task(name='apps.notifications.tasks.archive_read_notifications')
+def archive_read_notifications():
+    """
+    Move read notifications older than NOTIFICATION_RETENTION_DAYS to
+    ArchivedNotification, in batches of NOTIFICATION_ARCHIVE_BATCH_SIZE,
+    so Notification only holds recent and unread rows.
+    """
+    from datetime import timedelta
+    from django.conf import settings
+    from django.db import transaction
+    from django.utils import timezone
+    from apps.notifications.models import ArchivedNotification, Notification
+
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90))
+    batch_size = getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 5000)
+    max_batches = getattr(settings, 'NOTIFICATION_ARCHIVE_MAX_BATCHES', 50)
+
+    candidates = Notification.objects.filter(
+        is_read=True,
+        created_at__lt=cutoff,
+        # Still waiting to go out in a digest
+        digest_item__isnull=True,
+    ).order_by('pk')
+
+    archived = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            rows = list(candidates.select_for_update(skip_locked=True, of=('self',)).values('pk', *ARCHIVE_FIELDS)[:batch_size])
+            if not rows:
+                break
+
+            ArchivedNotification.objects.bulk_create([
+                ArchivedNotification(
+                    archive_month=timezone.localtime(row['created_at']).date().replace(day=1),
+                    **{field: row[field] for field in ARCHIVE_FIELDS}
+                )
+                for row in rows
+            ])
+            Notification.objects.filter(pk__in=[row['pk'] for row in rows]).delete()
+
+        archived += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    logger.info(f"[Notify] Archived {archived} read notification(s)")
+    return archived
+
 
 @shared_task(name='apps.notifications.tasks.send_investigation_overdue_notifications')
 def send_investigation_overdue_notifications():
@@ -45,11 +188,13 @@ def send_investigation_overdue_notifications():
                 content_object=incident,
                 notification_type='INCIDENT_INVESTIGATION_OVERDUE',
                 module='INVESTIGATION_OVERDUE',
-                extra_recipients=extra_recipients if extra_recipients else None
+                extra_recipients=extra_recipients if extra_recipients else None,
+                # One overdue reminder per incident per day, even if the beat job re-runs
+                idempotency_key=f"INCIDENT_INVESTIGATION_OVERDUE:{incident.pk}:{today.isoformat()}"
             )
             
             success_count += 1
-            print(f"  ✅ Notification sent for: {incident.report_number}")
+            print(f"  ✅ Notification queued for: {incident.report_number}")
             
         except Exception as e:
             error_count += 1
@@ -12,6 +12,11 @@ urlpatterns = [
     path('master/<int:pk>/toggle/', views.notification_master_toggle, name='notification_master_toggle'),
     path('master/tracking', views.notification_tracking_view, name='notification_tracking_view'),
     
+    # User inbox
+    path('inbox/', views.notification_inbox, name='inbox'),
+    path('inbox/<int:pk>/read/', views.notification_mark_read, name='mark_read'),
+    path('inbox/read-all/', views.notification_mark_all_read, name='mark_all_read'),
+
     # AJAX endpoints
     path('get-events/', views.get_notification_events, name='get_notification_events'),
 ]
\ No newline at end of file
@@ -1,8 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.paginator import Paginator
 from django.http import JsonResponse
-from .models import NotificationMaster, Notification
+from django.views.decorators.http import require_POST
+from .models import ArchivedNotification, NotificationMaster, Notification
+from .services import NotificationService
 from apps.accounts.models import Role
 from django.db.models import Count, Max, Q
 from apps.accounts.models import Role
@@ -62,6 +65,7 @@ def notification_master_create(request):
         filter_by_zone = request.POST.get('filter_by_zone') == 'on'
         is_active = request.POST.get('is_active') == 'on'
         email_enabled = request.POST.get('email_enabled') == 'on'
+        digest_enabled = request.POST.get('digest_enabled') == 'on'
         
         # Create configuration for each selected event
         created_count = 0
@@ -105,6 +109,7 @@ def notification_master_create(request):
                 filter_by_zone=filter_by_zone,
                 is_active=is_active,
                 email_enabled=email_enabled,
+                digest_enabled=digest_enabled,
                 created_by=request.user
             )
             created_count += 1
@@ -148,6 +153,7 @@ def notification_master_edit(request, pk):
         
         config.is_active = request.POST.get('is_active') == 'on'
         config.email_enabled = request.POST.get('email_enabled') == 'on'
+        config.digest_enabled = request.POST.get('digest_enabled') == 'on'
         
         # Reset name to empty so save() regenerates it
         config.name = ""
@@ -211,43 +217,55 @@ def get_notification_events(request):
 def notification_tracking_view(request):
     user = request.user
 
-    notifications = Notification.objects.select_related(
-        'recipient',
-        'recipient__role'
-    )
-
     roles = Role.objects.all()
 
     # 🔐 Non-admin users → restrict to their role
     if not user.is_superuser and user.role and user.role.name != "ADMIN":
         roles = roles.filter(name=user.role.name)
-        notifications = notifications.filter(
-            recipient__role__name=user.role.name
-        )
+
+    # One grouped query for every (role, event) pair, per table: read
+    # notifications past the retention window live in ArchivedNotification
+    stats = {}
+    for model in (Notification, ArchivedNotification):
+        rows = model.objects.filter(
+            recipient__role__in=roles
+        ).values(
+            'recipient__role_id', 'notification_type'
+        ).annotate(
+            total=Count('id'),
+            sent=Count('id', filter=Q(is_email_sent=True)),
+            failed=Count('id', filter=Q(is_email_sent=False)),
+            last_sent=Max('created_at'),
+        ).order_by()
+
+        for row in rows:
+            key = (row['recipient__role_id'], row['notification_type'])
+            merged = stats.setdefault(key, row)
+            if merged is not row:
+                for field in ('total', 'sent', 'failed'):
+                    merged[field] += row[field]
+                merged['last_sent'] = max(merged['last_sent'], row['last_sent'])
+
+    masters_by_role = {}
+    for master in NotificationMaster.objects.filter(role__in=roles):
+        masters_by_role.setdefault(master.role_id, []).append(master)
 
     tracking_by_role = {}
 
     for role in roles:
-        role_notifications = notifications.filter(recipient__role=role)
-
         records = []
-        masters = NotificationMaster.objects.filter(role=role)
-
-        for master in masters:
-            event_notifications = role_notifications.filter(
-                notification_type=master.notification_event
-            )
 
-            last_notification = event_notifications.order_by('-created_at').first()
+        for master in masters_by_role.get(role.id, []):
+            row = stats.get((role.id, master.notification_event), {})
 
             records.append({
                 'module': master.module,
                 'event_name': master.get_notification_event_display(),
                 'event_code': master.notification_event,
-                'total_sent': event_notifications.count(),
-                'success_count': event_notifications.filter(is_email_sent=True).count(),
-                'failed_count': event_notifications.filter(is_email_sent=False).count(),
-                'last_sent_at': last_notification.created_at if last_notification else None,
+                'total_sent': row.get('total', 0),
+                'success_count': row.get('sent', 0),
+                'failed_count': row.get('failed', 0),
+                'last_sent_at': row.get('last_sent'),
                 'email': master.email_enabled,
             })
 
@@ -285,3 +303,35 @@ def notification_tracking_view(request):
         'notifications/notification_tracking.html',
         context
     )
+
+
+# ==================== USER INBOX ====================
+
+@login_required
+def notification_inbox(request):
+    """The user's in-app notifications from every module"""
+    page = Paginator(NotificationService.get_inbox(request.user), 20).get_page(request.GET.get('page'))
+
+    context = {
+        'notifications': page.object_list,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'unread_count': NotificationService.get_unread_count(request.user),
+    }
+    return render(request, 'notifications/inbox.html', context)
+
+
+@login_required
+@require_POST
+def notification_mark_read(request, pk):
+    """Mark one notification as read via AJAX"""
+    NotificationService.mark_read(request.user, pk=pk)
+    return JsonResponse({'status': 'success'})
+
+
+@login_required
+@require_POST
+def notification_mark_all_read(request):
+    """Mark all of the user's notifications as read via AJAX"""
+    updated = NotificationService.mark_read(request.user)
+    return JsonResponse({'status': 'success', 'updated': updated})
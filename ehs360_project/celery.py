@@ -22,6 +22,26 @@ app.conf.beat_schedule = {
     'task': 'apps.notifications.tasks.send_investigation_overdue_notifications',
     'schedule': crontab(hour=11, minute=0),  # Daily at 11 AM IST
     },
+    'dispatch-pending-notifications': {
+        'task': 'apps.notifications.tasks.dispatch_pending_notifications',
+        'schedule': crontab(minute='*/5'),  # Events stored while the broker was down
+    },
+    'send-notification-digests': {
+        'task': 'apps.notifications.tasks.send_notification_digests',
+        'schedule': crontab(hour=11, minute=30),  # Daily, after the overdue checks
+    },
+    'reconcile-indicator-rollups': {
+        'task': 'apps.ENVdata.tasks.reconcile_indicator_rollups',
+        'schedule': crontab(hour=2, minute=0),  # Nightly at 2 AM
+    },
+    'archive-read-notifications': {
+        'task': 'apps.notifications.tasks.archive_read_notifications',
+        'schedule': crontab(hour=3, minute=0),  # Nightly at 3 AM
+    },
+    'cleanup-expired-exports': {
+        'task': 'apps.exports.tasks.cleanup_expired_exports',
+        'schedule': crontab(minute=30),  # Hourly
+    },
 }
 
 @app.task(bind=True)
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'django_celery_beat',
 
     # Local apps
+    'apps.common',
     'apps.accounts',
     'apps.organizations',
     'apps.hazards',
@@ -62,6 +63,7 @@ INSTALLED_APPS = [
     'apps.dashboards',
     'apps.notifications',
     'apps.ENVdata.apps.EnvdataConfig',
+    'apps.exports',
 ]
 
 MIDDLEWARE = [
@@ -211,6 +213,15 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Cache (same Redis server as Celery, separate database)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/1'),
+        'KEY_PREFIX': 'ehs360',
+    }
+}
+
 # Login URLs
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'dashboards:home'
@@ -226,6 +237,21 @@ CRITICALITY_TIMELINES = {
 # Email notification settings
 REMINDER_DAYS_BEFORE_DUE = 1  # Send reminder 1 day before due date
 ESCALATION_INTERVAL_DAYS = 7  # Escalate every 7 days after overdue
+EMAIL_MAX_PER_MINUTE = 30  # Provider send cap (Office 365 SMTP: 30/min); 0 disables pacing
+EMAIL_SEND_ATTEMPTS = 3  # Tries per message on transient SMTP errors
+EMAIL_RETRY_BACKOFF_SECONDS = 2  # Doubled after each failed attempt
 
 # Base site URL
-SITE_URL = "https://ehs360.everestind.com"
\ No newline at end of file
+SITE_URL = "https://ehs360.everestind.com"
+
+# Background report exports (apps.exports)
+EXPORT_JOB_TTL_HOURS = 24    # Finished files are downloadable for 24 hours
+EXPORT_JOB_STALE_HOURS = 2   # Queued/running jobs older than this are failed
+
+# In-app notification retention (apps.notifications)
+NOTIFICATION_RETENTION_DAYS = 90         # Read notifications older than this move to the archive
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 5000   # Rows moved per transaction
+NOTIFICATION_ARCHIVE_MAX_BATCHES = 50    # Per run; the rest waits for the next night
+
+# Environmental data: cached per-(plant, year) indicator matrix (apps.ENVdata)
+ENV_MATRIX_CACHE_TIMEOUT = 6 * 60 * 60  # Invalidated on every data change; this only bounds staleness
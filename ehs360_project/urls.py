@@ -31,6 +31,8 @@ urlpatterns = [
     # path('data_collection/', include('apps.data_collection.urls')),
     path('env-data/', include('apps.ENVdata.urls')),
     path('notifications/', include('apps.notifications.urls')),
+    path('exports/', include('apps.exports.urls')),
+    path('media-renditions/', include('apps.common.urls')),
 
 
     #path('observations/', include('apps.observations.urls')),